@@ -0,0 +1,141 @@
+"""Spatial grid index for aggregating map points by zoom level and viewport.
+
+Points are binned into square Web Mercator cells of ``CELL_PIXELS`` screen
+pixels at every zoom level, so a map only ever receives one aggregated point per
+visible cell: the payload is bounded by the viewport size and not by the number
+of points. The finest level is built from the points once; every coarser level
+merges 2x2 cells of the level below.
+"""
+import numpy as np
+import pandas as pd
+
+TILE_SIZE = 256
+CELL_PIXELS = 32
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+
+def project(lat, lon, zoom):
+    """Web Mercator pixel coordinates of ``lat``/``lon`` at ``zoom``."""
+    scale = TILE_SIZE * 2.0 ** zoom
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * scale
+    return x, y
+
+
+def unproject(x, y, zoom):
+    """Inverse of :func:`project`."""
+    scale = TILE_SIZE * 2.0 ** zoom
+    lon = np.asarray(x, dtype=float) / scale * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * np.asarray(y, dtype=float) / scale))))
+    return lat, lon
+
+
+def viewport_bounds(center_lat, center_lon, zoom, width, height):
+    """(south, west, north, east) of a ``width`` x ``height`` pixel map around a center."""
+    x, y = project(center_lat, center_lon, zoom)
+    north, west = unproject(x - width / 2, y - height / 2, zoom)
+    south, east = unproject(x + width / 2, y + height / 2, zoom)
+    return float(south), float(west), float(north), float(east)
+
+
+def meters_per_pixel(lat, zoom):
+    """Ground resolution of a map pixel at ``lat`` and ``zoom``."""
+    return 156543.03392 * np.cos(np.radians(lat)) / 2.0 ** zoom
+
+
+class GeoGrid:
+    """Grid index over points with optional numeric ``values`` to average per cell.
+
+    Every level stores the sorted cell keys (``x * cells_per_axis + y``) with the
+    point count, the coordinate sums (cells are placed at the centroid of their
+    points) and the sum of each value column.
+    """
+
+    def __init__(self, lat, lon, values=None, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        values = {name: np.asarray(column, dtype=float)
+                  for name, column in (values or {}).items()}
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        for column in values.values():
+            valid &= np.isfinite(column)
+        lat, lon = lat[valid], lon[valid]
+        self.value_names = tuple(values)
+        self.n_points = len(lat)
+
+        x, y = project(lat, lon, max_zoom)
+        n = self.cells_per_axis(max_zoom)
+        cell_x = np.clip((x // CELL_PIXELS).astype(np.int64), 0, n - 1)
+        cell_y = np.clip((y // CELL_PIXELS).astype(np.int64), 0, n - 1)
+        sums = {'lat': lat, 'lon': lon}
+        sums.update({name: column[valid] for name, column in values.items()})
+
+        self._levels = {}
+        level = self._aggregate(cell_x * n + cell_y, np.ones(len(lat)), sums)
+        self._levels[max_zoom] = level
+        for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+            keys = level['key']
+            finer_n = self.cells_per_axis(zoom + 1)
+            parent_x = (keys // finer_n) >> 1
+            parent_y = (keys % finer_n) >> 1
+            level = self._aggregate(parent_x * self.cells_per_axis(zoom) + parent_y,
+                                    level['count'], level['sums'])
+            self._levels[zoom] = level
+
+    @staticmethod
+    def cells_per_axis(zoom):
+        return (TILE_SIZE << zoom) // CELL_PIXELS
+
+    @staticmethod
+    def _aggregate(keys, counts, sums):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        return {
+            'key': unique_keys,
+            'count': np.bincount(inverse, weights=counts, minlength=len(unique_keys)),
+            'sums': {name: np.bincount(inverse, weights=column, minlength=len(unique_keys))
+                     for name, column in sums.items()},
+        }
+
+    def n_cells(self, zoom):
+        return len(self._levels[self._level_zoom(zoom)]['key'])
+
+    def _level_zoom(self, zoom):
+        return int(min(max(round(zoom), self.min_zoom), self.max_zoom))
+
+    def cells(self, zoom, bounds=None):
+        """Aggregated cells at ``zoom`` inside ``bounds`` (south, west, north, east).
+
+        Returns a frame with one row per non-empty cell: ``lat``/``lon`` of the
+        centroid of its points, ``count`` and the mean of every value column.
+        Without ``bounds`` all cells of the level are returned.
+        """
+        zoom = self._level_zoom(zoom)
+        level = self._levels[zoom]
+        n = self.cells_per_axis(zoom)
+        selected = slice(None)
+        if bounds is not None:
+            south, west, north, east = bounds
+            x0, y0 = project(north, west, zoom)
+            x1, y1 = project(south, east, zoom)
+            x0, x1 = (int(np.clip(x // CELL_PIXELS, 0, n - 1)) for x in (x0, x1))
+            y0, y1 = (int(np.clip(y // CELL_PIXELS, 0, n - 1)) for y in (y0, y1))
+            # Keys are sorted by column first: the viewport's columns are one contiguous run
+            start, stop = np.searchsorted(level['key'], [x0 * n, (x1 + 1) * n])
+            rows = np.arange(start, stop)
+            cell_y = level['key'][start:stop] % n
+            selected = rows[(cell_y >= y0) & (cell_y <= y1)]
+
+        count = level['count'][selected]
+        sums = level['sums']
+        result = {'lat': sums['lat'][selected] / count,
+                  'lon': sums['lon'][selected] / count,
+                  'count': count.astype(np.int64)}
+        for name in self.value_names:
+            result[name] = sums[name][selected] / count
+        return pd.DataFrame(result)
@@ -0,0 +1,203 @@
+"""Precomputed aggregation cube for the MPG explorer.
+
+Every combination of the categorical dimensions is aggregated once (sum, count,
+min and max per measure), so a group-by with filters only touches the matching
+cuboid, whose size is bounded by the number of distinct value combinations and
+not by the number of rows. A per-dimension row index answers the same filters
+for the raw rows (e.g. for the scatter plot).
+
+For data that is only read in batches, :func:`partial_aggregate` reduces each
+batch and :meth:`MPGCube.from_partials` builds the cube from the reduced
+batches; such a cube has no row index.
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('year', 'class', 'drv', 'cyl', 'manufacturer', 'fl')
+STATS = ('mean', 'count', 'min', 'max')
+# Aggregates stored per measure; means are derived from sum and count
+PARTS = ('sum', 'count', 'min', 'max')
+
+
+def _numeric_measures(df, dimensions):
+    return [col for col in df.select_dtypes('number').columns if col not in dimensions]
+
+
+def partial_aggregate(df, dimensions=DIMENSIONS, measures=None):
+    """Sum, count, min and max of every measure per dimension value combination of ``df``.
+
+    Partials of disjoint chunks of rows combine exactly, see :func:`combine_partials`.
+    """
+    dimensions = list(dimensions)
+    if measures is None:
+        measures = _numeric_measures(df, dimensions)
+    return df.groupby(dimensions, sort=False, dropna=False).agg(
+        **{f'{m}_{part}': (m, part) for m in measures for part in PARTS}
+    ).reset_index()
+
+
+def combine_partials(partials, dimensions=DIMENSIONS):
+    """Merges partial aggregates into one with a row per dimension value combination."""
+    combined = pd.concat(partials, ignore_index=True)
+    aggregations = {col: ('sum' if col.endswith(('_sum', '_count')) else col.rsplit('_', 1)[1])
+                    for col in combined.columns if col not in dimensions}
+    return combined.groupby(list(dimensions), sort=False, dropna=False).agg(aggregations).reset_index()
+
+
+class MPGCube:
+    """Aggregation cube over ``dimensions`` for all numeric ``measures`` of ``df``.
+
+    Cuboids store dimension codes plus ``sum``/``count``/``min``/``max`` per
+    measure. Sums and counts are kept instead of means so that coarser groupings
+    can be re-aggregated exactly from a finer cuboid.
+    """
+
+    def __init__(self, df, dimensions=DIMENSIONS, measures=None):
+        self.dimensions = tuple(dimensions)
+        if measures is None:
+            measures = _numeric_measures(df, self.dimensions)
+        self.measures = tuple(measures)
+        self.n_rows = len(df)
+
+        # Dimension values as integer codes; levels map codes back to labels. Missing values
+        # are a level of their own (sorted last), so their rows stay in every cuboid
+        self.levels = {}
+        codes = {}
+        for dim in self.dimensions:
+            dim_codes, levels = pd.factorize(df[dim], sort=True, use_na_sentinel=False)
+            codes[dim] = dim_codes.astype(np.int32)
+            self.levels[dim] = levels
+
+        self._row_index = {dim: self._build_row_index(codes[dim], len(self.levels[dim]))
+                           for dim in self.dimensions}
+        self._cuboids = self._build_cuboids(df, codes)
+
+    @classmethod
+    def from_partials(cls, partials, dimensions=DIMENSIONS):
+        """Cube from partial aggregates (see :func:`partial_aggregate`) of all rows.
+
+        Only the aggregates are kept, so :meth:`rows` is not available.
+        """
+        combined = combine_partials(partials, dimensions)
+        cube = cls.__new__(cls)
+        cube.dimensions = tuple(dimensions)
+        cube.measures = tuple(dict.fromkeys(col.rsplit('_', 1)[0] for col in combined.columns
+                                            if col not in cube.dimensions))
+        cube.n_rows = int(combined[f'{cube.measures[0]}_count'].sum()) if cube.measures else 0
+
+        cube.levels = {}
+        base_frame = pd.DataFrame()
+        for dim in cube.dimensions:
+            dim_codes, levels = pd.factorize(combined[dim], sort=True, use_na_sentinel=False)
+            base_frame[dim] = dim_codes.astype(np.int32)
+            cube.levels[dim] = levels
+        for col in combined.columns:
+            if col not in cube.dimensions:
+                base_frame[col] = combined[col].to_numpy()
+
+        cube._row_index = None
+        cube._cuboids = cube._build_cuboids_from_base(
+            base_frame.sort_values(list(cube.dimensions), ignore_index=True))
+        return cube
+
+    @staticmethod
+    def _build_row_index(codes, n_levels):
+        """Row positions per code: one stable argsort, split by the code counts."""
+        dtype = np.int32 if len(codes) < 2**31 else np.int64
+        order = np.argsort(codes, kind='stable').astype(dtype)
+        bounds = np.cumsum(np.bincount(codes, minlength=n_levels))[:-1]
+        return np.split(order, bounds)
+
+    def _build_cuboids(self, df, codes):
+        base_frame = pd.DataFrame(codes)
+        for measure in self.measures:
+            base_frame[measure] = df[measure].to_numpy()
+        base = base_frame.groupby(list(self.dimensions), sort=True).agg(
+            **{f'{m}_{part}': (m, part) for m in self.measures for part in PARTS}
+        ).reset_index()
+        return self._build_cuboids_from_base(base)
+
+    def _build_cuboids_from_base(self, base):
+        # All coarser cuboids are re-aggregated from the finest one, not from the rows
+        cuboids = {}
+        for k in range(len(self.dimensions) + 1):
+            for dims in combinations(self.dimensions, k):
+                cuboids[dims] = self._rollup(base, dims)
+        return cuboids
+
+    def _rollup(self, cuboid, dims):
+        aggregations = {}
+        for m in self.measures:
+            aggregations.update({f'{m}_sum': 'sum', f'{m}_count': 'sum',
+                                 f'{m}_min': 'min', f'{m}_max': 'max'})
+        columns = list(aggregations)
+        if not dims:
+            return cuboid[columns].agg(aggregations).to_frame().T
+        return cuboid.groupby(list(dims), sort=True).agg(aggregations).reset_index()
+
+    def _codes(self, dim, values):
+        return self.levels[dim].get_indexer(pd.Index(values)).astype(np.int32)
+
+    def _canonical(self, dims):
+        unknown = set(dims) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f"Unknown dimension(s): {sorted(unknown)}")
+        return tuple(dim for dim in self.dimensions if dim in dims)
+
+    def query(self, group_by=(), filters=None):
+        """Aggregates the measures grouped by ``group_by`` over the filtered rows.
+
+        ``filters`` maps a dimension to the list of allowed values; dimensions
+        that are missing or map to an empty list are not filtered. Returns a
+        frame indexed by the group labels with (measure, stat) columns, stats
+        being mean, count, min and max.
+        """
+        filters = {dim: values for dim, values in (filters or {}).items() if len(values)}
+        group_by = self._canonical(group_by)
+        cuboid_dims = self._canonical(set(group_by) | set(filters))
+        cuboid = self._cuboids[cuboid_dims]
+
+        mask = np.ones(len(cuboid), dtype=bool)
+        for dim, values in filters.items():
+            mask &= np.isin(cuboid[dim].to_numpy(), self._codes(dim, values))
+        selected = cuboid[mask]
+        # Filter dimensions that are not grouped by are summed out of the cuboid
+        if cuboid_dims != group_by:
+            selected = self._rollup(selected, group_by)
+
+        result = {}
+        for m in self.measures:
+            count = selected[f'{m}_count'].to_numpy(dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[(m, 'mean')] = selected[f'{m}_sum'].to_numpy(dtype=float) / count
+            result[(m, 'count')] = count.astype(np.int64)
+            result[(m, 'min')] = selected[f'{m}_min'].to_numpy()
+            result[(m, 'max')] = selected[f'{m}_max'].to_numpy()
+
+        if group_by:
+            index = pd.MultiIndex.from_arrays(
+                [self.levels[dim].take(selected[dim].to_numpy()) for dim in group_by],
+                names=list(group_by))
+            if len(group_by) == 1:
+                index = index.get_level_values(0)
+        else:
+            index = pd.RangeIndex(len(selected))
+        return pd.DataFrame(result, index=index)
+
+    def rows(self, filters=None):
+        """Sorted positions of the rows matching ``filters``, or None without filters."""
+        if self._row_index is None:
+            raise ValueError("Cube was built from partial aggregates and has no row index")
+        positions = None
+        for dim, values in (filters or {}).items():
+            if not len(values):
+                continue
+            index = self._row_index[dim]
+            matches = np.sort(np.concatenate(
+                [index[code] for code in self._codes(dim, values) if code >= 0]
+                or [np.empty(0, dtype=np.int32)]))
+            positions = matches if positions is None else np.intersect1d(
+                positions, matches, assume_unique=True)
+        return positions
@@ -0,0 +1,194 @@
+"""Memory-mapped, year-partitioned columnar store for the MPG data.
+
+The CSV is converted once, streaming in blocks, into uncompressed Arrow IPC
+files partitioned by ``year`` (``<csv dir>/.mpg_store/<csv name>/<version>/``).
+Reads go through ``pyarrow.dataset`` on memory-mapped files: a ``year`` filter
+only opens the matching partitions, other filters are evaluated batch by batch,
+and only the requested columns are touched. The aggregation cube is reduced from
+the same batches during the conversion and stored next to the data, so opening
+the store does not depend on the number of rows.
+
+The store is rebuilt when the size or modification time of the CSV changes.
+Each state of the CSV gets its own version directory, written under a unique
+temporary name and renamed into place, so concurrent processes never delete or
+overwrite a store another one is reading. If two processes convert at the same
+time, the first rename wins and the other discards its copy.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from pyarrow.fs import LocalFileSystem
+
+from mpg_cube import DIMENSIONS, MPGCube, combine_partials, partial_aggregate
+
+STORE_VERSION = 1
+STORE_DIR = '.mpg_store'
+PARTITION_COLUMN = 'year'
+# The streaming CSV reader decodes a few dozen blocks ahead, so blocks are kept small
+CSV_BLOCK_SIZE = 2**20
+ROWS_PER_GROUP = 64 * 1024
+# Temporary directories older than this belong to conversions that were killed
+STALE_TMP_SECONDS = 3600
+
+
+def _source_state(csv_path):
+    stat = os.stat(csv_path)
+    return {'version': STORE_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _version_name(state):
+    return f"v{state['version']}-{state['size']}-{state['mtime_ns']}"
+
+
+def _is_current(directory, state):
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)['source'] == state
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def _prune(base, keep):
+    """Removes old versions and abandoned temporary directories from ``base``.
+
+    Besides ``keep``, the most recent other version survives, since processes
+    that opened it before the CSV changed may still be reading it.
+    """
+    cutoff = time.time() - STALE_TMP_SECONDS
+    try:
+        entries = [entry for entry in os.scandir(base)
+                   if entry.is_dir() and entry.name.startswith('v') and entry.name != keep]
+        versions = sorted((entry for entry in entries if '.tmp' not in entry.name),
+                          key=lambda entry: entry.stat().st_mtime, reverse=True)
+        stale = [entry for entry in entries if '.tmp' in entry.name and entry.stat().st_mtime < cutoff]
+    except OSError:
+        return
+    for entry in versions[1:] + stale:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class MPGStore:
+    """Read access to a converted store; use :meth:`open` to get one for a CSV."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.columns = meta['columns']
+        self.n_rows = meta['n_rows']
+        schema = pa.schema([(PARTITION_COLUMN, pa.type_for_alias(meta['partition_type']))])
+        self.dataset = ds.dataset(os.path.join(directory, 'data'), format='ipc',
+                                  partitioning=ds.partitioning(schema, flavor='hive'),
+                                  filesystem=LocalFileSystem(use_mmap=True))
+
+    @classmethod
+    def open(cls, csv_path):
+        """Store for ``csv_path``, converting the CSV first if there is no current store."""
+        csv_path = os.path.abspath(csv_path)
+        base = os.path.join(os.path.dirname(csv_path), STORE_DIR,
+                            os.path.splitext(os.path.basename(csv_path))[0])
+        state = _source_state(csv_path)
+        directory = os.path.join(base, _version_name(state))
+        if not _is_current(directory, state):
+            convert(csv_path, directory)
+            _prune(base, keep=_version_name(state))
+        return cls(directory)
+
+    def _filter(self, filters):
+        expression = None
+        for column, values in (filters or {}).items():
+            if not len(values):
+                continue
+            condition = pc.field(column).isin(list(values))
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read(self, columns=None, filters=None):
+        """Rows matching ``filters`` (column -> allowed values) as a frame of ``columns``."""
+        table = self.dataset.to_table(columns=list(columns or self.columns),
+                                      filter=self._filter(filters))
+        return table.to_pandas()
+
+    def take(self, positions, columns=None):
+        """Rows at ``positions`` (in scan order of :meth:`read`), indexed by their positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        frame = self.dataset.take(positions, columns=list(columns or self.columns)).to_pandas()
+        frame.index = positions
+        return frame
+
+    def batches(self, columns, filters=None):
+        """Record batches of ``columns`` matching ``filters``, read lazily."""
+        return self.dataset.to_batches(columns=list(columns), filter=self._filter(filters))
+
+    def cube(self):
+        """Aggregation cube over all rows, from the aggregates stored at conversion."""
+        partial = feather.read_table(os.path.join(self.directory, 'cube.arrow'),
+                                     memory_map=True).to_pandas()
+        return MPGCube.from_partials([partial])
+
+
+def convert(csv_path, directory):
+    """Converts ``csv_path`` block by block into a store in ``directory``.
+
+    Every block is split by year and appended to that year's file, so memory use
+    is bounded by the block size and not by the size of the CSV. An existing
+    ``directory`` is never replaced; if another process finished it first, that
+    store is kept and this conversion is discarded.
+    """
+    state = _source_state(csv_path)
+    tmp_directory = f"{directory}.tmp{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    try:
+        _write_store(csv_path, tmp_directory, state)
+    except BaseException:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+    # Rename the finished store into place; renaming onto an existing version fails
+    try:
+        os.rename(tmp_directory, directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        if not _is_current(directory, state):
+            raise
+
+
+def _write_store(csv_path, tmp_directory, state):
+    reader = pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE))
+    partition_type = reader.schema.field(PARTITION_COLUMN).type
+    file_schema = reader.schema.remove(reader.schema.get_field_index(PARTITION_COLUMN))
+    partials = []
+    n_rows = 0
+    writers = {}
+    try:
+        for batch in reader:
+            n_rows += batch.num_rows
+            partials.append(partial_aggregate(batch.to_pandas(), DIMENSIONS))
+            years = batch.column(PARTITION_COLUMN)
+            for year in pc.unique(years).to_pylist():
+                writer = writers.get(year)
+                if writer is None:
+                    partition = os.path.join(tmp_directory, 'data', f'{PARTITION_COLUMN}={year}')
+                    os.makedirs(partition)
+                    writer = writers[year] = pa.ipc.new_file(
+                        os.path.join(partition, 'part-0.arrow'), file_schema)
+                part = batch.filter(pc.equal(years, year)).drop_columns([PARTITION_COLUMN])
+                writer.write_table(pa.Table.from_batches([part]), max_chunksize=ROWS_PER_GROUP)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    cube_base = combine_partials(partials, DIMENSIONS)
+    feather.write_feather(cube_base, os.path.join(tmp_directory, 'cube.arrow'),
+                          compression='uncompressed')
+    with open(os.path.join(tmp_directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'source': state, 'columns': reader.schema.names, 'n_rows': n_rows,
+                   'partition_type': str(partition_type)}, f)
@@ -0,0 +1,131 @@
+"""Server-side paginated, sortable table view for large data frames.
+
+The data stays on the server. A column is indexed once, on its first use for
+sorting or filtering, by factorizing it in sorted order: the stable argsort of
+the codes is the sort permutation of the column, and splitting it by the code
+counts gives the rows of every value. Sort, filter and page requests are
+answered from these indexes, and only the rows of the requested page are
+fetched and handed to ``st.dataframe``.
+
+Backed by an :class:`mpg_store.MPGStore`, only the sorted and filtered columns
+are ever read in full; a page is taken from the memory-mapped store by row
+position, so the rows and other columns are never materialised together.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+class _ColumnIndex:
+    """Sorted distinct values of a column and the row positions of each value."""
+
+    def __init__(self, values):
+        codes, self.levels = pd.factorize(values, sort=True)
+        # Missing values (code -1) form the last group, so they sort last
+        codes = np.where(codes < 0, len(self.levels), codes)
+        dtype = np.int32 if len(codes) < 2**31 else np.int64
+        self.order = np.argsort(codes, kind='stable').astype(dtype)
+        self.starts = np.concatenate(
+            [[0], np.cumsum(np.bincount(codes, minlength=len(self.levels) + 1))])
+        self._descending = None
+
+    def group(self, first, last):
+        """Row positions of the codes ``first`` to ``last`` (exclusive), in sort order."""
+        return self.order[self.starts[first]:self.starts[last]]
+
+    def descending(self):
+        """Sort permutation for descending order; ties keep their row order, missing values stay last."""
+        if self._descending is None:
+            n_levels = len(self.levels)
+            codes = np.empty(len(self.order), dtype=np.int64)
+            codes[self.order] = np.repeat(np.arange(n_levels + 1), np.diff(self.starts))
+            reversed_codes = np.where(codes < n_levels, n_levels - 1 - codes, n_levels)
+            self._descending = np.argsort(reversed_codes, kind='stable').astype(self.order.dtype)
+        return self._descending
+
+    def matches(self, condition):
+        """Row positions matching a list of values or an inclusive ``(low, high)`` range."""
+        if isinstance(condition, tuple):
+            low, high = condition
+            first = 0 if low is None else self.levels.searchsorted(low, side='left')
+            last = len(self.levels) if high is None else self.levels.searchsorted(high, side='right')
+            return self.group(first, max(first, last))
+        codes = self.levels.get_indexer(pd.Index(condition))
+        return np.concatenate([self.group(code, code + 1) for code in codes if code >= 0]
+                              or [np.empty(0, dtype=self.order.dtype)])
+
+
+class PagedTable:
+    """Page requests against ``df`` with per-column sort permutations and value indexes.
+
+    ``filters`` map a column to a list of allowed values or to an inclusive
+    ``(low, high)`` range (either end may be None); empty lists are ignored.
+    Use :meth:`from_store` to page through a store without loading it.
+    """
+
+    def __init__(self, df):
+        self.columns = list(df.columns)
+        self.n_rows = len(df)
+        self._read_column = df.__getitem__
+        self._take = df.take
+        self._indexes = {}
+
+    @classmethod
+    def from_store(cls, store):
+        """Table over ``store``; indexes read single columns, pages are taken by row position."""
+        table = cls.__new__(cls)
+        table.columns = list(store.columns)
+        table.n_rows = store.n_rows
+        table._read_column = lambda column: store.read([column])[column]
+        table._take = store.take
+        table._indexes = {}
+        return table
+
+    def _index(self, column):
+        index = self._indexes.get(column)
+        if index is None:
+            index = self._indexes[column] = _ColumnIndex(self._read_column(column))
+        return index
+
+    def rows(self, sort_by=None, ascending=True, filters=None):
+        """Positions of the rows matching ``filters``, in the requested order."""
+        mask = None
+        for column, condition in (filters or {}).items():
+            if not isinstance(condition, tuple) and not len(condition):
+                continue
+            column_mask = np.zeros(self.n_rows, dtype=bool)
+            column_mask[self._index(column).matches(condition)] = True
+            mask = column_mask if mask is None else mask & column_mask
+
+        if sort_by is None:
+            return np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+        index = self._index(sort_by)
+        order = index.order if ascending else index.descending()
+        return order if mask is None else order[mask[order]]
+
+    def page(self, rows, number, size):
+        """Rows of page ``number`` (0-based) of ``size`` rows out of ``rows``."""
+        return self._take(rows[number * size:(number + 1) * size])
+
+
+def paged_dataframe(table, key, filters=None):
+    """Renders ``table`` with sort and page controls; only the current page is sent to the browser."""
+    sort_column, order_column, size_column, page_column = st.columns(4)
+    sort_by = sort_column.selectbox("Sort By", [None] + table.columns,
+                                    format_func=lambda column: "(original order)" if column is None else column,
+                                    key=f"{key}_sort_by")
+    descending = order_column.radio("Order", ["Ascending", "Descending"],
+                                    horizontal=True, key=f"{key}_order") == "Descending"
+    size = size_column.selectbox("Rows per Page", PAGE_SIZES, key=f"{key}_page_size")
+
+    rows = table.rows(sort_by, not descending, filters)
+    n_pages = max(1, -(-len(rows) // size))
+    # The page count changes with the filters, so the page number is clamped instead of bounded
+    number = min(page_column.number_input("Page", min_value=1, step=1, key=f"{key}_page"), n_pages)
+
+    st.dataframe(table.page(rows, number - 1, size), use_container_width=True)
+    first = (number - 1) * size
+    st.caption(f"Page {number} of {n_pages}: rows {min(first + 1, len(rows))}-"
+               f"{min(first + size, len(rows))} of {len(rows)}")
@@ -1,36 +1,49 @@
 # Streamlit live coding script
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
 import plotly.express as px
 import plotly.graph_objects as go
-from urllib.request import urlopen
-import json
-from copy import deepcopy
-
-@st.cache_data
-def load_data(path):
-    df = pd.read_csv('./data/mpg.csv')
-    return df
+import io
+
+from mpg_cube import DIMENSIONS
+from mpg_store import MPGStore
+from paged_table import PagedTable, paged_dataframe
+from geo_grid import (GeoGrid, CELL_PIXELS, MIN_ZOOM, MAX_ZOOM,
+                      meters_per_pixel, viewport_bounds)
+
+# The loaded data is shared read-only by all sessions; with copy-on-write any
+# derived frame that gets modified is copied lazily instead of touching the shared one.
+pd.set_option("mode.copy_on_write", True)
+
+@st.cache_resource
+def load_store(path):
+    # The CSV is converted once into a memory-mapped store next to it and reused while unchanged
+    return MPGStore.open(path)
+
+@st.cache_resource
+def load_cube(path):
+    # Stored with the converted data; group-bys and filters are then answered from the cube
+    return load_store(path).cube()
+
+@st.cache_resource
+def load_table(path):
+    # Sort and filter indexes are built on first use and shared by all sessions; pages
+    # are taken from the store, so the rows are never loaded as a whole
+    return PagedTable.from_store(load_store(path))
 
 # First some MPG Data Exploration
-mpg_df_raw = load_data(path='./data/mpg.csv')
-mpg_df = deepcopy(mpg_df_raw)
+mpg_cube = load_cube(path='./data/mpg.csv')
 
 # Add title and header
 st.title("Introduction to Streamlit")
 st.header("MPG Data Exploration")
 
-#st.table(data=mpg_df)
-if st.checkbox("Show Dataframe"):
-
-    st.subheader("This is my dataset:")
-    st.dataframe(data=mpg_df)
-
 #left_column, right_column = st.columns(2)
 left_column, middle_column, right_column = st.columns([3, 1, 1])
 
-years = ["All"]+sorted(pd.unique(mpg_df['year']))
+years = ["All"]+mpg_cube.levels['year'].tolist()
 year = left_column.selectbox("Choose a Year", years)
 
 show_means = middle_column.radio(
@@ -39,47 +52,154 @@ show_means = middle_column.radio(
 plot_types = ["Matplotlib", "Plotly"]
 plot_type = right_column.radio("Choose Plot Type", plot_types)
 
-# st.write(show_means)
-
-if year == "All":
-    reduced_df = mpg_df
-else:
-    reduced_df = mpg_df[mpg_df["year"] == year]
-
-means = reduced_df.groupby('class').mean(numeric_only=True)
+group_by = st.multiselect("Group Means By", DIMENSIONS, default=['class'])
 
-m_fig, ax = plt.subplots(figsize=(10, 8))
-ax.scatter(reduced_df['displ'], reduced_df['hwy'], alpha=0.7)
-ax.set_title("Engine Size vs. Highway Fuel Mileage")
-ax.set_xlabel('Displacement (Liters)')
-ax.set_ylabel('MPG')
+# An empty selection means no filter on that dimension
+with st.expander("Filters"):
+    filter_columns = st.columns(len(DIMENSIONS) - 1)
+    filters = {dim: column.multiselect(dim, mpg_cube.levels[dim].tolist())
+               for column, dim in zip(filter_columns, DIMENSIONS[1:])}
+if year != "All":
+    filters['year'] = [year]
 
-if show_means == "Yes":
-    ax.scatter(means['displ'], means['hwy'], alpha=0.7,
-               color="red", label="Class Means")
-
-#st.pyplot(m_fig)
+#st.table(data=mpg_df)
+if st.checkbox("Show Dataframe"):
 
-# In Plotly
-p_fig = px.scatter(reduced_df, x='displ', y='hwy', opacity=0.5,
-                   range_x=[1, 8], range_y=[10, 50],
-                   width=750, height=600,
-                   labels={"displ": "Displacement (Liters)",
-                           "hwy": "MPG"},
-                   title="Engine Size vs. Highway Fuel Mileage")
-p_fig.update_layout(title_font_size=22)
+    st.subheader("This is my dataset:")
+    # Paged on the server with the filters above; only the visible rows are sent
+    paged_dataframe(load_table('./data/mpg.csv'), key="mpg_table", filters=filters)
 
-if show_means == "Yes":
-    p_fig.add_trace(go.Scatter(x=means['displ'], y=means['hwy'],
-                               mode="markers"))
-    p_fig.update_layout(showlegend=False)
+# st.write(show_means)
 
-#st.plotly_chart(p_fig)
+if st.checkbox("Show Group Statistics"):
+    # Only queried while shown; map and paging reruns leave the cube alone
+    table = mpg_cube.query(group_by, filters)
+    table.columns = [f"{measure} {stat}" for measure, stat in table.columns]
+    st.dataframe(table)
+
+# Rendered plots are cached per selection; only the chosen backend is built.
+# The oldest entries are evicted once the cache is full.
+PLOT_CACHE_ENTRIES = 64
+
+# Above DENSITY_THRESHOLD points the scatter is binned on the server and drawn as a
+# heatmap, so the payload depends on the chart size and not on the number of rows.
+# Point scatters above WEBGL_THRESHOLD are drawn with WebGL in Plotly.
+DENSITY_THRESHOLD = 100_000
+WEBGL_THRESHOLD = 10_000
+RENDER_MODES = ["Auto", "Points", "Density"]
+
+# Shared axis ranges; the density grid has one bin per 5x5 pixels of the Plotly chart
+PLOT_RANGE = ((1, 8), (10, 50))
+PLOT_SIZE = (750, 600)
+DENSITY_BINS = (PLOT_SIZE[0] // 5, PLOT_SIZE[1] // 5)
+PLOT_COLUMNS = ['displ', 'hwy']
+
+render_mode = st.radio("Render Mode", RENDER_MODES, horizontal=True,
+                       help=f"Auto switches to a density heatmap above {DENSITY_THRESHOLD:,} cars")
+
+def select_means(path, filter_items, group_by):
+    return load_cube(path).query(group_by, dict(filter_items)).xs('mean', axis=1, level=1)
+
+def count_points(path, filter_items):
+    # Known from the cube without reading any rows
+    return int(load_cube(path).query((), dict(filter_items))[('hwy', 'count')].sum())
+
+def select_points(path, filter_items):
+    # Filters are pushed down to the store: only the selected years' partitions
+    # and the plotted columns are read
+    return load_store(path).read(PLOT_COLUMNS, dict(filter_items))
+
+def use_density(render_mode, n_points):
+    if render_mode == "Auto":
+        return n_points > DENSITY_THRESHOLD
+    return render_mode == "Density"
+
+def density_grid(path, filter_items):
+    """Counts of cars per displ/hwy bin; points outside PLOT_RANGE are dropped.
+
+    Accumulated batch by batch from the store, so the points are never loaded at once.
+    """
+    counts = np.zeros(DENSITY_BINS)
+    for batch in load_store(path).batches(PLOT_COLUMNS, dict(filter_items)):
+        counts += np.histogram2d(
+            batch.column('displ').to_numpy(zero_copy_only=False),
+            batch.column('hwy').to_numpy(zero_copy_only=False),
+            bins=DENSITY_BINS, range=PLOT_RANGE)[0]
+    # Same edges as np.histogram2d; rows are y bins, as expected by pcolormesh and go.Heatmap
+    x_edges, y_edges = (np.linspace(low, high, bins + 1)
+                        for (low, high), bins in zip(PLOT_RANGE, DENSITY_BINS))
+    return counts.T.astype(np.int64), x_edges, y_edges
+
+@st.cache_resource(max_entries=PLOT_CACHE_ENTRIES)
+def matplotlib_png(path, filter_items, group_by, show_means, render_mode):
+    means = select_means(path, filter_items, group_by)
+
+    # A bare Figure is not registered with pyplot, so nothing keeps it alive after rendering
+    m_fig = Figure(figsize=(10, 8))
+    ax = m_fig.subplots()
+    if use_density(render_mode, count_points(path, filter_items)):
+        counts, x_edges, y_edges = density_grid(path, filter_items)
+        mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0), cmap="Blues")
+        m_fig.colorbar(mesh, ax=ax, label="Cars")
+    else:
+        reduced_df = select_points(path, filter_items)
+        ax.scatter(reduced_df['displ'], reduced_df['hwy'], alpha=0.7)
+    ax.set_title("Engine Size vs. Highway Fuel Mileage")
+    ax.set_xlabel('Displacement (Liters)')
+    ax.set_ylabel('MPG')
+
+    if show_means == "Yes":
+        ax.scatter(means['displ'], means['hwy'], alpha=0.7,
+                   color="red", label="Class Means")
+
+    # Same settings as st.pyplot
+    buffer = io.BytesIO()
+    m_fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+    m_fig.clear()
+    return buffer.getvalue()
+
+@st.cache_resource(max_entries=PLOT_CACHE_ENTRIES)
+def plotly_figure(path, filter_items, group_by, show_means, render_mode):
+    means = select_means(path, filter_items, group_by)
+    n_points = count_points(path, filter_items)
+
+    if use_density(render_mode, n_points):
+        counts, x_edges, y_edges = density_grid(path, filter_items)
+        # Empty bins become gaps instead of the lowest colour
+        p_fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.where(counts > 0, counts, np.nan), colorscale="Blues",
+            colorbar_title="Cars",
+            hovertemplate="Displacement: %{x:.2f}<br>MPG: %{y:.1f}<br>Cars: %{z}<extra></extra>"))
+        p_fig.update_layout(width=PLOT_SIZE[0], height=PLOT_SIZE[1],
+                            title="Engine Size vs. Highway Fuel Mileage",
+                            xaxis=dict(range=PLOT_RANGE[0], title="Displacement (Liters)"),
+                            yaxis=dict(range=PLOT_RANGE[1], title="MPG"))
+    else:
+        reduced_df = select_points(path, filter_items)
+        p_fig = px.scatter(reduced_df, x='displ', y='hwy', opacity=0.5,
+                           range_x=list(PLOT_RANGE[0]), range_y=list(PLOT_RANGE[1]),
+                           width=PLOT_SIZE[0], height=PLOT_SIZE[1],
+                           labels={"displ": "Displacement (Liters)",
+                                   "hwy": "MPG"},
+                           title="Engine Size vs. Highway Fuel Mileage",
+                           render_mode="webgl" if n_points > WEBGL_THRESHOLD else "svg")
+    p_fig.update_layout(title_font_size=22)
+
+    if show_means == "Yes":
+        p_fig.add_trace(go.Scatter(x=means['displ'], y=means['hwy'],
+                                   mode="markers"))
+        p_fig.update_layout(showlegend=False)
+    return p_fig
+
+# Hashable, order-independent cache key for the filters
+filter_items = tuple(sorted((dim, tuple(values)) for dim, values in filters.items() if values))
 
 if plot_type == "Matplotlib":
-    st.pyplot(m_fig)
+    st.image(matplotlib_png('./data/mpg.csv', filter_items, tuple(group_by), show_means, render_mode),
+             use_column_width=True)
 else:
-    st.plotly_chart(p_fig)
+    st.plotly_chart(plotly_figure('./data/mpg.csv', filter_items, tuple(group_by), show_means, render_mode))
 
 # We can write stuff
 url = "https://archive.ics.uci.edu/ml/datasets/auto+mpg"
@@ -88,13 +208,46 @@ st.write("Data Source:", url)
 
 # Sample Streamlit Map
 st.subheader("Streamlit Map")
-ds_geo = px.data.carshare()
 
+@st.cache_resource
+def load_carshare():
+    ds_geo = px.data.carshare()
+    ds_geo['lat'] = ds_geo['centroid_lat']
+    ds_geo['lon'] = ds_geo['centroid_lon']
+    return ds_geo
 
+@st.cache_resource
+def load_geo_grid():
+    # Built once per process; zoom and viewport changes only read the index
+    ds_geo = load_carshare()
+    return GeoGrid(ds_geo['lat'], ds_geo['lon'], {'car_hours': ds_geo['car_hours']})
 
-ds_geo['lat'] = ds_geo['centroid_lat']
-ds_geo['lon'] = ds_geo['centroid_lon']
+ds_geo = load_carshare()
+geo_grid = load_geo_grid()
 
 st.dataframe(ds_geo.head())
 
-st.map(ds_geo)
\ No newline at end of file
+# Only one aggregated point per grid cell inside the viewport is sent to the map
+MAP_SIZE = (700, 500)
+zoom_column, metric_column, lat_column, lon_column = st.columns(4)
+zoom = zoom_column.slider("Zoom", MIN_ZOOM, MAX_ZOOM, 11)
+map_metric = metric_column.radio("Cell Size By", ["Count", "Mean car_hours"])
+center_lat = lat_column.slider("Center Latitude", round(ds_geo['lat'].min(), 2),
+                               round(ds_geo['lat'].max(), 2), round(ds_geo['lat'].mean(), 2))
+center_lon = lon_column.slider("Center Longitude", round(ds_geo['lon'].min(), 2),
+                               round(ds_geo['lon'].max(), 2), round(ds_geo['lon'].mean(), 2))
+
+cells = geo_grid.cells(zoom, viewport_bounds(center_lat, center_lon, zoom, *MAP_SIZE))
+if cells.empty:
+    st.caption(f"No cars in view, {geo_grid.n_points} cars in total")
+else:
+    # Circles fill at most their cell; the area follows the metric. A metric that is 0 in
+    # every visible cell would give 0/0, so all cells are drawn at full size instead.
+    metric = cells['count'] if map_metric == "Count" else cells['car_hours']
+    peak = metric.max()
+    scale = metric / peak if peak > 0 else 1.0
+    cell_meters = CELL_PIXELS * meters_per_pixel(center_lat, zoom)
+    cells['size'] = cell_meters / 2 * np.sqrt(scale)
+
+    st.map(cells, size='size', zoom=zoom)
+    st.caption(f"{len(cells)} cells in view, {geo_grid.n_points} cars in total")
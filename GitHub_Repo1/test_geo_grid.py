@@ -0,0 +1,59 @@
+"""GeoGrid: every zoom level aggregates the same points, the viewport only selects cells."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo_grid import CELL_PIXELS, GeoGrid, project, viewport_bounds
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    return pd.DataFrame({
+        'lat': 45.5 + rng.normal(0, 0.05, n),
+        'lon': -73.6 + rng.normal(0, 0.05, n),
+        'car_hours': rng.exponential(500, n),
+    })
+
+
+@pytest.fixture(scope='module')
+def grid(points):
+    return GeoGrid(points['lat'], points['lon'], {'car_hours': points['car_hours']})
+
+
+def test_totals_match_on_every_zoom(points, grid):
+    finest, coarsest = grid.cells(16), grid.cells(0)
+    assert len(coarsest) < len(finest)
+    for cells in (coarsest, finest):
+        assert cells['count'].sum() == len(points) == grid.n_points
+        # Cell means weighted by their counts give back the overall sum and centroid
+        for column in ('car_hours', 'lat', 'lon'):
+            assert np.isclose((cells[column] * cells['count']).sum(), points[column].sum())
+
+
+def test_cells_match_brute_force_binning(points, grid):
+    zoom = 12
+    x, y = project(points['lat'], points['lon'], zoom)
+    expected = points.groupby([x // CELL_PIXELS, y // CELL_PIXELS]).agg(
+        count=('car_hours', 'size'), car_hours=('car_hours', 'mean'))
+    cells = grid.cells(zoom)
+    assert len(cells) == len(expected)
+    assert sorted(cells['count']) == sorted(expected['count'])
+    assert np.allclose(np.sort(cells['car_hours']), np.sort(expected['car_hours']))
+
+
+def test_viewport_selects_cells_in_view(points, grid):
+    zoom, width, height = 13, 700, 500
+    bounds = viewport_bounds(45.5, -73.6, zoom, width, height)
+    in_view = grid.cells(zoom, bounds)
+    assert 0 < len(in_view) < grid.n_cells(zoom)
+    south, west, north, east = bounds
+    # Cells are selected as a whole, so their centroids may lie up to one cell outside the bounds
+    x, y = project(in_view['lat'], in_view['lon'], zoom)
+    x0, y0 = project(north, west, zoom)
+    x1, y1 = project(south, east, zoom)
+    assert ((x >= x0 - CELL_PIXELS) & (x <= x1 + CELL_PIXELS)).all()
+    assert ((y >= y0 - CELL_PIXELS) & (y <= y1 + CELL_PIXELS)).all()
+    # Far away from all points nothing is in view
+    assert grid.cells(zoom, viewport_bounds(0.0, 0.0, zoom, width, height)).empty
@@ -0,0 +1,97 @@
+"""MPGCube answers group-bys and filters exactly like pandas on the raw rows."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mpg_cube import MPGCube, partial_aggregate
+
+MPG_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'mpg.csv')
+
+QUERIES = [
+    ((), {}),
+    (('class',), {}),
+    (('class', 'drv'), {}),
+    (('manufacturer',), {'year': [2008]}),
+    (('cyl', 'fl'), {'class': ['suv', 'pickup'], 'drv': ['4']}),
+    ((), {'manufacturer': ['audi'], 'cyl': [4, 6]}),
+    # Filter values that do not occur select nothing
+    (('class',), {'drv': ['x']}),
+]
+
+
+@pytest.fixture(scope='module')
+def mpg():
+    return pd.read_csv(MPG_CSV)
+
+
+@pytest.fixture(scope='module')
+def cube(mpg):
+    return MPGCube(mpg)
+
+
+def _groupby(df, group_by, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for dim, values in filters.items():
+        mask &= df[dim].isin(values).to_numpy()
+    selected = df[mask]
+    measures = ['displ', 'cty', 'hwy']
+    if not group_by:
+        return selected[measures].agg(['mean', 'count', 'min', 'max'])
+    return selected.groupby(list(group_by))[measures].agg(['mean', 'count', 'min', 'max'])
+
+
+@pytest.mark.parametrize('group_by, filters', QUERIES)
+def test_query_matches_groupby(mpg, cube, group_by, filters):
+    result = cube.query(group_by, filters)
+    expected = _groupby(mpg, group_by, filters)
+    for measure in ('displ', 'cty', 'hwy'):
+        for stat in ('mean', 'count', 'min', 'max'):
+            if group_by:
+                got = result[(measure, stat)]
+                want = expected[(measure, stat)].reindex(got.index)
+                assert len(got) == len(expected)
+                assert np.allclose(got.to_numpy(dtype=float), want.to_numpy(dtype=float))
+            elif len(result):
+                # Without grouping the cube returns a single row, empty if nothing matches
+                assert np.isclose(result[(measure, stat)].iloc[0], expected.loc[stat, measure])
+
+
+def test_cube_from_partials_matches(mpg, cube):
+    chunks = [mpg.iloc[start:start + 50] for start in range(0, len(mpg), 50)]
+    from_partials = MPGCube.from_partials([partial_aggregate(chunk) for chunk in chunks])
+    assert from_partials.n_rows == cube.n_rows
+    for group_by, filters in QUERIES:
+        pd.testing.assert_frame_equal(from_partials.query(group_by, filters), cube.query(group_by, filters),
+                                      check_dtype=False)
+    with pytest.raises(ValueError):
+        from_partials.rows({'year': [2008]})
+
+
+def test_rows_match_mask(mpg, cube):
+    filters = {'class': ['suv', 'compact'], 'year': [1999]}
+    expected = np.flatnonzero(mpg['class'].isin(filters['class']) & mpg['year'].isin(filters['year']))
+    assert np.array_equal(cube.rows(filters), expected)
+    assert cube.rows() is None
+
+
+def test_missing_dimension_values_are_kept(mpg):
+    df = mpg.copy()
+    df['cyl'] = df['cyl'].astype(float)
+    df.loc[::7, 'drv'] = np.nan
+    df.loc[::11, 'cyl'] = np.nan
+    cube = MPGCube(df)
+    chunks = [df.iloc[start:start + 50] for start in range(0, len(df), 50)]
+    for tested in (cube, MPGCube.from_partials([partial_aggregate(chunk) for chunk in chunks])):
+        assert tested.n_rows == len(df)
+        assert tested.query()[('hwy', 'count')].sum() == len(df)
+        result = tested.query(('drv', 'cyl'))
+        expected = df.groupby(['drv', 'cyl'], dropna=False)['hwy'].agg(['mean', 'count'])
+        assert len(result) == len(expected)
+        assert result[('hwy', 'count')].sum() == len(df)
+        missing = result[result.index.get_level_values('drv').isna()]
+        assert missing[('hwy', 'count')].sum() == df['drv'].isna().sum()
+        # Filters on other dimensions still see the rows with a missing value
+        assert tested.query((), {'year': [2008]})[('hwy', 'count')].sum() == (df['year'] == 2008).sum()
+    assert np.array_equal(cube.rows({'drv': [np.nan]}), np.flatnonzero(df['drv'].isna()))
@@ -0,0 +1,63 @@
+"""MPGStore: the converted store returns the CSV's rows, with filters and columns pushed down."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mpg_cube import MPGCube
+from mpg_store import MPGStore, STORE_DIR
+
+MPG_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'mpg.csv')
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # Converted next to the CSV, so the store must not end up in the repo's data directory
+    path = tmp_path / 'mpg.csv'
+    shutil.copy(MPG_CSV, path)
+    return str(path)
+
+
+def _sorted(df):
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_read_matches_csv(csv_path):
+    store = MPGStore.open(csv_path)
+    expected = pd.read_csv(csv_path)
+    assert store.n_rows == len(expected)
+    got = store.read()
+    assert list(got.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(_sorted(got), _sorted(expected), check_dtype=False)
+
+    filters = {'year': [2008], 'class': ['suv', 'compact'], 'drv': []}
+    got = store.read(['displ', 'hwy', 'class'], filters)
+    mask = (expected['year'] == 2008) & expected['class'].isin(filters['class'])
+    pd.testing.assert_frame_equal(_sorted(got), _sorted(expected.loc[mask, ['displ', 'hwy', 'class']]),
+                                  check_dtype=False)
+    assert sum(batch.num_rows for batch in store.batches(['hwy'], filters)) == mask.sum()
+
+
+def test_stored_cube_matches_rows(csv_path):
+    cube = MPGStore.open(csv_path).cube()
+    direct = MPGCube(pd.read_csv(csv_path))
+    for group_by, filters in [((), {}), (('class', 'year'), {}), (('drv',), {'cyl': [4, 8]})]:
+        pd.testing.assert_frame_equal(cube.query(group_by, filters), direct.query(group_by, filters),
+                                      check_dtype=False)
+
+
+def test_store_is_reused_until_the_csv_changes(csv_path):
+    first = MPGStore.open(csv_path)
+    assert MPGStore.open(csv_path).directory == first.directory
+
+    df = pd.read_csv(csv_path)
+    df.iloc[:10].to_csv(csv_path, index=False)
+    second = MPGStore.open(csv_path)
+    assert second.directory != first.directory
+    assert second.n_rows == 10
+    assert np.array_equal(np.sort(second.read(['hwy'])['hwy']), np.sort(df['hwy'].iloc[:10]))
+    # The previous version survives for readers that still have it open
+    versions = os.listdir(os.path.join(os.path.dirname(csv_path), STORE_DIR, 'mpg'))
+    assert sorted(versions) == sorted(os.path.basename(store.directory) for store in (first, second))
@@ -0,0 +1,78 @@
+"""PagedTable: sort order, filters and pages agree with pandas on the whole frame."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mpg_store import MPGStore
+from paged_table import PagedTable
+
+MPG_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'mpg.csv')
+
+
+@pytest.fixture(scope='module')
+def df():
+    rng = np.random.default_rng(1)
+    n = 1_000
+    frame = pd.DataFrame({
+        'year': rng.choice([1999, 2008], n),
+        'class': rng.choice(['compact', 'suv', 'pickup', 'midsize'], n),
+        'hwy': rng.integers(10, 45, n).astype(float),
+        'displ': rng.normal(3.5, 1.2, n).round(1),
+    })
+    # Missing values sort last in both directions
+    frame.loc[rng.choice(n, 40, replace=False), 'hwy'] = np.nan
+    return frame
+
+
+@pytest.fixture(scope='module')
+def table(df):
+    return PagedTable(df)
+
+
+@pytest.mark.parametrize('column', ['year', 'class', 'hwy', 'displ'])
+@pytest.mark.parametrize('ascending', [True, False])
+def test_sort_matches_sort_values(df, table, column, ascending):
+    rows = table.rows(column, ascending)
+    expected = df.sort_values(column, ascending=ascending, kind='stable', na_position='last')
+    assert np.array_equal(rows, expected.index.to_numpy())
+    # Pages are consecutive slices of the sorted frame
+    size = 100
+    for number in range(0, len(rows) // size + 1):
+        pd.testing.assert_frame_equal(table.page(rows, number, size),
+                                      expected.iloc[number * size:(number + 1) * size])
+
+
+def test_filters_are_pushed_down(df, table):
+    filters = {'class': ['suv', 'pickup'], 'hwy': (15, 25), 'year': []}
+    rows = table.rows('displ', False, filters)
+    mask = df['class'].isin(filters['class']) & df['hwy'].between(15, 25)
+    expected = df[mask].sort_values('displ', ascending=False, kind='stable')
+    assert np.array_equal(rows, expected.index.to_numpy())
+    # Without a sort column the original row order is kept
+    assert np.array_equal(table.rows(filters=filters), np.flatnonzero(mask))
+    # Open-ended ranges and values that do not occur
+    assert np.array_equal(table.rows(filters={'hwy': (None, 20)}), np.flatnonzero(df['hwy'] <= 20))
+    assert len(table.rows(filters={'class': ['van']})) == 0
+
+
+def test_store_pages_match_frame(tmp_path):
+    # The store is converted next to the CSV, so it works on a copy
+    csv_path = tmp_path / 'mpg.csv'
+    shutil.copy(MPG_CSV, csv_path)
+    store = MPGStore.open(str(csv_path))
+    table = PagedTable.from_store(store)
+    df = store.read()
+    assert table.columns == list(df.columns) and table.n_rows == len(df)
+
+    filters = {'class': ['suv', 'compact'], 'hwy': (20, None)}
+    rows = table.rows('displ', False, filters)
+    mask = df['class'].isin(filters['class']) & (df['hwy'] >= 20)
+    expected = df[mask].sort_values('displ', ascending=False, kind='stable')
+    for number in range(3):
+        pd.testing.assert_frame_equal(table.page(rows, number, 25), expected.iloc[number * 25:(number + 1) * 25],
+                                      check_index_type=False)
+    # Only the sorted and filtered columns were indexed
+    assert set(table._indexes) == {'displ', 'class', 'hwy'}
@@ -0,0 +1,380 @@
+"""
+Computergegner für spiel_engine: gelöste Tabelle für 3×3, Alpha-Beta-Suche für größere Bretter.
+
+Kleine Bretter werden einmal vollständig gelöst (geloeste_tabelle): jede erreichbare Stellung,
+reduziert auf ihren Vertreter unter den 8 Brettsymmetrien, bildet auf ihren exakten Wert ab.
+Auf größeren Brettern sucht Gegner per Negamax mit Alpha-Beta und iterativer Vertiefung, bis
+die Bedenkzeit je Zug abgelaufen ist. Stellungen werden über symmetrie-invariante
+Zobrist-Schlüssel in einer LRU-begrenzten Transpositionstabelle wiederverwendet.
+"""
+import random
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from spiel_engine import Spielstand
+
+# Bedenkzeit je Zug in Sekunden und Einträge der Transpositionstabelle
+BEDENKZEIT = 0.3
+TABELLEN_GROESSE = 100_000
+# Bis zu dieser Feldzahl wird das Spiel vollständig gelöst statt durchsucht
+MAX_FELDER_GELOEST = 9
+# Je Knoten werden nur die vielversprechendsten Züge durchsucht
+MAX_KANDIDATEN = 12
+
+GEWINN = 1_000_000
+EXAKT, UNTERGRENZE, OBERGRENZE = 0, 1, 2
+
+# =========================================================================
+# SYMMETRIEN
+# =========================================================================
+
+@lru_cache(maxsize=None)
+def symmetrien(n):
+    """Die 8 Drehungen/Spiegelungen des n×n-Bretts als Feld-Permutationen (Feld -> Bildfeld)."""
+    abbildungen = (
+        lambda z, s: (z, s), lambda z, s: (s, n - 1 - z),
+        lambda z, s: (n - 1 - z, n - 1 - s), lambda z, s: (n - 1 - s, z),
+        lambda z, s: (z, n - 1 - s), lambda z, s: (n - 1 - z, s),
+        lambda z, s: (s, z), lambda z, s: (n - 1 - s, n - 1 - z),
+    )
+    permutationen = []
+    for abbildung in abbildungen:
+        permutation = [0] * (n * n)
+        for feld in range(n * n):
+            zeile, spalte = abbildung(*divmod(feld, n))
+            permutation[feld] = zeile * n + spalte
+        permutationen.append(tuple(permutation))
+    return tuple(permutationen)
+
+def _abbilden(brett, permutation):
+    bild = 0
+    while brett:
+        niedrigstes = brett & -brett
+        bild |= 1 << permutation[niedrigstes.bit_length() - 1]
+        brett ^= niedrigstes
+    return bild
+
+def kanonisch(bretter, n):
+    """Exakter Vertreter einer Stellung unter den 8 Symmetrien (kleinstes Bitboard-Paar)."""
+    return min((_abbilden(bretter[0], p), _abbilden(bretter[1], p)) for p in symmetrien(n))
+
+# =========================================================================
+# GELÖSTE KLEINE BRETTER
+# =========================================================================
+
+@lru_cache(maxsize=None)
+def geloeste_tabelle(spielregeln):
+    """
+    Wert jeder erreichbaren Stellung (kanonisch) für den Spieler am Zug: positiv gewinnt, 0 ist
+    remis. Schnellere Siege und spätere Niederlagen zählen mehr. Für 3×3 sind es 627 Stellungen.
+    """
+    tabelle = {}
+    n = spielregeln.n
+
+    def loese(spiel):
+        schluessel = kanonisch(spiel.bretter, n)
+        wert = tabelle.get(schluessel)
+        if wert is None:
+            wert = max(_zug_wert(spiel, feld, loese) for feld in spiel.freie_felder())
+            tabelle[schluessel] = wert
+        return wert
+
+    loese(Spielstand(spielregeln))
+    return tabelle
+
+def _zug_wert(spiel, feld, kind_wert):
+    """Wert von feld für den ziehenden Spieler; kind_wert bewertet die Folgestellung für den Gegner."""
+    spiel.ziehe(feld)
+    if spiel.gewinner is not None:
+        wert = spiel.regeln.felder + 1 - spiel.zuege
+    elif spiel.beendet:
+        wert = 0
+    else:
+        wert = -kind_wert(spiel)
+    spiel.zuruecknehmen(feld)
+    return wert
+
+# =========================================================================
+# TRANSPOSITIONSTABELLE
+# =========================================================================
+
+def _in_tabelle(wert, ply, sieg_grenze):
+    """
+    Siegwerte (GEWINN - ply des Gewinnzugs, ab sieg_grenze) zählen in der Suche ab der Wurzel,
+    in der Tabelle ab dem Knoten; Bewertungen bleiben unverändert.
+    """
+    if wert >= sieg_grenze:
+        return wert + ply
+    if wert <= -sieg_grenze:
+        return wert - ply
+    return wert
+
+def _aus_tabelle(wert, ply, sieg_grenze):
+    return _in_tabelle(wert, -ply, sieg_grenze)
+
+class Transpositionstabelle:
+    """
+    LRU-begrenzte Tabelle: Schlüssel -> (Tiefe, Wert, Art, kanonischer bester Zug). Siegwerte
+    sind relativ zum Knoten gespeichert, damit sie auch bei anderer Wurzel stimmen.
+    """
+
+    __slots__ = ('max_eintraege', '_eintraege', 'treffer', 'verdraengt')
+
+    def __init__(self, max_eintraege=TABELLEN_GROESSE):
+        self.max_eintraege = max_eintraege
+        self._eintraege = OrderedDict()
+        self.treffer = 0
+        self.verdraengt = 0
+
+    def __len__(self):
+        return len(self._eintraege)
+
+    def hole(self, schluessel):
+        eintrag = self._eintraege.get(schluessel)
+        if eintrag is not None:
+            self._eintraege.move_to_end(schluessel)
+            self.treffer += 1
+        return eintrag
+
+    def speichere(self, schluessel, eintrag):
+        self._eintraege[schluessel] = eintrag
+        self._eintraege.move_to_end(schluessel)
+        if len(self._eintraege) > self.max_eintraege:
+            self._eintraege.popitem(last=False)
+            self.verdraengt += 1
+
+# =========================================================================
+# SUCHE
+# =========================================================================
+
+class _Zeitueberschreitung(Exception):
+    pass
+
+class Gegner:
+    """
+    Computergegner für eine Regel-Variante. Die Transpositionstabelle bleibt über die Züge einer
+    Partie und über weitere Partien derselben Variante erhalten.
+    """
+
+    __slots__ = ('regeln', 'bedenkzeit', 'tabelle', 'knoten', 'tiefe', '_zobrist', '_symmetrien',
+                 '_gewichte', '_linker_rand', '_rechter_rand', '_spiel', '_hashes', '_wert', '_frist')
+
+    def __init__(self, spielregeln, bedenkzeit=BEDENKZEIT, tabellen_groesse=TABELLEN_GROESSE, seed=0):
+        self.regeln = spielregeln
+        self.bedenkzeit = bedenkzeit
+        self.tabelle = Transpositionstabelle(tabellen_groesse)
+        self.knoten = 0
+        self.tiefe = 0
+        n = spielregeln.n
+        zufall = random.Random(seed)
+        self._zobrist = [[zufall.getrandbits(64) for _ in range(spielregeln.felder)] for _ in range(2)]
+        self._symmetrien = symmetrien(n)
+        # Gewicht einer Linie mit i Steinen eines Spielers und keinem des anderen
+        self._gewichte = [0] + [10 ** i for i in range(spielregeln.k)]
+        self._linker_rand = sum(1 << (zeile * n) for zeile in range(n))
+        self._rechter_rand = self._linker_rand << (n - 1)
+        self._spiel = None
+
+    def waehle_zug(self, spiel):
+        """Bester gefundener Zug (Feldindex) für den Spieler am Zug einer laufenden Partie."""
+        if self.regeln.felder <= MAX_FELDER_GELOEST:
+            return self._zug_aus_tabelle(spiel)
+        n = self.regeln.n
+        if not spiel.zuege:
+            return (n // 2) * n + n // 2
+
+        self._vorbereiten(spiel)
+        try:
+            kandidaten, _ = self._kandidaten()
+            zwang = self._erzwungener_zug(kandidaten)
+            if zwang is not None:
+                self.tiefe = 0
+                return zwang
+            return self._vertiefen(kandidaten)
+        finally:
+            self._spiel = None
+
+    def _zug_aus_tabelle(self, spiel):
+        tabelle = geloeste_tabelle(self.regeln)
+        n = self.regeln.n
+        spiel = spiel.kopie()
+        return max(spiel.freie_felder(),
+                   key=lambda feld: _zug_wert(spiel, feld, lambda kind: tabelle[kanonisch(kind.bretter, n)]))
+
+    def _vorbereiten(self, spiel):
+        self._spiel = spiel.kopie()
+        self._frist = time.perf_counter() + self.bedenkzeit
+        self._hashes = [0] * 8
+        for spieler in (0, 1):
+            for feld in range(self.regeln.felder):
+                if spiel.bretter[spieler] >> feld & 1:
+                    self._hash_setzen(spieler, feld)
+        self._wert = sum(self._linien_wert(maske) for maske in self.regeln.gewinn_masken)
+
+    def _erzwungener_zug(self, kandidaten):
+        """Eigener Gewinnzug, sonst das einzige Feld, das einen gegnerischen Gewinn verhindert."""
+        spiel = self._spiel
+        eigene, fremde = spiel.bretter[spiel.am_zug], spiel.bretter[spiel.am_zug ^ 1]
+        abwehr = []
+        for feld in kandidaten:
+            bit = 1 << feld
+            for maske in self.regeln.masken_je_feld[feld]:
+                if (eigene | bit) & maske == maske:
+                    return feld
+                if (fremde | bit) & maske == maske:
+                    abwehr.append(feld)
+                    break
+        return abwehr[0] if len(abwehr) == 1 else None
+
+    def _vertiefen(self, kandidaten):
+        """Iterative Vertiefung, bis die Bedenkzeit abläuft oder ein Sieg/Verlust feststeht."""
+        bester_zug = kandidaten[0]
+        for tiefe in range(1, self.regeln.felder - self._spiel.zuege + 1):
+            try:
+                wert, zug = self._wurzel(tiefe, kandidaten)
+            except _Zeitueberschreitung:
+                break
+            bester_zug, self.tiefe = zug, tiefe
+            if abs(wert) >= GEWINN - self.regeln.felder:
+                break
+            # Der beste Zug der letzten Iteration wird zuerst durchsucht
+            kandidaten = [zug] + [feld for feld in kandidaten if feld != zug]
+        return bester_zug
+
+    # --- Inkrementeller Zustand: Zobrist-Schlüssel je Symmetrie und Bewertung ---
+
+    def _hash_setzen(self, spieler, feld):
+        zobrist = self._zobrist[spieler]
+        hashes = self._hashes
+        for i, permutation in enumerate(self._symmetrien):
+            hashes[i] ^= zobrist[permutation[feld]]
+
+    def _schluessel(self):
+        """Symmetrie-invarianter Schlüssel (kleinster der 8 Hashes) und die Symmetrie, die ihn liefert."""
+        hashes = self._hashes
+        symmetrie = min(range(8), key=hashes.__getitem__)
+        return hashes[symmetrie], symmetrie
+
+    def _linien_wert(self, maske):
+        """Beitrag einer Gewinnlinie aus Sicht von X; Linien mit Steinen beider Spieler zählen nicht."""
+        x = (self._spiel.bretter[0] & maske).bit_count()
+        o = (self._spiel.bretter[1] & maske).bit_count()
+        if x and o:
+            return 0
+        return self._gewichte[x] - self._gewichte[o]
+
+    def _ziehe(self, feld):
+        masken = self.regeln.masken_je_feld[feld]
+        vorher = sum(self._linien_wert(maske) for maske in masken)
+        spieler = self._spiel.am_zug
+        self._spiel.ziehe(feld)
+        self._hash_setzen(spieler, feld)
+        self._wert += sum(self._linien_wert(maske) for maske in masken) - vorher
+
+    def _nimm_zurueck(self, feld):
+        masken = self.regeln.masken_je_feld[feld]
+        vorher = sum(self._linien_wert(maske) for maske in masken)
+        self._spiel.zuruecknehmen(feld)
+        self._hash_setzen(self._spiel.am_zug, feld)
+        self._wert += sum(self._linien_wert(maske) for maske in masken) - vorher
+
+    # --- Zuggenerierung ---
+
+    def _nachbarn(self, belegt):
+        """Freie Felder, die an einen Stein grenzen (auch diagonal)."""
+        n = self.regeln.n
+        waagerecht = belegt | ((belegt & ~self._rechter_rand) << 1) | ((belegt & ~self._linker_rand) >> 1)
+        umgebung = waagerecht | (waagerecht << n) | (waagerecht >> n)
+        return umgebung & self.regeln.voll & ~belegt
+
+    def _zug_nutzen(self, feld):
+        """Schätzung für die Zugsortierung: eigene Linien ausbauen und gegnerische blockieren."""
+        spiel = self._spiel
+        eigene, fremde = spiel.bretter[spiel.am_zug], spiel.bretter[spiel.am_zug ^ 1]
+        nutzen = 0
+        for maske in self.regeln.masken_je_feld[feld]:
+            if not fremde & maske:
+                nutzen += self._gewichte[(eigene & maske).bit_count() + 1]
+            elif not eigene & maske:
+                nutzen += self._gewichte[(fremde & maske).bit_count()]
+        return nutzen
+
+    def _kandidaten(self, tabellen_zug=None):
+        """Züge in Suchreihenfolge und ob Züge über MAX_KANDIDATEN hinaus weggefallen sind."""
+        spiel = self._spiel
+        frei = self._nachbarn(spiel.belegt) or spiel.frei
+        felder = []
+        while frei:
+            niedrigstes = frei & -frei
+            felder.append(niedrigstes.bit_length() - 1)
+            frei ^= niedrigstes
+        felder.sort(key=self._zug_nutzen, reverse=True)
+        gekuerzt = len(felder) > MAX_KANDIDATEN
+        felder = felder[:MAX_KANDIDATEN]
+        if tabellen_zug is not None and not spiel.belegt >> tabellen_zug & 1:
+            felder = [tabellen_zug] + [feld for feld in felder if feld != tabellen_zug]
+        return felder, gekuerzt
+
+    # --- Negamax mit Alpha-Beta ---
+
+    def _wurzel(self, tiefe, kandidaten):
+        alpha, bester_zug = -GEWINN - 1, kandidaten[0]
+        for feld in kandidaten:
+            wert = self._kind(feld, tiefe, alpha, GEWINN + 1, 1)
+            if wert > alpha:
+                alpha, bester_zug = wert, feld
+        return alpha, bester_zug
+
+    def _kind(self, feld, tiefe, alpha, beta, ply):
+        """Wert des Zugs feld aus Sicht des ziehenden Spielers."""
+        self._ziehe(feld)
+        spiel = self._spiel
+        try:
+            if spiel.gewinner is not None:
+                return GEWINN - ply
+            if spiel.beendet:
+                return 0
+            return -self._negamax(tiefe - 1, -beta, -alpha, ply + 1)
+        finally:
+            self._nimm_zurueck(feld)
+
+    def _negamax(self, tiefe, alpha, beta, ply):
+        self.knoten += 1
+        if self.knoten & 255 == 0 and time.perf_counter() > self._frist:
+            raise _Zeitueberschreitung
+        if tiefe == 0:
+            return self._wert if self._spiel.am_zug == 0 else -self._wert
+
+        schluessel, symmetrie = self._schluessel()
+        permutation = self._symmetrien[symmetrie]
+        sieg_grenze = GEWINN - self.regeln.felder
+        eintrag = self.tabelle.hole(schluessel)
+        tabellen_zug = None
+        if eintrag is not None:
+            e_tiefe, e_wert, art, kanonischer_zug = eintrag
+            e_wert = _aus_tabelle(e_wert, ply, sieg_grenze)
+            if e_tiefe >= tiefe and (art == EXAKT or (art == UNTERGRENZE and e_wert >= beta)
+                                     or (art == OBERGRENZE and e_wert <= alpha)):
+                return e_wert
+            tabellen_zug = permutation.index(kanonischer_zug)
+
+        alpha_start, bester_wert, bester_zug = alpha, -GEWINN - 1, None
+        kandidaten, gekuerzt = self._kandidaten(tabellen_zug)
+        for feld in kandidaten:
+            wert = self._kind(feld, tiefe, alpha, beta, ply)
+            if wert > bester_wert:
+                bester_wert, bester_zug = wert, feld
+            if wert > alpha:
+                alpha = wert
+                if alpha >= beta:
+                    break
+
+        if gekuerzt:
+            # Nur ein Teil der Züge wurde durchsucht: der Wert ist keine exakte Stellungsbewertung
+            art = UNTERGRENZE if bester_wert >= beta else OBERGRENZE
+        else:
+            art = OBERGRENZE if bester_wert <= alpha_start else UNTERGRENZE if bester_wert >= beta else EXAKT
+        eintrag = (tiefe, _in_tabelle(bester_wert, ply, sieg_grenze), art, permutation[bester_zug])
+        self.tabelle.speichere(schluessel, eintrag)
+        return bester_wert
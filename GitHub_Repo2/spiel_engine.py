@@ -0,0 +1,169 @@
+"""
+Spielzustand für Tic-Tac-Toe und allgemein k in einer Reihe auf einem N×N-Brett.
+
+Jeder Spieler belegt die Bits eines Integers (Feld = zeile * n + spalte). Alle Gewinnlinien
+sind als Bitmasken vorberechnet und je Feld abgelegt: Nach einem Zug werden nur die Linien
+durch dieses Feld geprüft. Züge lassen sich zurücknehmen, damit Suche und Simulation auf
+einem einzigen Spielstand arbeiten können. Der Verlauf (gesetzte Felder in Zugreihenfolge)
+wird mitgeführt, damit fertige Partien protokolliert werden können.
+"""
+from functools import lru_cache
+
+LEER = ' '
+SPIELER = ('X', 'O')
+
+# Richtungen einer Linie als (Zeilen-, Spaltenschritt): waagerecht, senkrecht, beide Diagonalen
+RICHTUNGEN = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# =========================================================================
+# REGELN (BRETTGRÖSSE, GEWINNLÄNGE, GEWINNMASKEN)
+# =========================================================================
+
+class Regeln:
+    """Unveränderliche Spielregeln mit den vorberechneten Gewinnmasken; über regeln() geteilt."""
+
+    __slots__ = ('n', 'k', 'felder', 'voll', 'gewinn_masken', 'masken_je_feld')
+
+    def __init__(self, n=3, k=None):
+        k = n if k is None else k
+        if n < 1 or not 1 <= k <= n:
+            raise ValueError(f"Ungültige Regeln: {n}×{n}-Brett mit {k} in einer Reihe")
+        self.n = n
+        self.k = k
+        self.felder = n * n
+        self.voll = (1 << self.felder) - 1
+
+        masken = []
+        for zeile in range(n):
+            for spalte in range(n):
+                for dz, ds in RICHTUNGEN:
+                    end_zeile, end_spalte = zeile + dz * (k - 1), spalte + ds * (k - 1)
+                    if 0 <= end_zeile < n and 0 <= end_spalte < n:
+                        masken.append(sum(1 << ((zeile + dz * i) * n + spalte + ds * i) for i in range(k)))
+        self.gewinn_masken = tuple(masken)
+        self.masken_je_feld = tuple(
+            tuple(maske for maske in masken if maske >> feld & 1) for feld in range(self.felder)
+        )
+
+    def __repr__(self):
+        return f"Regeln(n={self.n}, k={self.k})"
+
+@lru_cache(maxsize=None)
+def regeln(n=3, k=None):
+    """Geteilte Regeln je (n, k); die Masken werden nur einmal berechnet."""
+    return Regeln(n, k)
+
+# =========================================================================
+# SPIELSTAND
+# =========================================================================
+
+class Spielstand:
+    """
+    Brett als zwei Bitboards (X, O) plus Spieler am Zug, Zugzahl, Gewinner und Verlauf.
+
+    gewinner ist None, solange niemand gewonnen hat, sonst 0 (X) oder 1 (O). Nach Spielende
+    werden keine Züge mehr angenommen.
+    """
+
+    __slots__ = ('regeln', 'bretter', 'am_zug', 'zuege', 'gewinner', 'verlauf')
+
+    def __init__(self, spielregeln=None):
+        self.regeln = spielregeln or regeln()
+        self.bretter = [0, 0]
+        self.am_zug = 0
+        self.zuege = 0
+        self.gewinner = None
+        self.verlauf = []
+
+    @classmethod
+    def neu(cls, n=3, k=None):
+        return cls(regeln(n, k))
+
+    def kopie(self):
+        neu = Spielstand.__new__(Spielstand)
+        neu.regeln = self.regeln
+        neu.bretter = self.bretter[:]
+        neu.am_zug = self.am_zug
+        neu.zuege = self.zuege
+        neu.gewinner = self.gewinner
+        neu.verlauf = self.verlauf[:]
+        return neu
+
+    # --- Abfragen ---
+
+    @property
+    def belegt(self):
+        return self.bretter[0] | self.bretter[1]
+
+    @property
+    def frei(self):
+        """Bitmaske der freien Felder."""
+        return self.regeln.voll & ~(self.bretter[0] | self.bretter[1])
+
+    @property
+    def beendet(self):
+        return self.gewinner is not None or self.zuege == self.regeln.felder
+
+    @property
+    def unentschieden(self):
+        return self.gewinner is None and self.zuege == self.regeln.felder
+
+    def freie_felder(self):
+        """Indizes der freien Felder in aufsteigender Reihenfolge."""
+        frei = self.frei
+        felder = []
+        while frei:
+            niedrigstes = frei & -frei
+            felder.append(niedrigstes.bit_length() - 1)
+            frei ^= niedrigstes
+        return felder
+
+    def feld(self, zeile, spalte):
+        """' ', 'X' oder 'O' für die Anzeige."""
+        bit = 1 << (zeile * self.regeln.n + spalte)
+        if self.bretter[0] & bit:
+            return SPIELER[0]
+        if self.bretter[1] & bit:
+            return SPIELER[1]
+        return LEER
+
+    def spieler_am_zug(self):
+        return SPIELER[self.am_zug]
+
+    # --- Züge ---
+
+    def ziehe(self, feld):
+        """
+        Setzt für den Spieler am Zug auf feld. Liefert False, wenn das Feld belegt oder das
+        Spiel beendet ist. Gewinnt der Zug, bleibt der Gewinner am Zug, sonst wechselt der Spieler.
+        """
+        bit = 1 << feld
+        if self.gewinner is not None or (self.bretter[0] | self.bretter[1]) & bit:
+            return False
+        brett = self.bretter[self.am_zug] | bit
+        self.bretter[self.am_zug] = brett
+        self.zuege += 1
+        self.verlauf.append(feld)
+        for maske in self.regeln.masken_je_feld[feld]:
+            if brett & maske == maske:
+                self.gewinner = self.am_zug
+                return True
+        self.am_zug ^= 1
+        return True
+
+    def ziehe_rc(self, zeile, spalte):
+        return self.ziehe(zeile * self.regeln.n + spalte)
+
+    def zuruecknehmen(self, feld):
+        """Nimmt den letzten Zug (auf feld) zurück; für Suche und Simulation."""
+        if self.gewinner is None:
+            self.am_zug ^= 1
+        self.gewinner = None
+        self.bretter[self.am_zug] &= ~(1 << feld)
+        self.zuege -= 1
+        self.verlauf.pop()
+
+    def __repr__(self):
+        n = self.regeln.n
+        zeilen = [''.join(self.feld(zeile, spalte).replace(LEER, '.') for spalte in range(n)) for zeile in range(n)]
+        return f"Spielstand({self.regeln!r}, am_zug={self.spieler_am_zug()!r})\n" + '\n'.join(zeilen)
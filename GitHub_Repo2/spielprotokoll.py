@@ -0,0 +1,224 @@
+"""
+Append-only Binärprotokoll fertiger Partien mit Nachspielen und Eröffnungsstatistik.
+
+Je Variante (n, k) gibt es eine Datei: ein Kopf von 16 Bytes, dann Sätze fester Größe. Auf
+Brettern bis 9 Feldern ist ein Satz ein einziges uint64 (Bits 0-3 Zugzahl, 4-5 Ergebnis, ab Bit 8
+je Zug 4 Bit Feldindex); größere Bretter speichern Zugzahl, Ergebnis und die Zugfolge als
+gepacktes uint8-Array. Sätze werden mit einem einzigen write() angehängt; ein bei einem Absturz
+nur teilweise geschriebener letzter Satz wird vor dem nächsten Anhängen abgeschnitten und beim
+Lesen übergangen. Gelesen wird über np.memmap in Blöcken, sodass Statistiken über Millionen
+Partien keine Python-Objekte je Partie anlegen.
+"""
+import os
+import struct
+import threading
+
+import numpy as np
+import streamlit as st
+
+from spiel_engine import LEER, SPIELER, Spielstand
+
+PROTOKOLL_VERZEICHNIS = os.path.join(os.path.dirname(__file__), "protokolle")
+# Überschreibt das Verzeichnis, z. B. damit Benchmarks und Tests die echten Protokolle nicht füllen
+UMGEBUNGSVARIABLE = 'SPIELPROTOKOLL_VERZEICHNIS'
+MAGIC = b'TTTPROT1'
+# Magic, n, k, Satzgröße, reserviert
+KOPF = struct.Struct('<8sBBH4x')
+MAX_FELDER_GEPACKT = 9
+# Gelesen wird in Blöcken dieser Größe der Datei; entpackt werden nur die benötigten Züge
+BLOCK_BYTES = 2**24
+
+# Ergebniscodes je Partie
+SIEG_X, SIEG_O, REMIS = 0, 1, 2
+ERGEBNISSE = ("Sieg X", "Sieg O", "Remis")
+
+def _satz_typ(spielregeln):
+    if spielregeln.felder <= MAX_FELDER_GEPACKT:
+        return np.dtype('<u8')
+    feld_typ = 'u1' if spielregeln.felder <= 256 else '<u2'
+    return np.dtype([('laenge', '<u2'), ('ergebnis', 'u1'), ('zuege', feld_typ, (spielregeln.felder,))])
+
+def protokoll_pfad(spielregeln, verzeichnis=None):
+    if verzeichnis is None:
+        verzeichnis = os.environ.get(UMGEBUNGSVARIABLE) or PROTOKOLL_VERZEICHNIS
+    n, k = spielregeln.n, spielregeln.k
+    return os.path.join(verzeichnis, f"partien_{n}x{n}_{k}.bin")
+
+class Spielprotokoll:
+    """Protokolldatei einer Regel-Variante; threadsicher für Anhängen und Lesen."""
+
+    def __init__(self, spielregeln, pfad=None):
+        self.regeln = spielregeln
+        self.pfad = pfad or protokoll_pfad(spielregeln)
+        self.satz_typ = _satz_typ(spielregeln)
+        self._lock = threading.Lock()
+        self._saetze = None
+        kopf = KOPF.pack(MAGIC, spielregeln.n, spielregeln.k, self.satz_typ.itemsize)
+
+        os.makedirs(os.path.dirname(self.pfad) or '.', exist_ok=True)
+        try:
+            with open(self.pfad, 'xb') as f:
+                f.write(kopf)
+        except FileExistsError:
+            with open(self.pfad, 'rb') as f:
+                vorhanden = f.read(KOPF.size)
+            if vorhanden != kopf:
+                raise ValueError(f"{self.pfad} ist kein Protokoll für {spielregeln!r}")
+
+    def __len__(self):
+        # Ganze Sätze; ein gerade oder unvollständig geschriebener letzter Satz zählt nicht mit
+        return (os.path.getsize(self.pfad) - KOPF.size) // self.satz_typ.itemsize
+
+    # --- Schreiben ---
+
+    def _ganze_saetze(self, fd):
+        """Kürzt die Datei auf ganze Sätze, damit neue Sätze nicht versetzt angehängt werden."""
+        groesse = os.fstat(fd).st_size
+        rest = (groesse - KOPF.size) % self.satz_typ.itemsize
+        if rest:
+            os.ftruncate(fd, groesse - rest)
+
+    def _satz(self, spiel):
+        ergebnis = REMIS if spiel.gewinner is None else spiel.gewinner
+        if self.satz_typ.names is None:
+            wert = len(spiel.verlauf) | ergebnis << 4
+            for i, feld in enumerate(spiel.verlauf):
+                wert |= feld << (8 + 4 * i)
+            return np.array([wert], dtype=self.satz_typ)
+        satz = np.zeros(1, dtype=self.satz_typ)
+        satz['laenge'] = len(spiel.verlauf)
+        satz['ergebnis'] = ergebnis
+        satz['zuege'][0, :len(spiel.verlauf)] = spiel.verlauf
+        return satz
+
+    def anhaengen(self, spiel):
+        """
+        Hängt eine beendete Partie an; der Satz wird mit einem einzigen write() geschrieben. Ein
+        unvollständiger letzter Satz (Absturz während eines früheren write()) wird vorher entfernt.
+        """
+        if not spiel.beendet:
+            raise ValueError("Nur beendete Partien werden protokolliert")
+        daten = self._satz(spiel).tobytes()
+        with self._lock:
+            fd = os.open(self.pfad, os.O_WRONLY | os.O_APPEND)
+            try:
+                self._ganze_saetze(fd)
+                os.write(fd, daten)
+            finally:
+                os.close(fd)
+
+    # --- Lesen ---
+
+    def saetze(self):
+        """Alle vollständigen Sätze als np.memmap; wird nur bei gewachsener Datei neu abgebildet."""
+        anzahl = len(self)
+        with self._lock:
+            if self._saetze is None or len(self._saetze) != anzahl:
+                self._saetze = (np.memmap(self.pfad, dtype=self.satz_typ, mode='r', offset=KOPF.size, shape=(anzahl,))
+                                if anzahl else np.empty(0, dtype=self.satz_typ))
+            return self._saetze
+
+    def _entpacke(self, saetze, zuege_bis=None):
+        """
+        (Zugzahl, Ergebnis, Zugfolge je Zeile) eines Blocks als int-Arrays; von der Zugfolge nur
+        die ersten zuege_bis Züge, damit große Bretter nicht die ganze Matrix verbreitern.
+        """
+        zuege_bis = self.regeln.felder if zuege_bis is None else zuege_bis
+        if self.satz_typ.names is None:
+            laenge = (saetze & 0xF).astype(np.int64)
+            ergebnis = (saetze >> 4 & 0x3).astype(np.int64)
+            verschiebung = (8 + 4 * np.arange(zuege_bis)).astype(np.uint64)
+            zuege = (saetze[:, None] >> verschiebung & np.uint64(0xF)).astype(np.int64)
+            return laenge, ergebnis, zuege
+        return (saetze['laenge'].astype(np.int64), saetze['ergebnis'].astype(np.int64),
+                saetze['zuege'][:, :zuege_bis].astype(np.int64))
+
+    def partie(self, index):
+        """Zugfolge und Ergebnis der Partie index."""
+        laenge, ergebnis, zuege = self._entpacke(np.asarray(self.saetze()[index:index + 1]))
+        return zuege[0, :laenge[0]].tolist(), int(ergebnis[0])
+
+    def nachspielen(self, index, schritt):
+        """Spielstand der Partie index nach schritt Zügen."""
+        verlauf, _ = self.partie(index)
+        spiel = Spielstand(self.regeln)
+        for feld in verlauf[:schritt]:
+            spiel.ziehe(feld)
+        return spiel
+
+    def statistik(self, spiel=None):
+        """
+        Ergebnisse aller Partien, die die Stellung von spiel erreicht haben (ohne spiel: alle), in
+        beliebiger Zugreihenfolge. Liefert (Summe je Ergebnis, Ergebnisse je nächstem Zug als
+        Matrix Feld × Ergebnis); von der Anfangsstellung aus ist das die Statistik je Eröffnungszug.
+        """
+        felder = self.regeln.felder
+        schritt = 0 if spiel is None else spiel.zuege
+        ziel = np.zeros((2, felder), dtype=bool)
+        if spiel is not None:
+            for spieler in (0, 1):
+                ziel[spieler] = [spiel.bretter[spieler] >> feld & 1 for feld in range(felder)]
+
+        gesamt = np.zeros(3, dtype=np.int64)
+        je_zug = np.zeros(felder * 3, dtype=np.int64)
+        saetze = self.saetze()
+        block = max(1, BLOCK_BYTES // self.satz_typ.itemsize)
+        # Gebraucht werden die Züge bis zur Stellung und der nächste Zug
+        zuege_bis = min(schritt + 1, felder)
+        for start in range(0, len(saetze), block):
+            laenge, ergebnis, zuege = self._entpacke(np.asarray(saetze[start:start + block]), zuege_bis)
+            # Die Züge sind verschieden: gleiche Felder je Spieler heißt gleiche Stellung
+            erreicht = (laenge >= schritt) & ziel[0][zuege[:, 0:schritt:2]].all(axis=1) \
+                & ziel[1][zuege[:, 1:schritt:2]].all(axis=1)
+            gesamt += np.bincount(ergebnis[erreicht], minlength=3)
+            weiter = erreicht & (laenge > schritt)
+            if schritt < felder:
+                je_zug += np.bincount(zuege[weiter, schritt] * 3 + ergebnis[weiter], minlength=felder * 3)
+        return gesamt, je_zug.reshape(felder, 3)
+
+# =========================================================================
+# STREAMLIT-ANBINDUNG
+# =========================================================================
+
+def _brett_text(spiel):
+    n = spiel.regeln.n
+    return '\n'.join(' '.join(spiel.feld(zeile, spalte).replace(LEER, '·') for spalte in range(n))
+                     for zeile in range(n))
+
+def nachspiel_ansicht(protokoll):
+    """Partie aus dem Protokoll Zug für Zug nachspielen, mit der Statistik der gezeigten Stellung."""
+    anzahl = len(protokoll)
+    if not anzahl:
+        st.info("Für diese Variante wurden noch keine Partien protokolliert.")
+        return
+
+    nummer = st.number_input("Partie", min_value=1, max_value=anzahl, value=anzahl, key='protokoll_partie')
+    verlauf, ergebnis = protokoll.partie(nummer - 1)
+    # Ein Slider für alle Partien; beim Wechsel der Partie springt er an deren Ende
+    if st.session_state.get('protokoll_schritt_partie') != (protokoll.pfad, nummer):
+        st.session_state.protokoll_schritt_partie = (protokoll.pfad, nummer)
+        st.session_state.protokoll_schritt = len(verlauf)
+    schritt = st.slider("Zug", 0, len(verlauf), key='protokoll_schritt')
+    spiel = protokoll.nachspielen(nummer - 1, schritt)
+    st.caption(f"Partie {nummer} von {anzahl}: {len(verlauf)} Züge, {ERGEBNISSE[ergebnis]}")
+    st.code(_brett_text(spiel), language=None)
+
+    gesamt, je_zug = protokoll.statistik(spiel)
+    summe = gesamt.sum()
+    st.markdown(f"**{summe} protokollierte Partien** erreichten diese Stellung: "
+                + ", ".join(f"{name} {wert / summe:.0%}" for name, wert in zip(ERGEBNISSE, gesamt)))
+    gespielt = np.flatnonzero(je_zug.sum(axis=1))
+    if len(gespielt) and not spiel.beendet:
+        partien = je_zug[gespielt].sum(axis=1)
+        reihenfolge = np.argsort(-partien, kind='stable')
+        gespielt, partien = gespielt[reihenfolge], partien[reihenfolge]
+        n = spiel.regeln.n
+        tabelle = {
+            'Zug': [f"{SPIELER[spiel.am_zug]} auf Zeile {feld // n + 1}, Spalte {feld % n + 1}" for feld in gespielt],
+            'Partien': partien,
+            **{name: je_zug[gespielt, i] / partien * 100 for i, name in enumerate(ERGEBNISSE)},
+        }
+        st.dataframe(tabelle, hide_index=True, use_container_width=True, column_config={
+            name: st.column_config.ProgressColumn(name, format='%.0f %%', min_value=0, max_value=100)
+            for name in ERGEBNISSE
+        })
@@ -0,0 +1,250 @@
+"""
+Prozessweite Spielräume, in denen zwei Streamlit-Sessions gegeneinander spielen.
+
+Ein Raum besteht nur aus seinem Code, dem Spielstand (zwei Bitboards), den Sitzungs-IDs der
+beiden Spieler, einer Versionsnummer und dem Zeitpunkt der letzten Aktivität; tausende Räume
+passen so in wenige MB. Alle Zugriffe laufen über einen Lock; warte() blockiert auf einer
+Condition des Raums, bis sich seine Version ändert. Eine Sitzung ohne eigenen Zug vergleicht die
+Version in einem Fragment mit run_every und rendert nur nach einer Änderung neu. Räume ohne Aktivität werden nach MAX_LEERLAUF_S geschlossen. Die Funktionen am Ende binden die
+Räume an eine Streamlit-Sitzung an.
+"""
+import secrets
+import threading
+import time
+
+import streamlit as st
+
+from spiel_engine import Spielstand
+
+# Ohne leicht verwechselbare Zeichen (0/O, 1/I)
+CODE_ZEICHEN = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CODE_LAENGE = 5
+MAX_RAEUME = 10_000
+MAX_LEERLAUF_S = 30 * 60
+AUFRAEUM_INTERVALL_S = 60
+# Abstand der Prüfungen auf Änderungen im Raum: kurz, solange der Gegner am Zug ist, länger
+# für Zuschauer und für einen Raum, in dem noch ein Platz frei ist
+PRUEF_INTERVALL_S = 1.0
+BEOBACHT_INTERVALL_S = 5.0
+
+class Raum:
+    """Ein Spielraum; die Condition entsteht erst, wenn jemand auf eine Änderung wartet."""
+
+    __slots__ = ('code', 'spiel', 'spieler', 'version', 'aktiv', 'bedingung', 'wartende')
+
+    def __init__(self, code, spielregeln, sitzung):
+        self.code = code
+        self.spiel = Spielstand(spielregeln)
+        # Sitzungs-IDs für X und O; None ist ein freier Platz
+        self.spieler = [sitzung, None]
+        self.version = 0
+        self.aktiv = time.monotonic()
+        self.bedingung = None
+        self.wartende = 0
+
+class Raumverwaltung:
+    """Threadsicherer Speicher aller Räume eines Server-Prozesses."""
+
+    def __init__(self, max_raeume=MAX_RAEUME, max_leerlauf_s=MAX_LEERLAUF_S):
+        self.max_raeume = max_raeume
+        self.max_leerlauf_s = max_leerlauf_s
+        self._raeume = {}
+        self._lock = threading.Lock()
+        self._aufgeraeumt = time.monotonic()
+        self.geschlossen = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._raeume)
+
+    # --- Intern (Lock gehalten) ---
+
+    def _geaendert(self, raum):
+        raum.version += 1
+        raum.aktiv = time.monotonic()
+        if raum.bedingung is not None:
+            raum.bedingung.notify_all()
+
+    def _schliessen(self, raum):
+        del self._raeume[raum.code]
+        self.geschlossen += 1
+        # Wartende wecken, damit sie den geschlossenen Raum bemerken
+        self._geaendert(raum)
+
+    def _aufraeumen(self, erzwingen=False):
+        jetzt = time.monotonic()
+        if not erzwingen and jetzt - self._aufgeraeumt < AUFRAEUM_INTERVALL_S:
+            return
+        self._aufgeraeumt = jetzt
+        grenze = jetzt - self.max_leerlauf_s
+        for raum in [raum for raum in self._raeume.values() if raum.aktiv < grenze]:
+            self._schliessen(raum)
+
+    # --- Räume ---
+
+    def eroeffne(self, spielregeln, sitzung):
+        """Eröffnet einen Raum, in dem sitzung X spielt, und liefert seinen Code."""
+        with self._lock:
+            self._aufraeumen(erzwingen=len(self._raeume) >= self.max_raeume)
+            if len(self._raeume) >= self.max_raeume:
+                raise RuntimeError("Zu viele offene Spielräume, bitte später erneut versuchen")
+            code = None
+            while code is None or code in self._raeume:
+                code = ''.join(secrets.choice(CODE_ZEICHEN) for _ in range(CODE_LAENGE))
+            self._raeume[code] = Raum(code, spielregeln, sitzung)
+            return code
+
+    def trete_bei(self, code, sitzung):
+        """
+        Setzt sitzung auf ihren bisherigen oder einen freien Platz. Liefert 0 (X) oder 1 (O),
+        None, wenn der Raum voll ist (Zuschauer), und löst KeyError aus, wenn es ihn nicht gibt.
+        """
+        with self._lock:
+            self._aufraeumen()
+            raum = self._raeume[code]
+            if sitzung in raum.spieler:
+                return raum.spieler.index(sitzung)
+            if None not in raum.spieler:
+                return None
+            platz = raum.spieler.index(None)
+            raum.spieler[platz] = sitzung
+            self._geaendert(raum)
+            return platz
+
+    def verlasse(self, code, sitzung):
+        """Gibt den Platz von sitzung frei; ein leerer Raum wird geschlossen."""
+        with self._lock:
+            raum = self._raeume.get(code)
+            if raum is None or sitzung not in raum.spieler:
+                return
+            raum.spieler[raum.spieler.index(sitzung)] = None
+            if raum.spieler == [None, None]:
+                self._schliessen(raum)
+            else:
+                self._geaendert(raum)
+
+    def stand(self, code):
+        """Momentaufnahme (Spielstand-Kopie, Spieler-IDs, Version) oder None, wenn der Raum fehlt."""
+        with self._lock:
+            raum = self._raeume.get(code)
+            if raum is None:
+                return None
+            return raum.spiel.kopie(), tuple(raum.spieler), raum.version
+
+    # --- Spiel ---
+
+    def ziehe(self, code, sitzung, feld):
+        """
+        Zug von sitzung auf feld; nur wenn beide Plätze besetzt sind und sitzung am Zug ist.
+        Liefert None, wenn der Zug nicht gilt, sonst (beendet, Spielstand-Kopie). beendet ist
+        True, wenn genau dieser Zug die Partie beendet hat; Kopie und Flag stammen aus demselben
+        kritischen Abschnitt wie der Zug.
+        """
+        with self._lock:
+            raum = self._raeume.get(code)
+            if raum is None or None in raum.spieler or raum.spieler[raum.spiel.am_zug] != sitzung:
+                return None
+            if not raum.spiel.ziehe(feld):
+                return None
+            self._geaendert(raum)
+            return raum.spiel.beendet, raum.spiel.kopie()
+
+    def neues_spiel(self, code, sitzung):
+        """
+        Startet im Raum eine neue Partie; die Spieler tauschen dabei X und O. Hat der Mitspieler
+        schon eine neue Partie begonnen, bleibt es bei dieser.
+        """
+        with self._lock:
+            raum = self._raeume.get(code)
+            if raum is None or sitzung not in raum.spieler or not raum.spiel.beendet:
+                return
+            raum.spiel = Spielstand(raum.spiel.regeln)
+            raum.spieler.reverse()
+            self._geaendert(raum)
+
+    def warte(self, code, version, timeout):
+        """
+        Blockiert, bis sich der Raum gegenüber version ändert oder timeout Sekunden vergehen.
+        Liefert True bei einer Änderung (auch wenn der Raum geschlossen wurde); mit timeout 0
+        wird nur verglichen.
+        """
+        with self._lock:
+            raum = self._raeume.get(code)
+            if raum is None or raum.version != version:
+                return True
+            if timeout <= 0:
+                return False
+            if raum.bedingung is None:
+                raum.bedingung = threading.Condition(self._lock)
+            raum.wartende += 1
+            try:
+                raum.bedingung.wait_for(lambda: raum.version != version, timeout)
+            finally:
+                raum.wartende -= 1
+                if not raum.wartende:
+                    raum.bedingung = None
+            return raum.version != version
+
+# =========================================================================
+# STREAMLIT-ANBINDUNG
+# =========================================================================
+
+def raum_auswahl(verwaltung, sitzung, spielregeln):
+    """
+    Seitenleiste zum Eröffnen, Beitreten und Verlassen eines Raums; der Code steht zum Teilen
+    auch in der URL. Liefert (Code, Platz) des aktuellen Raums oder (None, None).
+    """
+    # Meldung von raum_verloren() aus dem vorigen Lauf
+    fehler = st.session_state.pop('raum_fehler', None)
+    if fehler:
+        st.sidebar.error(fehler)
+    if 'raum' not in st.session_state:
+        eingabe = st.sidebar.text_input("Raum-Code", value=st.query_params.get('raum', ''), key='raum_eingabe')
+        eingabe = eingabe.strip().upper()
+        spalte_beitreten, spalte_eroeffnen = st.sidebar.columns(2)
+        if spalte_beitreten.button("Beitreten", disabled=not eingabe):
+            st.session_state.raum = eingabe
+        if spalte_eroeffnen.button("Raum eröffnen"):
+            try:
+                st.session_state.raum = verwaltung.eroeffne(spielregeln, sitzung)
+            except RuntimeError as e:
+                st.sidebar.error(str(e))
+        if 'raum' not in st.session_state:
+            return None, None
+
+    code = st.session_state.raum
+    try:
+        platz = verwaltung.trete_bei(code, sitzung)
+    except KeyError:
+        raum_verloren(code)
+
+    st.query_params['raum'] = code
+    if st.sidebar.button("Raum verlassen"):
+        verwaltung.verlasse(code, sitzung)
+        del st.session_state.raum
+        st.query_params.clear()
+        st.rerun()
+    return code, platz
+
+def raum_verloren(code):
+    """Verlässt einen geschlossenen Raum; die Meldung erscheint im nächsten Lauf in der Seitenleiste."""
+    st.session_state.pop('raum', None)
+    st.session_state.raum_fehler = f"Raum {code} gibt es nicht (mehr)."
+    st.query_params.clear()
+    st.rerun()
+
+def beobachte_raum(verwaltung, code, version, gegner_am_zug):
+    """
+    Prüft den Raum in einem Fragment alle PRUEF_INTERVALL_S (Gegner am Zug) bzw.
+    BEOBACHT_INTERVALL_S Sekunden, ohne zu warten, und startet nur dann einen Rerun der ganzen
+    Seite, wenn sich der Raum seit version geändert hat. Zwischen den Prüfungen belegt die
+    Sitzung keinen Script-Thread.
+    """
+    @st.fragment(run_every=PRUEF_INTERVALL_S if gegner_am_zug else BEOBACHT_INTERVALL_S)
+    def raum_pruefen():
+        if verwaltung.warte(code, version, 0):
+            st.rerun()
+        if gegner_am_zug:
+            st.caption("Warte auf den Gegner …")
+
+    raum_pruefen()
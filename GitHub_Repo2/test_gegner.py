@@ -0,0 +1,84 @@
+"""Computergegner: verliert 3×3 nie, erkennt Symmetrien und speichert Teilsuchen nicht als exakt."""
+import random
+
+import pytest
+
+import gegner
+from gegner import EXAKT, Gegner, geloeste_tabelle, kanonisch, symmetrien
+from spiel_engine import Spielstand, regeln
+
+def _gegen_jeden_gegenzug(computer, spiel, computer_spielt):
+    """Spielt jede mögliche Antwortfolge des Gegners durch; liefert die Zahl der Partien."""
+    if spiel.beendet:
+        assert spiel.gewinner in (None, computer_spielt), f"Computer verliert: {spiel.verlauf}"
+        return 1
+    if spiel.am_zug == computer_spielt:
+        spiel.ziehe(computer.waehle_zug(spiel))
+        partien = _gegen_jeden_gegenzug(computer, spiel, computer_spielt)
+        spiel.zuruecknehmen(spiel.verlauf[-1])
+        return partien
+    partien = 0
+    for feld in spiel.freie_felder():
+        spiel.ziehe(feld)
+        partien += _gegen_jeden_gegenzug(computer, spiel, computer_spielt)
+        spiel.zuruecknehmen(feld)
+    return partien
+
+def test_geloeste_tabelle():
+    tabelle = geloeste_tabelle(regeln(3))
+    assert len(tabelle) == 627
+    # Perfektes Spiel von der Anfangsstellung aus endet remis
+    assert tabelle[kanonisch([0, 0], 3)] == 0
+
+@pytest.mark.parametrize('suche', [False, True], ids=['tabelle', 'suche'])
+@pytest.mark.parametrize('computer_spielt', [0, 1], ids=['X', 'O'])
+def test_verliert_3x3_nie(monkeypatch, suche, computer_spielt):
+    if suche:
+        # Alpha-Beta statt der gelösten Tabelle; die Bedenkzeit reicht für die volle Tiefe
+        monkeypatch.setattr(gegner, 'MAX_FELDER_GELOEST', 0)
+    computer = Gegner(regeln(3), bedenkzeit=5.0)
+    assert _gegen_jeden_gegenzug(computer, Spielstand(regeln(3)), computer_spielt) > 1
+
+def test_gewinnt_und_blockiert_auf_7x7():
+    spielregeln = regeln(7, 4)
+    computer = Gegner(spielregeln, bedenkzeit=0.05)
+    spiel = Spielstand(spielregeln)
+    # X hat drei in Zeile 3 mit beiden Enden frei, O hat drei in Zeile 5 mit freiem Ende
+    for feld in (22, 36, 23, 37, 24, 38):
+        spiel.ziehe(feld)
+    assert computer.waehle_zug(spiel) in (21, 25)
+    spiel.ziehe(0)
+    # O am Zug: eigener Gewinn geht vor Abwehr
+    assert computer.waehle_zug(spiel) in (35, 39)
+
+def test_schluessel_gleich_fuer_symmetrische_stellungen():
+    spielregeln = regeln(7, 4)
+    computer = Gegner(spielregeln)
+    zufall = random.Random(0)
+    for _ in range(20):
+        spiel = Spielstand(spielregeln)
+        for _ in range(zufall.randrange(1, 12)):
+            spiel.ziehe(zufall.choice(spiel.freie_felder()))
+        schluessel = set()
+        for permutation in symmetrien(spielregeln.n):
+            bild = Spielstand(spielregeln)
+            bild.bretter = [sum(1 << permutation[feld] for feld in range(spielregeln.felder) if brett >> feld & 1)
+                            for brett in spiel.bretter]
+            bild.am_zug, bild.zuege = spiel.am_zug, spiel.zuege
+            computer._vorbereiten(bild)
+            schluessel.add(computer._schluessel()[0])
+            assert kanonisch(bild.bretter, spielregeln.n) == kanonisch(spiel.bretter, spielregeln.n)
+        assert len(schluessel) == 1
+
+def test_teilsuchen_sind_nur_schranken(monkeypatch):
+    # Mit einem Kandidaten je Knoten ist jede Suche auf 7×7 eine Teilsuche
+    monkeypatch.setattr(gegner, 'MAX_KANDIDATEN', 1)
+    spielregeln = regeln(7, 4)
+    computer = Gegner(spielregeln, bedenkzeit=0.05)
+    spiel = Spielstand(spielregeln)
+    spiel.ziehe(24)
+    spiel.ziehe(25)
+    computer.waehle_zug(spiel)
+    eintraege = list(computer.tabelle._eintraege.values())
+    assert eintraege
+    assert all(art != EXAKT for _, _, art, _ in eintraege)
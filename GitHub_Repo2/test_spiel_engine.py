@@ -0,0 +1,64 @@
+"""Bitboard-Engine: Gewinnerkennung und Zugrücknahme gegen ein einfaches Nachzählen auf dem Brett."""
+import random
+
+import pytest
+
+from spiel_engine import LEER, SPIELER, Spielstand, regeln
+
+def _gewinnt(spiel, zeichen):
+    """Sucht k gleiche Zeichen in einer Reihe, Feld für Feld und Richtung für Richtung."""
+    n, k = spiel.regeln.n, spiel.regeln.k
+    for zeile in range(n):
+        for spalte in range(n):
+            for dz, ds in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                felder = [(zeile + dz * i, spalte + ds * i) for i in range(k)]
+                if all(0 <= z < n and 0 <= s < n and spiel.feld(z, s) == zeichen for z, s in felder):
+                    return True
+    return False
+
+@pytest.mark.parametrize('n, k', [(3, 3), (4, 4), (7, 4)])
+def test_gewinnerkennung_wie_nachgezaehlt(n, k):
+    spielregeln = regeln(n, k)
+    zufall = random.Random(n * 10 + k)
+    for _ in range(100):
+        spiel = Spielstand(spielregeln)
+        while not spiel.beendet:
+            zeichen = spiel.spieler_am_zug()
+            assert spiel.ziehe(zufall.choice(spiel.freie_felder()))
+            assert (spiel.gewinner is not None) == _gewinnt(spiel, zeichen)
+            # Vor dem Zug hatte niemand gewonnen, also kann der Gegner jetzt keine Reihe haben
+            assert not _gewinnt(spiel, SPIELER[SPIELER.index(zeichen) ^ 1])
+        if spiel.gewinner is None:
+            assert spiel.unentschieden and spiel.zuege == n * n
+
+def test_masken_zaehlen():
+    # Linien je Richtung: (n - k + 1) Anfänge in Zugrichtung, n bzw. n - k + 1 quer dazu
+    for n, k in [(3, 3), (4, 4), (7, 4), (15, 5)]:
+        frei = n - k + 1
+        assert len(regeln(n, k).gewinn_masken) == 2 * n * frei + 2 * frei * frei
+    assert len(regeln(3).masken_je_feld[4]) == 4
+    with pytest.raises(ValueError):
+        regeln(3, 4)
+
+def test_zuruecknehmen_stellt_den_stand_wieder_her():
+    spielregeln = regeln(7, 4)
+    zufall = random.Random(0)
+    spiel = Spielstand(spielregeln)
+    staende = []
+    while not spiel.beendet:
+        staende.append((spiel.bretter[:], spiel.am_zug, spiel.zuege, spiel.gewinner, spiel.verlauf[:]))
+        spiel.ziehe(zufall.choice(spiel.freie_felder()))
+    for feld in reversed(spiel.verlauf[:]):
+        spiel.zuruecknehmen(feld)
+        assert (spiel.bretter, spiel.am_zug, spiel.zuege, spiel.gewinner, spiel.verlauf) == staende.pop()
+
+def test_keine_zuege_auf_belegte_felder_oder_nach_spielende():
+    spiel = Spielstand.neu(3)
+    for feld in (0, 3, 1, 4, 2):
+        assert spiel.ziehe(feld)
+    assert spiel.gewinner == 0 and spiel.spieler_am_zug() == 'X'
+    assert not spiel.ziehe(8)
+    belegt = Spielstand.neu(3)
+    belegt.ziehe(0)
+    assert not belegt.ziehe(0)
+    assert belegt.feld(0, 0) == 'X' and belegt.feld(1, 1) == LEER
@@ -0,0 +1,96 @@
+"""Binärprotokoll: Sätze überstehen den Weg auf die Platte, auch nach einem abgebrochenen write()."""
+import os
+import random
+
+import numpy as np
+import pytest
+
+import spielprotokoll
+from spiel_engine import Spielstand, regeln
+from spielprotokoll import KOPF, REMIS, Spielprotokoll
+
+def _zufallspartie(spielregeln, zufall):
+    spiel = Spielstand(spielregeln)
+    while not spiel.beendet:
+        spiel.ziehe(zufall.choice(spiel.freie_felder()))
+    return spiel
+
+@pytest.mark.parametrize('n, k', [(3, 3), (4, 4)])
+def test_partien_ueberstehen_den_rundweg(tmp_path, n, k):
+    spielregeln = regeln(n, k)
+    zufall = random.Random(n)
+    partien = [_zufallspartie(spielregeln, zufall) for _ in range(200)]
+    protokoll = Spielprotokoll(spielregeln, str(tmp_path / 'partien.bin'))
+    for spiel in partien:
+        protokoll.anhaengen(spiel)
+
+    # Eine neue Instanz liest nur, was auf der Platte steht
+    protokoll = Spielprotokoll(spielregeln, protokoll.pfad)
+    assert len(protokoll) == len(partien)
+    for index, spiel in enumerate(partien):
+        verlauf, ergebnis = protokoll.partie(index)
+        assert verlauf == spiel.verlauf
+        assert ergebnis == (REMIS if spiel.gewinner is None else spiel.gewinner)
+        assert protokoll.nachspielen(index, len(verlauf)).bretter == spiel.bretter
+
+    gesamt, je_zug = protokoll.statistik()
+    assert gesamt.sum() == len(partien)
+    assert je_zug.sum() == len(partien)
+    assert np.array_equal(je_zug.sum(axis=1), np.bincount([spiel.verlauf[0] for spiel in partien],
+                                                          minlength=spielregeln.felder))
+
+@pytest.mark.parametrize('n, k', [(3, 3), (4, 4)])
+def test_unvollstaendiger_letzter_satz(tmp_path, n, k):
+    spielregeln = regeln(n, k)
+    zufall = random.Random(0)
+    erste, zweite = _zufallspartie(spielregeln, zufall), _zufallspartie(spielregeln, zufall)
+    protokoll = Spielprotokoll(spielregeln, str(tmp_path / 'partien.bin'))
+    protokoll.anhaengen(erste)
+    # Absturz mitten im write(): nur ein Teil des zweiten Satzes steht in der Datei
+    with open(protokoll.pfad, 'ab') as f:
+        f.write(protokoll._satz(zweite).tobytes()[:protokoll.satz_typ.itemsize - 3])
+
+    protokoll = Spielprotokoll(spielregeln, protokoll.pfad)
+    assert len(protokoll) == 1
+    assert protokoll.partie(0)[0] == erste.verlauf
+
+    # Der nächste Satz ersetzt das Bruchstück, statt versetzt dahinter zu landen
+    protokoll.anhaengen(zweite)
+    assert os.path.getsize(protokoll.pfad) == KOPF.size + 2 * protokoll.satz_typ.itemsize
+    assert [protokoll.partie(i)[0] for i in range(2)] == [erste.verlauf, zweite.verlauf]
+
+def test_falsche_variante(tmp_path):
+    pfad = str(tmp_path / 'partien.bin')
+    Spielprotokoll(regeln(3), pfad)
+    with pytest.raises(ValueError):
+        Spielprotokoll(regeln(4), pfad)
+
+@pytest.mark.parametrize('n, k', [(3, 3), (4, 4)])
+def test_statistik_ueber_mehrere_bloecke(tmp_path, monkeypatch, n, k):
+    spielregeln = regeln(n, k)
+    zufall = random.Random(1)
+    # Kurze Partien, damit viele dieselbe Stellung erreichen
+    partien = []
+    for _ in range(300):
+        spiel = Spielstand(spielregeln)
+        if zufall.random() < 0.7:
+            spiel.ziehe(0)
+            spiel.ziehe(1)
+        while not spiel.beendet:
+            spiel.ziehe(zufall.choice(spiel.freie_felder()))
+        partien.append(spiel)
+    protokoll = Spielprotokoll(spielregeln, str(tmp_path / 'partien.bin'))
+    for spiel in partien:
+        protokoll.anhaengen(spiel)
+    # Wenige Sätze je Block, damit der letzte Block unvollständig ist
+    monkeypatch.setattr(spielprotokoll, 'BLOCK_BYTES', 7 * protokoll.satz_typ.itemsize)
+
+    stellung = Spielstand(spielregeln)
+    stellung.ziehe(0)
+    stellung.ziehe(1)
+    gesamt, je_zug = protokoll.statistik(stellung)
+    erreicht = [spiel for spiel in partien if spiel.verlauf[:2] == [0, 1]]
+    assert gesamt.tolist() == np.bincount([REMIS if spiel.gewinner is None else spiel.gewinner
+                                           for spiel in erreicht], minlength=3).tolist()
+    assert je_zug.sum(axis=1).tolist() == np.bincount([spiel.verlauf[2] for spiel in erreicht],
+                                                      minlength=spielregeln.felder).tolist()
@@ -0,0 +1,88 @@
+"""Spielräume: Plätze, Zugrecht, Schließen und Warten auf Änderungen."""
+import threading
+import time
+
+import pytest
+
+import spielraeume
+from spiel_engine import regeln
+from spielraeume import Raumverwaltung
+
+@pytest.fixture
+def raum():
+    verwaltung = Raumverwaltung()
+    return verwaltung, verwaltung.eroeffne(regeln(3), 'a')
+
+def test_plaetze_und_zuschauer(raum):
+    verwaltung, code = raum
+    assert verwaltung.trete_bei(code, 'a') == 0
+    assert verwaltung.trete_bei(code, 'b') == 1
+    assert verwaltung.trete_bei(code, 'b') == 1
+    assert verwaltung.trete_bei(code, 'c') is None
+    with pytest.raises(KeyError):
+        verwaltung.trete_bei('XXXXX', 'a')
+
+def test_nur_wer_am_zug_ist_zieht(raum):
+    verwaltung, code = raum
+    # Ohne Mitspieler wird nicht gezogen
+    assert verwaltung.ziehe(code, 'a', 4) is None
+    verwaltung.trete_bei(code, 'b')
+    assert verwaltung.ziehe(code, 'b', 0) is None
+    beendet, kopie = verwaltung.ziehe(code, 'a', 4)
+    assert not beendet and kopie.verlauf == [4]
+    spiel, spieler, version = verwaltung.stand(code)
+    assert spiel.verlauf == [4] and spieler == ('a', 'b')
+    for sitzung, feld in (('b', 0), ('a', 3), ('b', 1), ('a', 5)):
+        beendet, kopie = verwaltung.ziehe(code, sitzung, feld)
+    assert beendet and kopie.gewinner == 0
+    assert verwaltung.ziehe(code, 'b', 2) is None
+    # Neue Partie mit getauschten Farben
+    verwaltung.neues_spiel(code, 'a')
+    spiel, spieler, _ = verwaltung.stand(code)
+    assert spiel.zuege == 0 and spieler == ('b', 'a')
+    # Wer danach ebenfalls auf "Neues Spiel" klickt, setzt die begonnene Partie nicht zurück
+    verwaltung.ziehe(code, 'b', 4)
+    verwaltung.neues_spiel(code, 'a')
+    spiel, spieler, _ = verwaltung.stand(code)
+    assert spiel.verlauf == [4] and spieler == ('b', 'a')
+
+def test_leerer_raum_wird_geschlossen(raum):
+    verwaltung, code = raum
+    verwaltung.trete_bei(code, 'b')
+    verwaltung.verlasse(code, 'a')
+    assert verwaltung.stand(code)[1] == (None, 'b')
+    verwaltung.verlasse(code, 'b')
+    assert verwaltung.stand(code) is None
+    assert len(verwaltung) == 0 and verwaltung.geschlossen == 1
+
+def test_leerlauf_schliesst_raeume(monkeypatch):
+    monkeypatch.setattr(spielraeume, 'AUFRAEUM_INTERVALL_S', 0)
+    verwaltung = Raumverwaltung(max_leerlauf_s=0.01)
+    code = verwaltung.eroeffne(regeln(3), 'a')
+    time.sleep(0.02)
+    verwaltung.eroeffne(regeln(3), 'b')
+    assert verwaltung.stand(code) is None
+
+def test_zu_viele_raeume():
+    verwaltung = Raumverwaltung(max_raeume=2)
+    verwaltung.eroeffne(regeln(3), 'a')
+    verwaltung.eroeffne(regeln(3), 'b')
+    with pytest.raises(RuntimeError):
+        verwaltung.eroeffne(regeln(3), 'c')
+
+def test_warten_endet_bei_aenderung(raum):
+    verwaltung, code = raum
+    version = verwaltung.stand(code)[2]
+    assert not verwaltung.warte(code, version, 0)
+    assert not verwaltung.warte(code, version, 0.01)
+    # Ein Beitritt in einem anderen Thread weckt den Wartenden sofort
+    beitritt = threading.Timer(0.05, verwaltung.trete_bei, (code, 'b'))
+    beitritt.start()
+    start = time.monotonic()
+    assert verwaltung.warte(code, version, 5)
+    assert time.monotonic() - start < 1
+    beitritt.join()
+    # Ein geschlossener Raum zählt als Änderung
+    verwaltung.verlasse(code, 'a')
+    verwaltung.verlasse(code, 'b')
+    assert verwaltung.warte(code, version + 1, 5)
@@ -0,0 +1,42 @@
+"""Turnier: vektorisierte Zufallspartien spielen genau wie die Engine, Ergebnisse summieren sich richtig."""
+import numpy as np
+import pytest
+
+from spiel_engine import Spielstand, regeln
+from turnier import turnier, zufallspartien
+
+@pytest.mark.parametrize('n, k', [(3, 3), (4, 3), (7, 4)])
+def test_zufallspartien_wie_die_engine(n, k):
+    spielregeln = regeln(n, k)
+    anzahl = 500
+    ergebnis, zuege = zufallspartien(spielregeln, anzahl, np.random.default_rng(7))
+
+    # Dieselben Zugfolgen Partie für Partie auf der Engine nachspielen
+    reihenfolge = np.argsort(np.random.default_rng(7).random((anzahl, spielregeln.felder)), axis=1)
+    erwartet, erwartete_zuege = [0, 0, 0], 0
+    for folge in reihenfolge:
+        spiel = Spielstand(spielregeln)
+        for feld in folge:
+            spiel.ziehe(int(feld))
+            if spiel.beendet:
+                break
+        erwartet[2 if spiel.gewinner is None else spiel.gewinner] += 1
+        erwartete_zuege += spiel.zuege
+    assert list(ergebnis) == erwartet
+    assert zuege == erwartete_zuege
+
+def test_zufall_gegen_zufall_auf_3x3():
+    # Bekannte Quoten für 3×3: X gewinnt 58,5 %, O 28,8 %, remis 12,7 %
+    (sieg_x, sieg_o, remis), _ = zufallspartien(regeln(3), 20_000, np.random.default_rng(0))
+    assert sieg_x + sieg_o + remis == 20_000
+    assert sieg_x / 20_000 == pytest.approx(0.585, abs=0.015)
+    assert sieg_o / 20_000 == pytest.approx(0.288, abs=0.015)
+
+def test_turnier_zaehlt_jede_paarung():
+    statistik = turnier(['zufall', 'gierig'], spiele=300, prozesse=1, seed=1)
+    assert set(statistik['ergebnisse']) == {('zufall', 'zufall'), ('zufall', 'gierig'),
+                                            ('gierig', 'zufall'), ('gierig', 'gierig')}
+    assert all(sum(ergebnis) == 300 for ergebnis in statistik['ergebnisse'].values())
+    sieg_x, sieg_o, _ = statistik['ergebnisse'][('gierig', 'zufall')]
+    assert sieg_x > sieg_o
+    assert statistik['zuege']['gierig'] > 0 and statistik['zeiten']['gierig'] > 0
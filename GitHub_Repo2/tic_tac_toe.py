@@ -1,77 +1,114 @@
+import secrets
+
 import streamlit as st
 
+from gegner import Gegner, geloeste_tabelle
+from spiel_engine import LEER, SPIELER, Spielstand, regeln
+from spielprotokoll import Spielprotokoll, nachspiel_ansicht
+from spielraeume import Raumverwaltung, beobachte_raum, raum_auswahl, raum_verloren
+
 # =========================================================================
-# 1. SPIELLOGIK (ANGEPASSTE FUNKTIONEN AUS DEINEM CODE)
+# 1. SPIELLOGIK (BITBOARD-ENGINE IN spiel_engine.py)
 # =========================================================================
 
-# Zug machen (Unverändert, operiert auf dem übergebenen Brett)
-def mache_zug(brett, aktueller_spieler, zeile, spalte):
-    if brett[zeile][spalte] == ' ':
-        brett[zeile][spalte] = aktueller_spieler
-        return True
-    return False
-
-# Gewinn überprüfen (Unverändert)
-def pruefe_gewonnen(brett, aktueller_spieler):
-    # Zeilen prüfen
-    for zeile in range(3):
-        if brett[zeile][0] == brett[zeile][1] == brett[zeile][2] == aktueller_spieler:
-            return True
-    # Spalten prüfen
-    for spalte in range(3):
-        if brett[0][spalte] == brett[1][spalte] == brett[2][spalte] == aktueller_spieler:
-            return True
-    # Diagonalen prüfen
-    if (brett[0][0] == brett[1][1] == brett[2][2] == aktueller_spieler) or \
-       (brett[0][2] == brett[1][1] == brett[2][0] == aktueller_spieler):
-            return True
-    return False
-
-# Prüfe auf Unentschieden (Unverändert)
-def pruefe_unentschieden(brett):
-    for zeile in brett:
-        if ' ' in zeile:
-            return False
-    return True
-
-# Funktion zum Zurücksetzen des Spiels
-def starte_neues_spiel():
-    st.session_state.clear()
-    # Der Zustand wird beim nächsten Rerun neu initialisiert
+# Wählbare Varianten: Brettgröße n und Gewinnlänge k
+VARIANTEN = {
+    "3×3 (Tic-Tac-Toe)": (3, 3),
+    "4×4, 4 in einer Reihe": (4, 4),
+    "7×7, 4 in einer Reihe": (7, 4),
+    "15×15, 5 in einer Reihe (Gomoku)": (15, 5),
+}
+
+MODI = ("Zwei Spieler", "Gegen den Computer", "Online-Raum", "Partien nachspielen")
+
+# Die Tabelle für 3×3 wird einmal je Prozess gelöst, nicht erst beim ersten Computerzug
+geloeste_tabelle(regeln(3))
+
+@st.cache_resource
+def raumverwaltung():
+    """Ein Raumspeicher für alle Sessions des Server-Prozesses."""
+    return Raumverwaltung()
+
+@st.cache_resource
+def spielprotokoll(n, k):
+    """Protokolldatei der Variante, geteilt von allen Sessions des Prozesses."""
+    return Spielprotokoll(regeln(n, k))
+
+# Funktion zum Zurücksetzen des Spiels; Variante, Modus und Raum bleiben erhalten
+def starte_neues_spiel(raum_code, sitzung, spielregeln):
+    if raum_code is not None:
+        raumverwaltung().neues_spiel(raum_code, sitzung)
+    else:
+        st.session_state.spiel = Spielstand(spielregeln)
 
 # =========================================================================
 # 2. HAUPT-LOGIK & ZUSTANDSVERWALTUNG FÜR STREAMLIT
 # =========================================================================
 
-# Zustand initialisieren, falls das Spiel neu geladen wird
-if 'board' not in st.session_state:
-    st.session_state.board = [[' ', ' ', ' '], [' ', ' ', ' '], [' ', ' ', ' ']]
-    st.session_state.player = 'X'
-    st.session_state.game_active = True
-    st.session_state.result = "Das Spiel läuft..."
+variante = st.sidebar.selectbox("Variante", list(VARIANTEN), key='variante')
+n, k = VARIANTEN[variante]
+modus = st.sidebar.radio("Modus", MODI, key='modus')
+gegen_computer = modus == MODI[1]
+
+# Zustand initialisieren, falls das Spiel neu geladen oder die Variante gewechselt wird
+if 'spiel' not in st.session_state or st.session_state.spiel.regeln is not regeln(n, k):
+    st.session_state.spiel = Spielstand(regeln(n, k))
+if 'sitzung' not in st.session_state:
+    st.session_state.sitzung = secrets.token_hex(8)
+sitzung = st.session_state.sitzung
+
+# Nachspielen zeigt nur das Protokoll der gewählten Variante
+if modus == MODI[3]:
+    st.title("Tic-Tac-Toe App")
+    nachspiel_ansicht(spielprotokoll(n, k))
+    st.stop()
+
+# Der Computer spielt O; seine Transpositionstabelle bleibt für die Variante erhalten
+if gegen_computer and ('gegner' not in st.session_state or st.session_state.gegner.regeln is not regeln(n, k)):
+    st.session_state.gegner = Gegner(regeln(n, k))
+
+# Online-Raum: Spielstand und Regeln kommen aus dem gemeinsamen Raum
+raum_code = platz = None
+if modus == MODI[2]:
+    verwaltung = raumverwaltung()
+    raum_code, platz = raum_auswahl(verwaltung, sitzung, regeln(n, k))
+    if raum_code is not None:
+        stand = verwaltung.stand(raum_code)
+        # Der Raum kann seit trete_bei() geschlossen worden sein (Mitspieler weg, Leerlauf)
+        if stand is None:
+            raum_verloren(raum_code)
+        spiel, spieler, version = stand
+        n, k = spiel.regeln.n, spiel.regeln.k
+        mitspieler_fehlt = None in spieler
+        mein_zug = platz is not None and not mitspieler_fehlt and not spiel.beendet and spiel.am_zug == platz
 
 # Diese Funktion wird beim Klick auf einen Button ausgeführt
 def handle_click(r, c):
-    # Nur handeln, wenn das Spiel aktiv ist
-    if st.session_state.game_active:
-        if mache_zug(st.session_state.board, st.session_state.player, r, c):
-
-            # Nach dem Zug den Gewinn prüfen
-            if pruefe_gewonnen(st.session_state.board, st.session_state.player):
-                st.session_state.game_active = False
-                st.session_state.result = f'🎉 Spieler {st.session_state.player} hat gewonnen!'
-            
-            # Unentschieden prüfen
-            elif pruefe_unentschieden(st.session_state.board):
-                st.session_state.game_active = False
-                st.session_state.result = '🤝 Unentschieden! Kein Spieler hat gewonnen.'
-            
-            # Spieler wechseln
-            else:
-                st.session_state.player = 'O' if st.session_state.player == 'X' else 'X'
-            
-            # Streamlit neu laden, um den neuen Zustand anzuzeigen
-            # st.rerun() # Ist oft nicht nötig, da Button-Klicks ohnehin ein Rerun auslösen
+    if raum_code is not None:
+        # Jede Raum-Partie wird genau einmal protokolliert: von der Sitzung, deren Zug sie beendet
+        ergebnis = raumverwaltung().ziehe(raum_code, sitzung, r * n + c)
+        if ergebnis is None:
+            return
+        beendet, spiel = ergebnis
+    else:
+        spiel = st.session_state.spiel
+        # ziehe() ignoriert Züge auf belegte Felder und nach Spielende
+        if not spiel.ziehe_rc(r, c):
+            return
+        if gegen_computer and not spiel.beendet:
+            spiel.ziehe(st.session_state.gegner.waehle_zug(spiel))
+        beendet = spiel.beendet
+    if beendet:
+        spielprotokoll(n, k).anhaengen(spiel)
+
+if raum_code is None:
+    spiel = st.session_state.spiel
+if spiel.gewinner is not None:
+    ergebnis = f'🎉 Spieler {spiel.spieler_am_zug()} hat gewonnen!'
+elif spiel.unentschieden:
+    ergebnis = '🤝 Unentschieden! Kein Spieler hat gewonnen.'
+else:
+    ergebnis = "Das Spiel läuft..."
 
 # =========================================================================
 # 3. STREAMLIT UI (RENDER-LOGIK)
@@ -80,23 +117,29 @@ def handle_click(r, c):
 st.title("Tic-Tac-Toe App")
 
 # Anzeige des aktuellen Status
-if st.session_state.game_active:
-    st.info(f"Aktueller Spieler: **{st.session_state.player}**")
+if raum_code is not None:
+    rolle = "Zuschauer" if platz is None else f"du spielst {SPIELER[platz]}"
+    st.caption(f"Raum **{raum_code}** – {rolle}")
+if raum_code is not None and mitspieler_fehlt:
+    st.info(f"Warte auf einen Mitspieler – Raum-Code: **{raum_code}**")
+elif not spiel.beendet:
+    st.info(f"Aktueller Spieler: **{spiel.spieler_am_zug()}** – {k} in einer Reihe gewinnt")
 else:
-    st.success(st.session_state.result)
-    st.button('Neues Spiel starten', on_click=starte_neues_spiel)
+    st.success(ergebnis)
+    if raum_code is None or platz is not None:
+        st.button('Neues Spiel starten', on_click=starte_neues_spiel, args=(raum_code, sitzung, regeln(n, k)))
 
 st.markdown("---")
 
-# Das 3x3 Gitter (Brett) rendern
-for r in range(3):
-    # Erstellt 3 gleich große Spalten für die Zeile
-    cols = st.columns(3)
-    for c in range(3):
-        field = st.session_state.board[r][c]
-        
-        # Leere Felder sind klickbare Buttons
-        if field == ' ' and st.session_state.game_active:
+# Das n×n Gitter (Brett) rendern
+for r in range(n):
+    # Erstellt n gleich große Spalten für die Zeile
+    cols = st.columns(n)
+    for c in range(n):
+        field = spiel.feld(r, c)
+
+        # Leere Felder sind klickbare Buttons; im Raum nur für den Spieler am Zug
+        if field == LEER and not spiel.beendet and (raum_code is None or mein_zug):
             # Button, der handle_click mit den Koordinaten aufruft
             cols[c].button(
                 " ",
@@ -106,12 +149,17 @@ for r in range(3):
                 # Stellt sicher, dass die leeren Buttons eine sichtbare Größe haben
                 use_container_width=True,
             )
-        
+
         # Belegte Felder zeigen X oder O
         else:
-            # Zeigt das X oder O groß und zentriert an
-            style = "font-size: 50px; text-align: center; height: 80px; line-height: 80px;"
+            # Zeigt das X oder O groß und zentriert an; auf großen Brettern kleiner
+            groesse = 50 if n <= 4 else 24
+            style = f"font-size: {groesse}px; text-align: center; height: {groesse + 30}px; line-height: {groesse + 30}px;"
             cols[c].markdown(f'<div style="{style}">**{field}**</div>', unsafe_allow_html=True)
-            
+
 st.markdown("---")
-st.caption("Klicke auf ein leeres Feld, um einen Zug zu setzen.")
\ No newline at end of file
+st.caption("Klicke auf ein leeres Feld, um einen Zug zu setzen.")
+
+# Ohne eigenen Zug auf Änderungen im Raum achten (Gegnerzug, Beitritt); nach Spielende nicht mehr
+if raum_code is not None and not mein_zug and not spiel.beendet:
+    beobachte_raum(verwaltung, raum_code, version, gegner_am_zug=platz is not None and not mitspieler_fehlt)
@@ -0,0 +1,221 @@
+"""
+Headless Selbstspiel-Turnier für Tic-Tac-Toe-Strategien auf der Engine aus spiel_engine.py.
+
+Jede Paarung (X gegen O) spielt eine feste Zahl von Partien, verteilt in Stapeln auf einen
+Prozess-Pool. Partien Zufall gegen Zufall laufen vektorisiert: ein ganzer Stapel Bretter zieht
+gleichzeitig, die Zugfolge jeder Partie ist eine Zufallspermutation der Felder, und je Zug werden
+nur die Gewinnlinien durch das gesetzte Feld hochgezählt. Alle anderen Paarungen spielen Partie
+für Partie auf einem Spielstand. Ausgegeben werden Sieg-/Remisquoten je Paarung, Partien pro
+Sekunde und die mittlere Zeit je Zug jeder Strategie.
+
+    python turnier.py --spiele 1000000
+    python turnier.py --variante 7 4 --strategie zufall --strategie gierig --strategie suche --spiele 200
+"""
+import argparse
+import concurrent.futures
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from gegner import Gegner
+from spiel_engine import SPIELER, Spielstand, regeln
+
+# Partien je vektorisiertem Stapel und je Aufgabe im Pool
+STAPEL_GROESSE = 4096
+# Bedenkzeit der Suche im Turnier; Partien sollen schnell durchlaufen
+TURNIER_BEDENKZEIT = 0.02
+
+# =========================================================================
+# STRATEGIEN
+# =========================================================================
+# Eine Strategie wird je Aufgabe einmal erzeugt (Regeln, Zufallsgenerator) und liefert eine
+# Funktion Spielstand -> Feld für den Spieler am Zug.
+
+def zufall(spielregeln, rng):
+    def zug(spiel):
+        felder = spiel.freie_felder()
+        return felder[rng.integers(len(felder))]
+    return zug
+
+def gierig(spielregeln, rng):
+    """Gewinnt, wenn möglich, blockiert sonst einen gegnerischen Gewinn, zieht sonst zufällig."""
+    def zug(spiel):
+        felder = spiel.freie_felder()
+        eigene, fremde = spiel.bretter[spiel.am_zug], spiel.bretter[spiel.am_zug ^ 1]
+        abwehr = None
+        for feld in felder:
+            bit = 1 << feld
+            for maske in spielregeln.masken_je_feld[feld]:
+                if (eigene | bit) & maske == maske:
+                    return feld
+                if abwehr is None and (fremde | bit) & maske == maske:
+                    abwehr = feld
+        return abwehr if abwehr is not None else felder[rng.integers(len(felder))]
+    return zug
+
+def suche(spielregeln, rng):
+    gegner = Gegner(spielregeln, bedenkzeit=TURNIER_BEDENKZEIT)
+    return gegner.waehle_zug
+
+STRATEGIEN = {'zufall': zufall, 'gierig': gierig, 'suche': suche}
+
+# =========================================================================
+# PARTIEN
+# =========================================================================
+
+def _masken_index(spielregeln):
+    """Gewinnlinien je Feld als Index-Matrix; kürzere Zeilen zeigen auf die Platzhalterlinie."""
+    nummer = {maske: i for i, maske in enumerate(spielregeln.gewinn_masken)}
+    breite = max(len(masken) for masken in spielregeln.masken_je_feld)
+    index = np.full((spielregeln.felder, breite), len(nummer), dtype=np.intp)
+    for feld, masken in enumerate(spielregeln.masken_je_feld):
+        index[feld, :len(masken)] = [nummer[maske] for maske in masken]
+    return index
+
+def zufallspartien(spielregeln, anzahl, rng):
+    """
+    Spielt anzahl Partien Zufall gegen Zufall gleichzeitig. Liefert (Siege X, Siege O, Remis)
+    und die Zahl der gespielten Züge.
+    """
+    felder, k = spielregeln.felder, spielregeln.k
+    platzhalter = len(spielregeln.gewinn_masken)
+    je_feld = _masken_index(spielregeln)
+    gueltig = je_feld < platzhalter
+    # Zufällige Zugfolge je Partie; ein Zufallsspieler wählt gleichverteilt unter den freien Feldern
+    reihenfolge = np.argsort(rng.random((anzahl, felder)), axis=1)
+    # Steine je Spieler, Partie und Gewinnlinie (plus Platzhalterlinie)
+    steine = np.zeros((2, anzahl, platzhalter + 1), dtype=np.int16)
+    gewinner = np.full(anzahl, -1, dtype=np.int8)
+    laufend = np.arange(anzahl)
+    zuege = 0
+    for zug in range(felder):
+        spieler = zug % 2
+        feld = reihenfolge[laufend, zug]
+        zeilen, linien = laufend[:, None], je_feld[feld]
+        steine[spieler][zeilen, linien] += 1
+        zuege += len(laufend)
+        gewonnen = ((steine[spieler][zeilen, linien] >= k) & gueltig[feld]).any(axis=1)
+        gewinner[laufend[gewonnen]] = spieler
+        laufend = laufend[~gewonnen]
+        if not len(laufend):
+            break
+    return (int((gewinner == 0).sum()), int((gewinner == 1).sum()), len(laufend)), zuege
+
+def _aufgabe(name_x, name_o, n, k, anzahl, seed):
+    """Spielt anzahl Partien einer Paarung; liefert Ergebnisse und Zeit/Züge je Strategie."""
+    spielregeln = regeln(n, k)
+    rng = np.random.default_rng(seed)
+    namen = (name_x, name_o)
+    zeiten, zuege = {name: 0.0 for name in namen}, {name: 0 for name in namen}
+
+    if namen == ('zufall', 'zufall'):
+        start = time.perf_counter()
+        ergebnis = [0, 0, 0]
+        for erster in range(0, anzahl, STAPEL_GROESSE):
+            stapel, stapel_zuege = zufallspartien(spielregeln, min(STAPEL_GROESSE, anzahl - erster), rng)
+            ergebnis = [summe + wert for summe, wert in zip(ergebnis, stapel)]
+            zuege['zufall'] += stapel_zuege
+        zeiten['zufall'] = time.perf_counter() - start
+        return tuple(ergebnis), zeiten, zuege
+
+    strategien = [STRATEGIEN[name](spielregeln, rng) for name in namen]
+    ergebnis = [0, 0, 0]
+    for _ in range(anzahl):
+        spiel = Spielstand(spielregeln)
+        while not spiel.beendet:
+            name = namen[spiel.am_zug]
+            start = time.perf_counter()
+            feld = strategien[spiel.am_zug](spiel)
+            zeiten[name] += time.perf_counter() - start
+            zuege[name] += 1
+            spiel.ziehe(feld)
+        ergebnis[2 if spiel.gewinner is None else spiel.gewinner] += 1
+    return tuple(ergebnis), zeiten, zuege
+
+# =========================================================================
+# TURNIER
+# =========================================================================
+
+def turnier(namen, n=3, k=None, spiele=10_000, prozesse=None, seed=0):
+    """
+    Jede Strategie spielt gegen jede (auch gegen sich selbst) mit X und mit O je spiele Partien.
+    Liefert die Ergebnisse je Paarung, Zeit und Züge je Strategie sowie die Laufzeit.
+    """
+    start = time.perf_counter()
+    prozesse = prozesse or os.cpu_count() or 1
+    paarungen = list(itertools.product(namen, repeat=2))
+    # Aufgaben so groß wie ein Stapel, aber genug für eine gleichmäßige Verteilung
+    teil = max(1, min(STAPEL_GROESSE, -(-spiele * len(paarungen) // (prozesse * 4))))
+    aufgaben = [(name_x, name_o, n, k, min(teil, spiele - erster))
+                for name_x, name_o in paarungen for erster in range(0, spiele, teil)]
+    seeds = np.random.SeedSequence(seed).spawn(len(aufgaben))
+
+    ergebnisse = {paarung: [0, 0, 0] for paarung in paarungen}
+    zeiten, zuege = dict.fromkeys(namen, 0.0), dict.fromkeys(namen, 0)
+
+    def sammeln(aufgabe, antwort):
+        ergebnis, aufgaben_zeiten, aufgaben_zuege = antwort
+        summe = ergebnisse[aufgabe[:2]]
+        for i, wert in enumerate(ergebnis):
+            summe[i] += wert
+        for name in aufgaben_zeiten:
+            zeiten[name] += aufgaben_zeiten[name]
+            zuege[name] += aufgaben_zuege[name]
+
+    if prozesse == 1 or len(aufgaben) == 1:
+        for aufgabe, seed_folge in zip(aufgaben, seeds):
+            sammeln(aufgabe, _aufgabe(*aufgabe, seed_folge))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(prozesse) as pool:
+            futures = {pool.submit(_aufgabe, *aufgabe, seed_folge): aufgabe
+                       for aufgabe, seed_folge in zip(aufgaben, seeds)}
+            for future in concurrent.futures.as_completed(futures):
+                sammeln(futures[future], future.result())
+
+    return {
+        'ergebnisse': ergebnisse,
+        'zeiten': zeiten,
+        'zuege': zuege,
+        'prozesse': prozesse,
+        'sekunden': time.perf_counter() - start,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Selbstspiel-Turnier zwischen Tic-Tac-Toe-Strategien.")
+    parser.add_argument('--strategie', choices=sorted(STRATEGIEN), action='append',
+                        help="Teilnehmende Strategie (mehrfach angebbar, Standard: alle)")
+    parser.add_argument('--variante', type=int, nargs=2, default=(3, 3), metavar=('N', 'K'),
+                        help="Brettgröße und Gewinnlänge (Standard: 3 3)")
+    parser.add_argument('--spiele', type=int, default=10_000, help="Partien je Paarung")
+    parser.add_argument('--prozesse', type=int, default=None, help="Anzahl Worker (Standard: alle Kerne)")
+    parser.add_argument('--seed', type=int, default=0, help="Startwert der Zufallsgeneratoren")
+    args = parser.parse_args(argv)
+
+    n, k = args.variante
+    try:
+        regeln(n, k)
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    namen = args.strategie or list(STRATEGIEN)
+    statistik = turnier(namen, n, k, args.spiele, args.prozesse, args.seed)
+
+    print(f"{n}×{n}, {k} in einer Reihe, {args.spiele} Partien je Paarung")
+    print(f"{SPIELER[0]:>12} {SPIELER[1]:>12} {'Sieg X':>8} {'Sieg O':>8} {'Remis':>8}")
+    for (name_x, name_o), (sieg_x, sieg_o, remis) in statistik['ergebnisse'].items():
+        summe = sieg_x + sieg_o + remis
+        print(f"{name_x:>12} {name_o:>12} {sieg_x / summe:>8.1%} {sieg_o / summe:>8.1%} {remis / summe:>8.1%}")
+    for name in namen:
+        zuege = statistik['zuege'][name]
+        print(f"{name}: {zuege} Züge, {statistik['zeiten'][name] / max(zuege, 1) * 1e6:.1f} µs je Zug")
+    partien = args.spiele * len(statistik['ergebnisse'])
+    print(f"{partien} Partien in {statistik['sekunden']:.1f} s mit {statistik['prozesse']} Prozessen "
+          f"({partien / statistik['sekunden']:.0f} Partien/s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Datenschicht der Bundesliga-Analyse: schema-gesteuertes, blockweises Einlesen einer oder mehrerer
+Liga-CSVs in kompakte Datentypen, Feather-Cache der bereinigten Daten und der versionierte
+Datensatz, auf den sich alle Caches beziehen.
+"""
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from pandas.api.types import union_categoricals
+
+# Bereinigte Daten werden hier als Feather-Datei abgelegt (siehe lade_datensatz)
+CACHE_VERZEICHNIS = os.path.join(os.path.dirname(__file__), "data", ".cache")
+# Erhöhen, sobald sich die Bereinigung ändert – alte Cache-Dateien werden dann verworfen
+CACHE_SCHEMA_VERSION = 3
+
+# Zeilen je Einlese-Block; begrenzt den Spitzenbedarf der Rohdaten (Strings) beim Laden
+CHUNK_ZEILEN = 50_000
+# So viele abgelehnte Zeilen bzw. Hinweise werden im Ladebericht einzeln aufgeführt
+MAX_BERICHT_EINTRAEGE = 1000
+
+# Spalten der Quelldateien in Dateireihenfolge: (Zielname, dtype, erlaubter Bereich).
+# Spalten ohne Zielnamen werden schon beim Einlesen übersprungen: die Punkte je Regel und die
+# kumulierten Werte der Quelle leitet bl_ewig aus den Saisonwerten ab.
+QUELL_SCHEMA = [
+    ('Saison_Start', 'int16', (1800, 2200)),
+    ('Saison_Ende', 'int16', (1800, 2200)),
+    ('Rang', 'int8', (1, None)),
+    ('Verein', 'category', None),
+    ('Spiele_Saison', 'int16', (0, None)),
+    ('Punkte_Aktuell', 'int16', None),
+    ('Tordifferenz_Saison', 'int16', None),
+    ('Tore_Saison', 'int16', (0, None)),
+    ('Gegentore_Saison', 'int16', (0, None)),
+    ('Siege_Saison', 'int16', (0, None)),
+    ('Unentschieden_Saison', 'int16', (0, None)),
+    ('Niederlagen_Saison', 'int16', (0, None)),
+    (None, None, None),  # Punkte nach 3-Punkte-Regel
+    (None, None, None),  # Punkte nach 2-Punkte-Regel
+    ('Stadt', 'category', None),
+    ('Breitengrad', 'float32', (-90, 90)),
+    ('Längengrad', 'float32', (-180, 180)),
+] + [(None, None, None)] * 10  # kumulierte Werte der Quelle (Spiele bis Punkte nach 2er-Regel)
+
+# Pflichtspalten; Koordinaten und Stadt dürfen fehlen
+PFLICHT_SPALTEN = [name for name, dtype, _ in QUELL_SCHEMA if dtype in ('int8', 'int16')] + ['Verein']
+
+# Einheiten- und Präfixreste in Zahlenfeldern der Quelle ("50.9333∘N", "Punkte_45")
+ZAHL_RESTE = r'[∘°][NO]|Punkte_'
+
+# Vereinsnamen, die in der Quelle in mehreren Schreibweisen vorkommen
+NAMENS_KORREKTUREN = [
+    ('VFB Stuttgart', 'VfB Stuttgart'),
+    ('VFL ', 'VfL '),
+    ('Spvgg ', 'SpVgg '),
+]
+
+class LigaDatensatz:
+    """
+    Bereinigte Ligadaten mit einem vorab berechneten Fingerabdruck (SHA-256 der Quellen plus
+    Schema-Version). Abgeleitete Caches verwenden den Fingerabdruck als Schlüssel, statt bei
+    jedem Rerun den kompletten DataFrame zu hashen.
+    """
+    __slots__ = ('df', 'fingerprint', 'bericht')
+
+    def __init__(self, df, fingerprint, bericht=None):
+        self.df = df
+        self.fingerprint = fingerprint
+        self.bericht = bericht if bericht is not None else Ladebericht()
+
+    def __repr__(self):
+        return f"LigaDatensatz({len(self.df)} Zeilen, {self.fingerprint[:12]})"
+
+    @property
+    def ligen(self):
+        """Namen der enthaltenen Ligen (Dateinamen der Quellen), sortiert."""
+        if 'Liga' not in self.df.columns:
+            return []
+        return sorted(self.df['Liga'].dropna().unique().astype(str))
+
+    def liga(self, name):
+        """
+        Datensatz nur dieser Liga. Tabellen, ewige Tabelle und Meisterschaften gelten je Liga;
+        über mehrere Ligen zusammengefasst würden Saisons eines Vereins doppelt gezählt. Der
+        Fingerabdruck enthält den Liganamen, abgeleitete Caches bleiben so je Liga getrennt.
+        """
+        if name not in self.ligen:
+            raise ValueError(f"Unbekannte Liga '{name}' (vorhanden: {', '.join(self.ligen)})")
+        df = self.df[self.df['Liga'] == name].reset_index(drop=True)
+        df['Liga'] = df['Liga'].cat.remove_unused_categories()
+        return LigaDatensatz(df, f"{self.fingerprint}:{name}", self.bericht)
+
+class Ladebericht:
+    """
+    Ergebnis der Validierung: gelesene Dateien und Zeilen, abgelehnte Dateien bzw. Zeilen und
+    Hinweise auf Zeilen, die geladen, aber inhaltlich auffällig sind (z. B. Siege + Unentschieden
+    + Niederlagen ≠ Spiele bei annullierten Punkten). Einträge sind dicts mit Datei, Zeile
+    (Zeilennummer in der Datei, None für die ganze Datei) und Grund.
+    """
+    __slots__ = ('dateien', 'zeilen_gelesen', 'anzahl_abgelehnt', 'anzahl_hinweise', 'abgelehnt', 'hinweise')
+
+    def __init__(self, dateien=(), zeilen_gelesen=0, anzahl_abgelehnt=0, anzahl_hinweise=0,
+                 abgelehnt=(), hinweise=()):
+        self.dateien = list(dateien)
+        self.zeilen_gelesen = zeilen_gelesen
+        self.anzahl_abgelehnt = anzahl_abgelehnt
+        self.anzahl_hinweise = anzahl_hinweise
+        self.abgelehnt = list(abgelehnt)
+        self.hinweise = list(hinweise)
+
+    def __repr__(self):
+        return (f"Ladebericht({len(self.dateien)} Dateien, {self.zeilen_gelesen} Zeilen, "
+                f"{self.anzahl_abgelehnt} abgelehnt, {self.anzahl_hinweise} Hinweise)")
+
+    def ablehnen(self, datei, zeilen, gruende):
+        self.anzahl_abgelehnt += len(zeilen)
+        self._eintragen(self.abgelehnt, datei, zeilen, gruende)
+
+    def hinweisen(self, datei, zeilen, gruende):
+        self.anzahl_hinweise += len(zeilen)
+        self._eintragen(self.hinweise, datei, zeilen, gruende)
+
+    @staticmethod
+    def _eintragen(liste, datei, zeilen, gruende):
+        frei = MAX_BERICHT_EINTRAEGE - len(liste)
+        liste.extend(
+            {'datei': datei, 'zeile': zeile, 'grund': grund}
+            for zeile, grund in list(zip(zeilen, gruende))[:max(frei, 0)]
+        )
+
+    def als_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def lade_datensatz(path):
+    """
+    Lädt die bereinigten Daten aus dem Feather-Cache. path ist eine CSV-Datei, ein Verzeichnis
+    mit CSVs (je Datei eine Liga, Spalte Liga = Dateiname) oder eine Liste von Dateien. Ist der
+    Cache veraltet, werden die Quellen neu eingelesen und der Cache aktualisiert. Bleibt keine
+    gültige Zeile übrig, wird ein ValueError mit den Gründen gemeldet.
+    """
+    dateien = _quelldateien(path)
+    if not dateien:
+        raise ValueError(f"Keine CSV-Dateien gefunden: {path}")
+
+    df_clean, shas, bericht = _lade_aus_cache(dateien)
+    if df_clean is None:
+        df_clean, bericht = _lade_csvs(dateien)
+        shas = [_datei_hash(datei) for datei in dateien]
+        _schreibe_cache(dateien, df_clean, shas, bericht)
+    return LigaDatensatz(df_clean, f"{_gesamt_hash(shas)}:{CACHE_SCHEMA_VERSION}", bericht)
+
+def speicherbedarf(objekt):
+    """
+    Schätzt den Speicherbedarf in Bytes von DataFrames, Series, Arrays und verschachtelten
+    dicts/lists/tuples daraus. Dient als Kennzahl für den prozessweit geteilten Datenbestand.
+    """
+    if isinstance(objekt, pd.DataFrame):
+        return int(objekt.memory_usage(deep=True).sum())
+    if isinstance(objekt, (pd.Series, pd.Index)):
+        return int(objekt.memory_usage(deep=True))
+    if isinstance(objekt, np.ndarray):
+        if objekt.dtype == object:
+            return objekt.nbytes + sum(sys.getsizeof(wert) for wert in objekt.ravel())
+        return objekt.nbytes
+    if isinstance(objekt, LigaDatensatz):
+        return speicherbedarf(objekt.df)
+    if isinstance(objekt, dict):
+        return sys.getsizeof(objekt) + sum(speicherbedarf(k) + speicherbedarf(v) for k, v in objekt.items())
+    if isinstance(objekt, (list, tuple)):
+        return sys.getsizeof(objekt) + sum(speicherbedarf(wert) for wert in objekt)
+    return sys.getsizeof(objekt)
+
+def _quelldateien(path):
+    if isinstance(path, (list, tuple)):
+        return [os.path.abspath(datei) for datei in path]
+    if os.path.isdir(path):
+        return sorted(os.path.abspath(datei) for datei in glob.glob(os.path.join(path, '*.csv')))
+    return [os.path.abspath(path)]
+
+def _datei_hash(path):
+    """SHA-256 des Dateiinhalts, blockweise gelesen."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _gesamt_hash(shas):
+    """Fingerabdruck mehrerer Quellen; bei einer Datei deren eigener SHA-256."""
+    if len(shas) == 1:
+        return shas[0]
+    return hashlib.sha256('|'.join(shas).encode()).hexdigest()
+
+def _cache_pfade(dateien):
+    if len(dateien) == 1:
+        name = os.path.splitext(os.path.basename(dateien[0]))[0]
+    else:
+        name = 'ligen_' + hashlib.sha256('|'.join(dateien).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_VERZEICHNIS, f"{name}.meta.json"), os.path.join(CACHE_VERZEICHNIS, f"{name}.feather")
+
+def _lade_aus_cache(dateien):
+    """
+    Liefert (bereinigte Daten, SHA-256 je Quelle, Ladebericht) aus dem Feather-Cache oder
+    (None, None, None), wenn er fehlt oder veraltet ist.
+    Stimmen Größe und mtime einer Quelle mit den Metadaten überein, wird ihr Inhalt nicht neu
+    gehasht; andernfalls entscheidet der SHA-256 (z. B. nach einem Checkout mit neuer mtime).
+    """
+    meta_pfad, cache_pfad = _cache_pfade(dateien)
+    try:
+        with open(meta_pfad, encoding='utf-8') as f:
+            meta = json.load(f)
+        quellen = meta.get('quellen', [])
+        if (meta.get('schema') != CACHE_SCHEMA_VERSION or not os.path.exists(cache_pfad)
+                or [quelle['pfad'] for quelle in quellen] != dateien):
+            return None, None, None
+        geaendert = False
+        for quelle in quellen:
+            stat = os.stat(quelle['pfad'])
+            if (quelle.get('groesse'), quelle.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+                if quelle.get('sha256') != _datei_hash(quelle['pfad']):
+                    return None, None, None
+                quelle.update(groesse=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                geaendert = True
+        if geaendert:
+            with open(meta_pfad, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+        # Alle Spalten werden gebraucht und in pandas-Speicher kopiert; unkomprimiert entfällt
+        # dabei nur das Dekomprimieren, nicht die Kopie
+        df_clean = feather.read_feather(cache_pfad)
+        return df_clean, [quelle['sha256'] for quelle in quellen], Ladebericht(**meta['bericht'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None, None
+
+def _schreibe_cache(dateien, df_clean, shas, bericht):
+    """Schreibt die bereinigten Daten unkomprimiert samt Metadaten der Quellen."""
+    meta_pfad, cache_pfad = _cache_pfade(dateien)
+    try:
+        os.makedirs(CACHE_VERZEICHNIS, exist_ok=True)
+        quellen = []
+        for datei, sha256 in zip(dateien, shas):
+            stat = os.stat(datei)
+            quellen.append({'pfad': datei, 'groesse': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256})
+        meta = {'schema': CACHE_SCHEMA_VERSION, 'quellen': quellen, 'bericht': bericht.als_dict()}
+        # Erst in temporäre Dateien schreiben, damit parallele Prozesse nie halbe Dateien lesen
+        feather.write_feather(df_clean, cache_pfad + '.tmp', compression='uncompressed')
+        os.replace(cache_pfad + '.tmp', cache_pfad)
+        with open(meta_pfad + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_pfad + '.tmp', meta_pfad)
+    except OSError:
+        # Ohne beschreibbares Datenverzeichnis wird einfach jedes Mal neu bereinigt
+        pass
+
+
+# --- EINLESEN UND VALIDIEREN ---
+
+def _lade_csvs(dateien):
+    """Liest alle Quellen blockweise ein; liefert (DataFrame in kompakten Typen, Ladebericht)."""
+    bericht = Ladebericht(dateien=[os.path.basename(datei) for datei in dateien])
+    teile = []
+    for datei in dateien:
+        teile.extend(_lade_csv(datei, bericht))
+
+    if not teile:
+        gruende = '; '.join(f"{e['datei']}: {e['grund']}" for e in bericht.abgelehnt[:5])
+        raise ValueError(f"Keine gültigen Zeilen geladen ({bericht.anzahl_abgelehnt} abgelehnt). {gruende}")
+    return _zusammenfuehren(teile), bericht
+
+def _lade_csv(datei, bericht):
+    """Liest eine Quelle in Blöcken von CHUNK_ZEILEN; abgelehnte Zeilen landen im Bericht."""
+    name = os.path.basename(datei)
+    liga = os.path.splitext(name)[0]
+    positionen = [i for i, (ziel, _, _) in enumerate(QUELL_SCHEMA) if ziel is not None]
+    zielnamen = [QUELL_SCHEMA[i][0] for i in positionen]
+
+    try:
+        spaltenzahl = len(pd.read_csv(datei, sep=';', nrows=0, encoding='utf-8-sig').columns)
+        if spaltenzahl < len(QUELL_SCHEMA):
+            raise ValueError(f"Falsche Spaltenanzahl ({spaltenzahl} statt {len(QUELL_SCHEMA)}).")
+        teile = []
+        bloecke = pd.read_csv(
+            datei, sep=';', encoding='utf-8-sig', usecols=positionen, dtype=str, chunksize=CHUNK_ZEILEN
+        )
+        for block in bloecke:
+            # Zeilennummer in der Datei (1 = Kopfzeile)
+            zeilen = block.index.to_numpy() + 2
+            block.columns = zielnamen
+            bericht.zeilen_gelesen += len(block)
+            teil = _block_bereinigen(block.reset_index(drop=True), zeilen, name, bericht)
+            if not teil.empty:
+                teil['Liga'] = pd.Categorical([liga] * len(teil))
+                teile.append(teil)
+        return teile
+    except (OSError, ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        # Die Datei fällt als Ganzes heraus, die übrigen Ligen werden trotzdem geladen
+        bericht.ablehnen(name, [None], [f"Fehler beim Laden der CSV-Datei: {e}"])
+        return []
+
+def _block_bereinigen(block, zeilen, datei, bericht):
+    """Wandelt einen Block Roh-Strings in die Ziel-Typen; ungültige Zeilen werden abgelehnt."""
+    grund = pd.Series(None, index=block.index, dtype=object)
+    ergebnis = {}
+
+    for name, dtype, bereich in QUELL_SCHEMA:
+        if name is None:
+            continue
+        roh = block[name].str.strip()
+        if dtype == 'category':
+            if name == 'Verein':
+                for alt, neu in NAMENS_KORREKTUREN:
+                    roh = roh.str.replace(alt, neu, regex=False)
+            ergebnis[name] = roh
+            fehlt = roh.isna() | (roh == '')
+        else:
+            werte = pd.to_numeric(roh.str.replace(ZAHL_RESTE, '', regex=True), errors='coerce')
+            untere, obere = bereich or (None, None)
+            if dtype.startswith('int'):
+                info = np.iinfo(dtype)
+                untere = info.min if untere is None else untere
+                obere = info.max if obere is None else obere
+            ausserhalb = pd.Series(False, index=block.index)
+            if untere is not None:
+                ausserhalb |= werte < untere
+            if obere is not None:
+                ausserhalb |= werte > obere
+            # Nicht lesbare Werte: Rohwert vorhanden, Zahl nicht
+            fehlt = (werte.isna() & roh.notna()) | ausserhalb
+            ergebnis[name] = werte.mask(ausserhalb)
+        if name in PFLICHT_SPALTEN:
+            fehlt |= ergebnis[name].isna()
+        neu = fehlt & grund.isna()
+        grund[neu] = f"{name}: ungültiger Wert '" + block.loc[neu, name].fillna('') + "'"
+
+    abgelehnt = grund.notna().to_numpy()
+    if abgelehnt.any():
+        bericht.ablehnen(datei, zeilen[abgelehnt].tolist(), grund[abgelehnt].tolist())
+
+    gueltig = ~abgelehnt
+    df = pd.DataFrame({
+        name: (ergebnis[name][gueltig].astype(dtype) if dtype != 'category' else ergebnis[name][gueltig])
+        for name, dtype, _ in QUELL_SCHEMA if name is not None
+    }).reset_index(drop=True)
+    for spalte in ('Verein', 'Stadt'):
+        df[spalte] = df[spalte].astype('category')
+    _hinweise_pruefen(df, zeilen[gueltig], datei, bericht)
+    return df
+
+def _hinweise_pruefen(df, zeilen, datei, bericht):
+    """Inhaltliche Prüfungen; auffällige Zeilen bleiben erhalten und werden nur gemeldet."""
+    pruefungen = [
+        (df['Siege_Saison'] + df['Unentschieden_Saison'] + df['Niederlagen_Saison'] != df['Spiele_Saison'],
+         "Siege + Unentschieden + Niederlagen ≠ Spiele"),
+        (df['Tore_Saison'] - df['Gegentore_Saison'] != df['Tordifferenz_Saison'], "Tore - Gegentore ≠ Tordifferenz"),
+        (df['Saison_Ende'] != df['Saison_Start'] + 1, "Saison_Ende ≠ Saison_Start + 1"),
+    ]
+    for maske, grund in pruefungen:
+        maske = maske.to_numpy()
+        if maske.any():
+            bericht.hinweisen(datei, zeilen[maske].tolist(), [grund] * int(maske.sum()))
+
+def _zusammenfuehren(teile):
+    """
+    Fügt die Blöcke zusammen. pd.concat würde Kategorien mit unterschiedlichen Werten zu object
+    machen; union_categoricals vereinigt sie stattdessen zu einer gemeinsamen Kategorie.
+    """
+    kategorien = [spalte for spalte in teile[0].columns if isinstance(teile[0][spalte].dtype, pd.CategoricalDtype)]
+    df = pd.concat([teil.drop(columns=kategorien) for teil in teile], ignore_index=True)
+    for spalte in kategorien:
+        df[spalte] = union_categoricals([teil[spalte] for teil in teile], sort_categories=True)
+    return df[list(teile[0].columns)]
@@ -0,0 +1,144 @@
+"""
+Ewige Tabelle aus den Saisonwerten: kumulierte Bilanz je Verein per groupby-cumsum,
+beliebige Punkte-Regeln und inkrementelles Anhängen bzw. Aktualisieren einer Saison.
+"""
+import pandas as pd
+
+# Punkte für (Sieg, Unentschieden) je benannter Regel
+PUNKT_REGELN = {
+    '2er': (2, 1),
+    '3er': (3, 1),
+}
+
+# Saisonspalte -> kumulierte Spalte der ewigen Tabelle
+BILANZ_SPALTEN = {
+    'Spiele_Saison': 'Spiele_Ewig',
+    'Siege_Saison': 'Siege_Ewig',
+    'Unentschieden_Saison': 'Unentschieden_Ewig',
+    'Niederlagen_Saison': 'Niederlagen_Ewig',
+    'Tore_Saison': 'Tore_Ewig',
+    'Gegentore_Saison': 'Gegentore_Ewig',
+}
+EWIG_SPALTEN = list(BILANZ_SPALTEN.values())
+
+def _saison_werte(df):
+    """
+    Bilanz je (Saison, Verein) als int64; doppelte Einträge einer Saison werden addiert. Die
+    Werte müssen aus einer Liga stammen (siehe bl_daten.LigaDatensatz.liga), sonst würden die
+    Saisons eines Vereins in zwei Ligen zusammengezählt.
+    """
+    if 'Liga' in df.columns and df['Liga'].nunique() > 1:
+        raise ValueError("Die ewige Tabelle gilt je Liga; der Datensatz enthält mehrere Ligen.")
+    werte = df[['Saison_Start', 'Verein'] + list(BILANZ_SPALTEN)].copy()
+    werte['Verein'] = werte['Verein'].astype(str)
+    werte['Saison_Start'] = werte['Saison_Start'].astype('int64')
+    werte[list(BILANZ_SPALTEN)] = werte[list(BILANZ_SPALTEN)].fillna(0).astype('int64')
+    return werte.groupby(['Saison_Start', 'Verein'], sort=True, observed=True).sum().reset_index()
+
+def _mit_punkten(df, punkte_sieg, punkte_remis):
+    df = df.copy()
+    df['Tordifferenz_Ewig'] = df['Tore_Ewig'] - df['Gegentore_Ewig']
+    df['Punkte_Ewig'] = df['Siege_Ewig'] * punkte_sieg + df['Unentschieden_Ewig'] * punkte_remis
+    return df
+
+class EwigeTabelle:
+    """
+    Kumulierte Bilanz aller Vereine über die Saisons.
+
+    Der Verlauf wird je Saison gespeichert. saison_anhaengen schreibt nur die Zeilen der
+    neuen Saison fort (Stand vor der Saison + Saisonbilanz); wird die letzte Saison erneut
+    übergeben, ersetzt sie den bisherigen Stand dieser Saison (Spieltags-Update).
+    """
+
+    def __init__(self, df=None):
+        self._saisons = {}
+        self._stand = pd.DataFrame(columns=EWIG_SPALTEN, dtype='int64', index=pd.Index([], name='Verein'))
+        self._stand_vorher = self._stand
+        self._letzte_saison = None
+        self._verlauf = None
+        if df is not None and not df.empty:
+            self._aufbauen(df)
+
+    def _aufbauen(self, df):
+        """Vektorisierter Erstaufbau per groupby-cumsum über alle Saisons."""
+        werte = _saison_werte(df)
+        kumuliert = werte.groupby('Verein', sort=False)[list(BILANZ_SPALTEN)].cumsum()
+        verlauf = werte[['Saison_Start', 'Verein']].join(kumuliert.rename(columns=BILANZ_SPALTEN))
+
+        self._saisons = {
+            int(saison): teil.reset_index(drop=True)
+            for saison, teil in verlauf.groupby('Saison_Start', sort=True)
+        }
+        self._letzte_saison = max(self._saisons)
+        self._stand = verlauf.drop_duplicates('Verein', keep='last').set_index('Verein')[EWIG_SPALTEN]
+        self._stand_vorher = (
+            verlauf[verlauf['Saison_Start'] < self._letzte_saison]
+            .drop_duplicates('Verein', keep='last').set_index('Verein')[EWIG_SPALTEN]
+        )
+        self._verlauf = verlauf.reset_index(drop=True)
+
+    @property
+    def letzte_saison(self):
+        return self._letzte_saison
+
+    def saison_anhaengen(self, df_saison):
+        """
+        Schreibt die ewige Tabelle um eine Saison fort und gibt deren kumulierte Zeilen zurück.
+        Ist es die bereits vorhandene letzte Saison, wird sie ersetzt (z. B. nach einem Spieltag).
+        """
+        werte = _saison_werte(df_saison)
+        saisons = werte['Saison_Start'].unique()
+        if len(saisons) != 1:
+            raise ValueError("Es kann genau eine Saison auf einmal angehängt werden.")
+        saison = int(saisons[0])
+
+        if self._letzte_saison is not None and saison < self._letzte_saison:
+            raise ValueError(
+                f"Saison {saison} liegt vor der letzten Saison {self._letzte_saison}; "
+                "nur die letzte Saison kann aktualisiert werden."
+            )
+        if saison != self._letzte_saison:
+            self._stand_vorher = self._stand
+
+        basis = self._stand_vorher.reindex(werte['Verein']).fillna(0).to_numpy(dtype='int64')
+        neu = werte[['Saison_Start', 'Verein']].copy()
+        neu[EWIG_SPALTEN] = basis + werte[list(BILANZ_SPALTEN)].to_numpy()
+
+        self._saisons[saison] = neu
+        self._stand = pd.concat([
+            self._stand_vorher.drop(index=neu['Verein'], errors='ignore'),
+            neu.set_index('Verein')[EWIG_SPALTEN],
+        ])
+        self._letzte_saison = saison
+        self._verlauf = None
+        return neu
+
+    def verlauf(self, punkte_sieg=2, punkte_remis=1):
+        """Kumulierte Bilanz je Verein und Teilnahme-Saison inkl. Punkten nach der Regel."""
+        if self._verlauf is None:
+            teile = [self._saisons[saison] for saison in sorted(self._saisons)]
+            self._verlauf = (
+                pd.concat(teile, ignore_index=True) if teile
+                else pd.DataFrame(columns=['Saison_Start', 'Verein'] + EWIG_SPALTEN)
+            )
+        return _mit_punkten(self._verlauf, punkte_sieg, punkte_remis)
+
+    def stand(self, bis_saison=None, punkte_sieg=2, punkte_remis=1):
+        """
+        Ewige Tabelle nach der Regel (Punkte je Sieg/Unentschieden), sortiert nach Punkten,
+        Tordifferenz und Toren. Ohne bis_saison gilt der aktuelle Stand.
+        """
+        if bis_saison is None or (self._letzte_saison is not None and bis_saison >= self._letzte_saison):
+            df_stand = self._stand.reset_index()
+        else:
+            df_verlauf = self.verlauf()
+            df_stand = (
+                df_verlauf[df_verlauf['Saison_Start'] <= bis_saison]
+                .drop_duplicates('Verein', keep='last')[['Verein'] + EWIG_SPALTEN]
+            )
+        df_stand = _mit_punkten(df_stand, punkte_sieg, punkte_remis).sort_values(
+            by=['Punkte_Ewig', 'Tordifferenz_Ewig', 'Tore_Ewig', 'Verein'],
+            ascending=[False, False, False, True]
+        ).reset_index(drop=True)
+        df_stand.insert(0, 'Rang', df_stand.index + 1)
+        return df_stand
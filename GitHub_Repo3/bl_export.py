@@ -0,0 +1,236 @@
+"""
+Stapel-Export der Bundesliga-Analyse: Tabellen (beide Punkte-Regeln) und Landkarte jeder Saison
+als eigenständige HTML- bzw. JSON-Dateien, gerendert in einem Prozess-Pool.
+
+Der bereinigte Datensatz wird einmal geladen und ausgewertet; die Worker erben das Ergebnis
+(fork) bzw. erhalten es einmal beim Start, statt liga.csv selbst zu lesen. Ein Manifest im
+Zielverzeichnis merkt sich je Datei einen Hash ihrer Eingaben, unveränderte Dateien werden
+übersprungen.
+
+    python bl_export.py --ziel export
+    python bl_export.py --format json --prozesse 4 --erzwingen
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.offline
+
+import bl_daten
+import bl_grafik
+
+DATEI_PFAD = os.path.join(os.path.dirname(__file__), "data", "liga.csv")
+ZIEL_VERZEICHNIS = os.path.join(os.path.dirname(__file__), "export")
+MANIFEST_NAME = "manifest.json"
+FORMATE = ('html', 'json')
+
+# Ändert sich der Code der Figuren, sind alle bisherigen Exporte veraltet
+with open(bl_grafik.__file__, 'rb') as _quelle:
+    CODE_HASH = hashlib.sha256(_quelle.read()).hexdigest()
+
+# Vorberechnete Tabellen und Kartenbasis; im Worker per fork geerbt oder über _worker_start gesetzt
+_BASIS = None
+
+
+# --- AUFGABEN ---
+
+def _eingabe_hash(*teile):
+    """Hash über DataFrames, Arrays und einfache Werte, aus denen eine Datei entsteht."""
+    h = hashlib.sha256(CODE_HASH.encode())
+    for teil in teile:
+        if isinstance(teil, pd.DataFrame):
+            h.update(json.dumps(list(map(str, teil.columns))).encode())
+            h.update(pd.util.hash_pandas_object(teil, index=False).to_numpy().tobytes())
+        elif isinstance(teil, np.ndarray):
+            h.update(pd.util.hash_array(np.asarray(teil).ravel().astype(str)).tobytes())
+        else:
+            h.update(json.dumps(teil, default=str, ensure_ascii=False).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+def aufgaben_erstellen(basis, formate, plotlyjs):
+    """
+    Eine Aufgabe je Datei-Stamm: (relativer Pfad ohne Endung, Art, Saison, Regel, Eingabe-Hash).
+    Der Hash deckt nur die Daten ab, die in die Figur einfließen – eine neu angehängte Saison
+    lässt die Exporte früherer Saisons daher unverändert.
+    """
+    standings_index, karten_basis = basis
+    optionen = (sorted(formate), plotlyjs)
+    aufgaben = []
+    for (saison, punkt_regel), (df_current, df_ewig, saison_ende, punkt_titel) in sorted(standings_index.items()):
+        aufgaben.append((
+            os.path.join('tabellen', f'{saison}_{punkt_regel}'), 'tabellen', saison, punkt_regel,
+            _eingabe_hash(df_current, df_ewig, int(saison_ende), punkt_titel, optionen),
+        ))
+
+    saisons = karten_basis['Saisons']
+    for spalte, saison in enumerate(int(saison) for saison in saisons):
+        vereine = karten_basis['Vereine_je_Saison'].get(saison, {})
+        aufgaben.append((
+            os.path.join('karte', f'{saison}'), 'karte', saison, None,
+            _eingabe_hash(
+                karten_basis['Breitengrad'], karten_basis['Längengrad'], karten_basis['Hover'][:, spalte],
+                karten_basis['Meisterschaften_Kumuliert'][:, spalte],
+                *(np.asarray(vereine.get(feld, [])) for feld in ('Breitengrad', 'Längengrad', 'Farbe', 'Text')),
+                optionen,
+            ),
+        ))
+    return aufgaben
+
+def _figur(art, saison, punkt_regel):
+    standings_index, karten_basis = _BASIS
+    if art == 'tabellen':
+        df_current, df_ewig, saison_ende, punkt_titel = standings_index[(saison, punkt_regel)]
+        return bl_grafik.plot_tables(df_current, df_ewig, punkt_titel, f"{saison}/{str(saison_ende)[-2:]}")
+    return bl_grafik.plot_map_with_history(karten_basis, saison)
+
+def _schreibe(pfad, inhalt):
+    """Schreibt über eine temporäre Datei, damit abgebrochene Exporte keine halben Dateien hinterlassen."""
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    tmp_pfad = f"{pfad}.tmp{os.getpid()}"
+    with open(tmp_pfad, 'w', encoding='utf-8') as f:
+        f.write(inhalt)
+    os.replace(tmp_pfad, pfad)
+
+def exportiere(aufgabe, ziel, formate, plotlyjs):
+    """Rendert eine Aufgabe im Worker; liefert (Stamm, Eingabe-Hash, Sekunden)."""
+    stamm, art, saison, punkt_regel, eingabe_hash = aufgabe
+    start = time.perf_counter()
+    fig = _figur(art, saison, punkt_regel)
+    if 'json' in formate:
+        _schreibe(os.path.join(ziel, f'{stamm}.json'), fig.to_json())
+    if 'html' in formate:
+        # plotly.js liegt bei 'directory' einmal im Zielverzeichnis, relativ zur Unterordner-Ebene
+        js = '../plotly.min.js' if plotlyjs == 'directory' else plotlyjs
+        _schreibe(os.path.join(ziel, f'{stamm}.html'), fig.to_html(include_plotlyjs=js, full_html=True))
+    return stamm, eingabe_hash, time.perf_counter() - start
+
+def _exportiere_stapel(stapel, ziel, formate, plotlyjs):
+    return [exportiere(aufgabe, ziel, formate, plotlyjs) for aufgabe in stapel]
+
+def _worker_start(basis):
+    global _BASIS
+    _BASIS = basis
+
+
+# --- MANIFEST ---
+
+def lade_manifest(ziel):
+    try:
+        with open(os.path.join(ziel, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def schreibe_manifest(ziel, manifest):
+    _schreibe(os.path.join(ziel, MANIFEST_NAME), json.dumps(manifest, indent=1, sort_keys=True))
+
+def _aktuell(aufgabe, manifest, ziel, formate):
+    stamm, _, _, _, eingabe_hash = aufgabe
+    return manifest.get(stamm) == eingabe_hash and all(
+        os.path.exists(os.path.join(ziel, f'{stamm}.{endung}')) for endung in formate
+    )
+
+
+# --- AUSFÜHRUNG ---
+
+def _pool(prozesse, basis):
+    """Prozess-Pool, dessen Worker die vorberechnete Basis kennen, ohne sie je Aufgabe zu übertragen."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Geerbt per Copy-on-Write: kein Pickling, kein erneutes Lesen
+        return concurrent.futures.ProcessPoolExecutor(prozesse, mp_context=multiprocessing.get_context('fork'))
+    return concurrent.futures.ProcessPoolExecutor(prozesse, initializer=_worker_start, initargs=(basis,))
+
+def export_ausfuehren(daten, ziel, formate=FORMATE, prozesse=None, plotlyjs='directory', erzwingen=False):
+    """
+    Exportiert alle Saisons des Datensatzes nach ziel. Liefert eine Statistik mit der Anzahl
+    gerenderter und übersprungener Dateien, der Laufzeit und der Summe der Einzelzeiten.
+    """
+    global _BASIS
+    start = time.perf_counter()
+    prozesse = prozesse or os.cpu_count() or 1
+
+    basis = (
+        bl_grafik.berechne_standings_index(daten.df),
+        bl_grafik.berechne_karten_basis(daten.df),
+    )
+    _BASIS = basis
+
+    manifest = {} if erzwingen else lade_manifest(ziel)
+    aufgaben = aufgaben_erstellen(basis, formate, plotlyjs)
+    offen = [aufgabe for aufgabe in aufgaben if not _aktuell(aufgabe, manifest, ziel, formate)]
+
+    os.makedirs(ziel, exist_ok=True)
+    js_pfad = os.path.join(ziel, 'plotly.min.js')
+    if 'html' in formate and plotlyjs == 'directory' and not os.path.exists(js_pfad):
+        _schreibe(js_pfad, plotly.offline.get_plotlyjs())
+
+    ergebnisse = []
+    if prozesse == 1 or len(offen) <= 1:
+        ergebnisse = _exportiere_stapel(offen, ziel, formate, plotlyjs)
+    elif offen:
+        # Mehrere Aufgaben je Übertragung, aber genug Stapel für eine gleichmäßige Verteilung
+        stapel_groesse = max(1, len(offen) // (prozesse * 4))
+        stapel = [offen[i:i + stapel_groesse] for i in range(0, len(offen), stapel_groesse)]
+        with _pool(prozesse, basis) as pool:
+            futures = [pool.submit(_exportiere_stapel, teil, ziel, formate, plotlyjs) for teil in stapel]
+            for future in concurrent.futures.as_completed(futures):
+                ergebnisse.extend(future.result())
+
+    # Veraltete Einträge (z. B. entfernte Saisons) fallen aus dem Manifest
+    gueltig = {aufgabe[0] for aufgabe in aufgaben}
+    manifest = {stamm: h for stamm, h in manifest.items() if stamm in gueltig}
+    manifest.update({stamm: eingabe_hash for stamm, eingabe_hash, _ in ergebnisse})
+    schreibe_manifest(ziel, manifest)
+
+    return {
+        'gerendert': len(ergebnisse),
+        'uebersprungen': len(aufgaben) - len(offen),
+        'prozesse': prozesse,
+        'sekunden': time.perf_counter() - start,
+        'summe_einzelzeiten': sum(dauer for _, _, dauer in ergebnisse),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportiert Tabellen und Karte aller Saisons als HTML/JSON.")
+    parser.add_argument('--daten', default=DATEI_PFAD, help="Pfad zu liga.csv oder Verzeichnis mit Liga-CSVs")
+    parser.add_argument('--liga', help="Zu exportierende Liga (Dateiname ohne .csv), nötig bei mehreren Ligen")
+    parser.add_argument('--ziel', default=ZIEL_VERZEICHNIS, help="Zielverzeichnis")
+    parser.add_argument('--format', choices=FORMATE, action='append',
+                        help="Ausgabeformat (mehrfach angebbar, Standard: html und json)")
+    parser.add_argument('--prozesse', type=int, default=None, help="Anzahl Worker (Standard: alle Kerne)")
+    parser.add_argument('--plotlyjs', choices=('directory', 'cdn', 'inline'), default='directory',
+                        help="plotly.js einmal im Zielverzeichnis, vom CDN oder in jeder HTML-Datei")
+    parser.add_argument('--erzwingen', action='store_true', help="Manifest ignorieren und alles neu rendern")
+    args = parser.parse_args(argv)
+
+    try:
+        daten = bl_daten.lade_datensatz(args.daten)
+        if args.liga:
+            daten = daten.liga(args.liga)
+        elif len(daten.ligen) > 1:
+            raise ValueError(f"Mehrere Ligen gefunden, bitte --liga angeben: {', '.join(daten.ligen)}")
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    plotlyjs = {'inline': True}.get(args.plotlyjs, args.plotlyjs)
+    statistik = export_ausfuehren(
+        daten, args.ziel, tuple(args.format or FORMATE), args.prozesse, plotlyjs, args.erzwingen
+    )
+    print(
+        f"{statistik['gerendert']} Figuren gerendert, {statistik['uebersprungen']} unverändert übersprungen "
+        f"in {statistik['sekunden']:.1f} s mit "
+        f"{statistik['prozesse']} Prozessen (Summe der Renderzeiten {statistik['summe_einzelzeiten']:.1f} s)"
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
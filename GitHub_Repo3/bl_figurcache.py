@@ -0,0 +1,69 @@
+"""
+Prozessweiter LRU-Cache für fertig gebaute Plotly-Figuren der Bundesliga-Analyse.
+"""
+import threading
+from collections import OrderedDict
+
+class FigurCache:
+    """
+    Threadsicherer LRU-Cache für Plotly-Figuren, begrenzt nach Anzahl und nach Bytes.
+
+    Gespeichert werden die validierten Figur-Objekte: st.plotly_chart wandelt eine Figur ohne
+    erneute Validierung in JSON um, während es aus JSON bzw. dicts erst wieder eine Figur
+    bauen und validieren würde. Als Größe eines Eintrags zählt die Länge des serialisierten
+    JSON, die beim Einfügen einmal bestimmt wird.
+    """
+
+    def __init__(self, max_eintraege=256, max_bytes=64 * 2**20):
+        self.max_eintraege = max_eintraege
+        self.max_bytes = max_bytes
+        self._eintraege = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.treffer = 0
+        self.fehlschlaege = 0
+        self.verdraengt = 0
+
+    def hole(self, schluessel, erzeugen):
+        """Liefert die Figur zum Schlüssel; fehlt sie, wird sie mit erzeugen() gebaut und abgelegt."""
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is not None:
+                self._eintraege.move_to_end(schluessel)
+                self.treffer += 1
+                return eintrag[0]
+            self.fehlschlaege += 1
+
+        # Außerhalb des Locks bauen, damit andere Sitzungen nicht warten müssen
+        fig = erzeugen()
+        groesse = len(fig.to_json())
+
+        with self._lock:
+            if groesse > self.max_bytes:
+                return fig
+            alt = self._eintraege.pop(schluessel, None)
+            if alt is not None:
+                self._bytes -= alt[1]
+            self._eintraege[schluessel] = (fig, groesse)
+            self._bytes += groesse
+            while len(self._eintraege) > self.max_eintraege or self._bytes > self.max_bytes:
+                _, (_, verdraengt_groesse) = self._eintraege.popitem(last=False)
+                self._bytes -= verdraengt_groesse
+                self.verdraengt += 1
+        return fig
+
+    def leeren(self):
+        with self._lock:
+            self._eintraege.clear()
+            self._bytes = 0
+
+    def statistik(self):
+        """Zähler und aktuelle Belegung als dict."""
+        with self._lock:
+            return {
+                'treffer': self.treffer,
+                'fehlschlaege': self.fehlschlaege,
+                'verdraengt': self.verdraengt,
+                'eintraege': len(self._eintraege),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,492 @@
+"""
+Tabellen, Karte und Vereinsvergleich der Bundesliga-Analyse: Berechnung und Plotly-Figuren
+ohne Streamlit. Genutzt von der App (bl_stat.py) und vom Stapel-Export (bl_export.py).
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+import bl_ewig
+import bl_messung
+
+# --- TABELLEN ---
+
+def _tabellen_formatieren(df_current_saison, df_ewig_table):
+    """Bringt Saisontabelle und (bereits sortierte) ewige Tabelle ins Anzeigeformat."""
+    df_current_disp = df_current_saison[[
+        'Rang', 'Verein', 'Spiele_Saison', 'Punkte_Aktuell', 'Tordifferenz_Saison', 
+        'Tore_Saison', 'Gegentore_Saison', 'Siege_Saison', 'Unentschieden_Saison', 'Niederlagen_Saison'
+    ]].copy()
+    df_current_disp.columns = ['Rang', 'Verein', 'Spiele', 'Punkte', 'Tordifferenz', 'Tore', 'Gegentore', 'Siege', 'Unentschieden', 'Niederlagen']
+    
+    df_ewig_disp = df_ewig_table[[
+        'Rang', 'Verein', 'Spiele_Ewig', 'Punkte_Ewig', 'Tordifferenz_Ewig', 
+        'Tore_Ewig', 'Gegentore_Ewig', 'Siege_Ewig', 'Unentschieden_Ewig', 'Niederlagen_Ewig'
+    ]].copy()
+    df_ewig_disp.columns = ['Rang', 'Verein', 'Spiele', 'Punkte', 'Tordifferenz', 'Tore', 'Gegentore', 'Siege', 'Unentschieden', 'Niederlagen']
+    
+    return df_current_disp, df_ewig_disp
+
+def _punkt_titel(punkt_regel):
+    punkte_sieg, _ = bl_ewig.PUNKT_REGELN[punkt_regel]
+    return f"Punkte ({punkte_sieg}-Punkte-Regel)"
+
+@bl_messung.gemessen
+def prepare_tables(df, saison_start_jahr, punkt_regel='2er', ewige_tabelle=None):
+    """
+    Berechnet die aktuelle Saisontabelle und die ewige Tabelle.
+    Die ewige Tabelle wird aus den Saisonbilanzen abgeleitet (bl_ewig.EwigeTabelle).
+    """
+    
+    df_current_saison = df[df['Saison_Start'] == saison_start_jahr].copy()
+    
+    if df_current_saison.empty:
+        return pd.DataFrame(), pd.DataFrame(), saison_start_jahr + 1, "Punkte (N/A)"
+
+    saison_ende = df_current_saison['Saison_Ende'].iloc[0]
+    if ewige_tabelle is None:
+        ewige_tabelle = bl_ewig.EwigeTabelle(df)
+    punkte_sieg, punkte_remis = bl_ewig.PUNKT_REGELN[punkt_regel]
+    df_ewig_table = ewige_tabelle.stand(saison_start_jahr, punkte_sieg, punkte_remis)
+    
+    df_current_disp, df_ewig_disp = _tabellen_formatieren(df_current_saison, df_ewig_table)
+    return df_current_disp, df_ewig_disp, saison_ende, _punkt_titel(punkt_regel)
+
+def berechne_standings_index(df):
+    """
+    Berechnet Saisontabelle und ewige Tabelle einmalig für alle Saisons und Punkte-Regeln.
+    Der Index bildet (Saison_Start, Punkte-Regel) auf das Ergebnis von prepare_tables ab,
+    sodass ein Slider-Wechsel nur noch ein Dictionary-Zugriff ist. Die ewige Tabelle wird
+    dabei Saison für Saison inkrementell fortgeschrieben.
+    """
+    standings_index = {}
+    ewige_tabelle = bl_ewig.EwigeTabelle()
+
+    for saison_start, df_current_saison in df.groupby('Saison_Start', sort=True):
+        ewige_tabelle.saison_anhaengen(df_current_saison)
+        saison_ende = df_current_saison['Saison_Ende'].iloc[0]
+
+        for punkt_regel, (punkte_sieg, punkte_remis) in bl_ewig.PUNKT_REGELN.items():
+            df_current_disp, df_ewig_disp = _tabellen_formatieren(
+                df_current_saison, ewige_tabelle.stand(punkte_sieg=punkte_sieg, punkte_remis=punkte_remis)
+            )
+            standings_index[(int(saison_start), punkt_regel)] = (
+                df_current_disp, df_ewig_disp, saison_ende, _punkt_titel(punkt_regel)
+            )
+
+    return standings_index
+
+def get_tables(standings_index, df, saison_start_jahr, punkt_regel='2er'):
+    """Liefert die Tabellen aus dem Index; unbekannte Saisons werden wie bisher berechnet."""
+    tabellen = standings_index.get((int(saison_start_jahr), punkt_regel))
+    if tabellen is None:
+        return prepare_tables(df, saison_start_jahr, punkt_regel)
+    return tabellen
+
+# Vereine je Seite der ewigen Tabelle in der App; der Export zeigt sie vollständig
+EWIG_SEITENGROESSE = 20
+
+def ewig_seiten(df_ewig, seitengroesse=EWIG_SEITENGROESSE):
+    return max(1, -(-len(df_ewig) // seitengroesse))
+
+@bl_messung.gemessen
+def plot_tables(df_current, df_ewig, punkt_titel, saison_str, ewig_seite=None, seitengroesse=EWIG_SEITENGROESSE):
+    """
+    Erstellt den Plotly Subplot mit zwei Tabellen nebeneinander. Mit ewig_seite (ab 0) enthält
+    die Figur nur diese Seite der ewigen Tabelle statt aller Vereine.
+    """
+    titel = _tabellen_titel(punkt_titel, saison_str)
+    if ewig_seite is not None:
+        # Die ewige Tabelle liegt bereits nach Rang sortiert vor, eine Seite ist ein Ausschnitt
+        anzahl = len(df_ewig)
+        df_ewig = df_ewig.iloc[ewig_seite * seitengroesse:(ewig_seite + 1) * seitengroesse]
+        titel[1] += f" · Plätze {ewig_seite * seitengroesse + 1}–{ewig_seite * seitengroesse + len(df_ewig)} von {anzahl}"
+
+    fig = make_subplots(
+        rows=1, cols=2,
+        specs=[[{'type': 'table'}, {'type': 'table'}]],
+        subplot_titles=titel
+    )
+    
+    def create_plotly_table(df):
+        header = dict(
+            values=['**' + col + '**' for col in df.columns],
+            fill_color='lightgray',
+            align='center',
+            line_color='darkslategray',
+            line_width=1,
+            height=30,
+            font=dict(color='black', size=12)
+        )
+        cells = dict(
+            values=[df[col] for col in df.columns],
+            fill_color=_zeilen_farben(df),
+            align='center',
+            line_color='darkslategray',
+            line_width=1,
+            height=25,
+            font=dict(color='black', size=11)
+        )
+        return go.Table(header=header, cells=cells)
+
+    fig.add_trace(create_plotly_table(df_current), row=1, col=1)
+    fig.add_trace(create_plotly_table(df_ewig), row=1, col=2)
+
+    fig.update_layout(
+        title_text="**Bundesliga Analyse: Saison vs. Ewige Tabelle**",
+        height=850, 
+        margin=dict(l=20, r=20, t=80, b=20)
+    )
+
+    return fig
+
+def _tabellen_titel(punkt_titel, saison_str):
+    return [
+        f'**Bundesliga Saison {saison_str}**',
+        f'**Ewige Tabelle (kumuliert bis {saison_str}) – {punkt_titel}**'
+    ]
+
+def _zeilen_farben(df):
+    return [['white', 'lightcyan'] * (len(df) // 2 + 1)][0][:len(df)]
+
+# --- ANIMIERTER MODUS (Slider im Browser statt Server-Rerun) ---
+
+# Obergrenze für das JSON einer animierten Figur; darüber wird serverseitig gerendert
+ANIMATION_BUDGET_BYTES = 4 * 2**20
+
+def _animation_abschliessen(fig, zustaende, trace_typen, budget_bytes):
+    """
+    Hängt Frames und Slider an eine Basisfigur an und prüft das Payload-Budget.
+
+    zustaende ist eine Liste aus (Name, [Attribute je Trace], Layout) je Saison. Plotly wendet
+    einen Frame auf den gerade angezeigten Zustand an; damit beliebige Sprünge mit dem Slider
+    korrekt bleiben, enthält jeder Frame alle Attribute, die sich zwischen irgendwelchen Saisons
+    unterscheiden. Attribute, die in allen Saisons gleich sind, und Traces ohne Änderungen
+    werden nur einmal in der Basisfigur übertragen.
+    """
+    _, erste_werte, _ = zustaende[0]
+    veraenderlich = [
+        [name for name in werte if any(z[1][i][name] != werte[name] for z in zustaende)]
+        for i, werte in enumerate(erste_werte)
+    ]
+    traces = [i for i, namen in enumerate(veraenderlich) if namen]
+
+    fig.frames = [
+        go.Frame(
+            name=name,
+            data=[trace_typen[i](**{n: werte[i][n] for n in veraenderlich[i]}) for i in traces],
+            traces=traces,
+            layout=layout
+        )
+        for name, werte, layout in zustaende
+    ]
+    frame_args = dict(mode='immediate', frame=dict(duration=0, redraw=True), transition=dict(duration=0))
+    fig.update_layout(
+        sliders=[dict(
+            active=len(zustaende) - 1,
+            currentvalue=dict(prefix='Saison: '),
+            pad=dict(t=30),
+            steps=[dict(label=name, method='animate', args=[[name], frame_args]) for name, _, _ in zustaende],
+        )],
+        updatemenus=[dict(
+            type='buttons',
+            showactive=False,
+            x=0, y=0, xanchor='right', yanchor='top',
+            pad=dict(t=30, r=10),
+            buttons=[
+                dict(label='▶', method='animate',
+                     args=[None, dict(frame_args, frame=dict(duration=400, redraw=True), fromcurrent=True)]),
+                dict(label='⏸', method='animate', args=[[None], frame_args]),
+            ],
+        )],
+    )
+
+    payload_bytes = len(fig.to_json())
+    if payload_bytes > budget_bytes:
+        return None, payload_bytes
+    return fig, payload_bytes
+
+def plot_tables_animiert(standings_index, punkt_regel, budget_bytes=ANIMATION_BUDGET_BYTES):
+    """
+    Tabellen-Figur mit Plotly-Frames für alle Saisons einer Punkte-Regel. Liefert
+    (Figur, Bytes) oder (None, Bytes), wenn die Figur das Budget überschreitet.
+    """
+    saisons = sorted(saison for saison, regel in standings_index if regel == punkt_regel)
+    if not saisons:
+        return None, 0
+
+    zustaende = []
+    for saison in saisons:
+        df_current, df_ewig, saison_ende, punkt_titel = standings_index[(saison, punkt_regel)]
+        saison_str = f"{saison}/{str(saison_ende)[-2:]}"
+        zustaende.append((str(saison), [
+            {'cells_values': [df[col].tolist() for col in df.columns], 'cells_fill_color': _zeilen_farben(df)}
+            for df in (df_current, df_ewig)
+        ], _tabellen_titel(punkt_titel, saison_str)))
+
+    # Basisfigur ist die letzte Saison; die Frames tauschen die Untertitel samt Zellen aus
+    fig = plot_tables(df_current, df_ewig, punkt_titel, saison_str)
+    annotationen = [annotation.to_plotly_json() for annotation in fig.layout.annotations]
+    zustaende = [
+        (name, werte, {'annotations': [dict(annotation, text=titel) for annotation, titel in zip(annotationen, titel)]})
+        for name, werte, titel in zustaende
+    ]
+    fig.update_layout(margin=dict(b=90))
+    return _animation_abschliessen(fig, zustaende, [go.Table, go.Table], budget_bytes)
+
+# --- KARTE ---
+
+def berechne_karten_basis(df):
+    """
+    Berechnet die Basis-Daten aller Meisterschaften, gruppiert nach Geo-Koordinaten.
+    Diese Daten sind unabhängig vom Slider-Wert und werden nur einmal berechnet.
+
+    Ergebnis ist eine dichte Matrix Standort × Saison mit der kumulierten Anzahl an
+    Meisterschaften (NumPy-cumsum) samt fertigen Hover-Texten sowie die Marker der
+    Vereine je Saison. Eine Slider-Position entspricht damit einem Spalten-Slice.
+    """
+    saisons = np.arange(int(df['Saison_Start'].min()), int(df['Saison_Start'].max()) + 1)
+
+    # Koordinaten liegen als float32 vor; für Plotly zurück auf die 4 Nachkommastellen der Quelle
+    df = df.assign(**{spalte: df[spalte].astype('float64').round(4) for spalte in ('Breitengrad', 'Längengrad')})
+
+    # 1. Alle Meister (Rang 1) filtern
+    df_champions = df[df['Rang'] == 1].copy()
+    
+    # 2. Geo-Key erstellen
+    df_champions['Geo_Key'] = df_champions['Breitengrad'].round(4).astype(str) + ',' + df_champions['Längengrad'].round(4).astype(str)
+
+    # 3. Aggregieren pro Standort
+    # Aggregiert alle Vereine, die an einem Geo_Key gewonnen haben
+    standorte = df_champions.groupby('Geo_Key').agg(
+        {
+            'Breitengrad': 'first',
+            'Längengrad': 'first',
+            'Verein': lambda x: ' / '.join(sorted(x.unique()))
+        }
+    )
+
+    # 4. Meisterschaften je Standort und Saison zählen und über die Saisons kumulieren
+    standort_idx = standorte.index.get_indexer(df_champions['Geo_Key'])
+    saison_idx = df_champions['Saison_Start'].to_numpy(dtype=int) - saisons[0]
+    titel = np.zeros((len(standorte), len(saisons)), dtype=np.int32)
+    np.add.at(titel, (standort_idx, saison_idx), 1)
+    kumuliert = titel.cumsum(axis=1)
+
+    hover = np.array([
+        [f"<b>{verein_text}</b><br>Meisterschaften: {anzahl}" for anzahl in zeile]
+        for verein_text, zeile in zip(standorte['Verein'], kumuliert)
+    ], dtype=object).reshape(kumuliert.shape)
+
+    # 5. Marker der Vereine je Saison (Farbe nach Rang, Hover-Text)
+    rang = df['Rang'].to_numpy()
+    farben = np.select([rang == 1, rang >= 16], ['#990000', '#FF4444'], default='#003366')
+    texte = ("<b>" + df['Verein'].astype(str) + "</b><br>Rang: " + df['Rang'].astype(str)
+             + "<br>Punkte: " + df['Punkte_Aktuell'].astype(str)).to_numpy()
+    vereine_je_saison = {}
+    for saison_start, positionen in df.groupby('Saison_Start', sort=True).indices.items():
+        vereine_je_saison[int(saison_start)] = {
+            'Breitengrad': df['Breitengrad'].to_numpy()[positionen],
+            'Längengrad': df['Längengrad'].to_numpy()[positionen],
+            'Farbe': farben[positionen].tolist(),
+            'Text': texte[positionen],
+        }
+
+    return {
+        'Saisons': saisons,
+        'Breitengrad': standorte['Breitengrad'].to_numpy(),
+        'Längengrad': standorte['Längengrad'].to_numpy(),
+        'Vereine': standorte['Verein'].to_numpy(),
+        'Meisterschaften_Kumuliert': kumuliert,
+        'Hover': hover,
+        'Vereine_je_Saison': vereine_je_saison,
+    }
+
+@bl_messung.gemessen
+def plot_map_with_history(karten_basis, saison_start_jahr):
+    """
+    Erstellt die Landkarte mit den aktuellen Vereinen und den historischen
+    Meisterschafts-Bubbles (Größe und Transparenz nach Dominanz).
+    """
+    
+    # 1. Aktuelle Vereine für die gewählte Saison
+    current_map = karten_basis['Vereine_je_Saison'].get(saison_start_jahr)
+    
+    # 2. Kumulation der Bubbles bis zur gewählten Saison: ein Spalten-Slice der Matrix
+    saisons = karten_basis['Saisons']
+    spalte = min(saison_start_jahr - saisons[0], len(saisons) - 1)
+    if spalte >= 0:
+        championships_count = karten_basis['Meisterschaften_Kumuliert'][:, spalte]
+    else:
+        championships_count = np.zeros(len(karten_basis['Breitengrad']), dtype=np.int32)
+    hat_titel = championships_count > 0
+
+    # --- Plotly Mapbox Konfiguration ---
+    fig = go.Figure()
+    
+    # 1. Meisterschafts-Bubbles (Historische Dominanz)
+    if hat_titel.any():
+        fig.add_trace(_bubble_trace(
+            lat=karten_basis['Breitengrad'][hat_titel],
+            lon=karten_basis['Längengrad'][hat_titel],
+            marker_size=championships_count[hat_titel] * BUBBLE_SIZE_FACTOR + 5, # Minimumgröße + Skalierung
+            text=karten_basis['Hover'][hat_titel, spalte],
+        ))
+
+    # 2. Aktuelle Vereins-Punkte (Aktuelle Saison)
+    if current_map is not None:
+        fig.add_trace(_vereine_trace(
+            lat=current_map['Breitengrad'],
+            lon=current_map['Längengrad'],
+            marker_color=current_map['Farbe'],
+            text=current_map['Text'],
+            name=f'Vereine Saison {saison_start_jahr}'
+        ))
+        
+    _karten_layout(fig, saison_start_jahr)
+    return fig
+
+# Die Größe der Bubble skaliert mit der Anzahl der Meisterschaften
+BUBBLE_SIZE_FACTOR = 2
+BASE_MARKER_SIZE = 8
+
+def _bubble_trace(**werte):
+    """Trace der Meisterschafts-Bubbles; die saisonabhängigen Werte kommen als Argumente."""
+    return go.Scattermapbox(
+        mode='markers',
+        marker=dict(
+            color='#FFCC00', # Gold/Gelb
+            opacity=0.4, 
+            symbol='circle',
+        ),
+        hoverinfo='text',
+        name='Meisterschaften (Kumuliert)',
+        **werte
+    )
+
+def _vereine_trace(**werte):
+    """Trace der Vereine einer Saison; die saisonabhängigen Werte kommen als Argumente."""
+    return go.Scattermapbox(
+        mode='markers',
+        marker=dict(
+            size=BASE_MARKER_SIZE,
+            opacity=1,
+            symbol='circle',
+        ),
+        hoverinfo='text',
+        **werte
+    )
+
+def _karten_layout(fig, saison_start_jahr):
+    # Standard-Einstellungen für die Karte
+    fig.update_layout(
+        title_text=_karten_titel(saison_start_jahr),
+        autosize=True,
+        hovermode='closest',
+        showlegend=True,
+        mapbox=dict(
+            style="carto-positron", 
+            center=dict(lat=51.1657, lon=10.4515), 
+            zoom=5
+        ),
+        margin=dict(l=0, r=0, t=50, b=0),
+        height=700
+    )
+
+def _karten_titel(saison_start_jahr):
+    return f"Bundesliga-Vereine und Meisterschafts-Dominanz bis Saison {saison_start_jahr}"
+
+def plot_map_animiert(karten_basis, budget_bytes=ANIMATION_BUDGET_BYTES):
+    """
+    Karte mit Plotly-Frames für alle Saisons; der Slider läuft komplett im Browser.
+    Die Bubble-Trace enthält alle Standorte in fester Reihenfolge (Standorte ohne Titel mit
+    lat=None), sodass je Frame nur Größe und Titelanzahl übertragen werden. Liefert
+    (Figur, Bytes) oder (None, Bytes), wenn die Figur das Budget überschreitet.
+    """
+    saisons = [int(saison) for saison in karten_basis['Saisons']]
+    kumuliert = karten_basis['Meisterschaften_Kumuliert']
+    breitengrad = karten_basis['Breitengrad'].tolist()
+
+    zustaende = []
+    for spalte, saison in enumerate(saisons):
+        anzahl = kumuliert[:, spalte]
+        current_map = karten_basis['Vereine_je_Saison'].get(saison)
+        if current_map is None:
+            current_map = {'Breitengrad': [], 'Längengrad': [], 'Farbe': [], 'Text': []}
+        zustaende.append((str(saison), [
+            {
+                'lat': [lat if n > 0 else None for lat, n in zip(breitengrad, anzahl)],
+                'marker_size': (anzahl * BUBBLE_SIZE_FACTOR + 5).tolist(),
+                'customdata': anzahl.tolist(),
+            },
+            {
+                'lat': list(current_map['Breitengrad']),
+                'lon': list(current_map['Längengrad']),
+                'marker_color': list(current_map['Farbe']),
+                'text': list(current_map['Text']),
+                'name': f'Vereine Saison {saison}',
+            },
+        ], {'title': {'text': _karten_titel(saison)}}))
+
+    _, start_werte, _ = zustaende[-1]
+    fig = go.Figure()
+    fig.add_trace(_bubble_trace(
+        lon=karten_basis['Längengrad'],
+        text=karten_basis['Vereine'],
+        hovertemplate="<b>%{text}</b><br>Meisterschaften: %{customdata}<extra></extra>",
+        **start_werte[0]
+    ))
+    fig.add_trace(_vereine_trace(**start_werte[1]))
+    _karten_layout(fig, saisons[-1])
+    return _animation_abschliessen(fig, zustaende, [go.Scattermapbox, go.Scattermapbox], budget_bytes)
+
+# --- VEREINSVERGLEICH ---
+
+def berechne_timeline_matrix(df, ewige_tabelle):
+    """
+    Erstellt je Punkte-Regel eine Matrix Verein × Saison mit den ewigen Punkten.
+    Saisons ohne Bundesliga-Teilnahme übernehmen den letzten Stand (Forward-Fill),
+    vor der ersten Teilnahme steht 0. Ein Vereinsvergleich ist damit eine Zeilenauswahl.
+    """
+    saisons = range(int(df['Saison_Start'].min()), int(df['Saison_Start'].max()) + 1)
+    timeline_matrix = {}
+    for punkt_regel, (punkte_sieg, punkte_remis) in bl_ewig.PUNKT_REGELN.items():
+        matrix = (
+            ewige_tabelle.verlauf(punkte_sieg, punkte_remis)
+            .pivot(index='Verein', columns='Saison_Start', values='Punkte_Ewig')
+            .reindex(columns=saisons)
+        )
+        timeline_matrix[punkt_regel] = matrix.ffill(axis=1).fillna(0)
+    return timeline_matrix
+
+@bl_messung.gemessen
+def plot_vereinsvergleich(timeline_matrix, vereine_liste, start_jahr, end_jahr, punkt_regel):
+     """Zeichnet den kumulierten Punkteverlauf der gewählten Vereine als WebGL-Linien."""
+     df_plot_final = timeline_matrix[punkt_regel].reindex(index=vereine_liste, fill_value=0).loc[:, start_jahr:end_jahr]
+     saisons = df_plot_final.columns.to_numpy()
+     fig = go.Figure()
+     colors = ['#003366', '#FFCC00', '#006633', '#CC0000', '#666666', '#9900CC', '#00CCFF']
+     
+     for i, (verein, punkte) in enumerate(zip(df_plot_final.index, df_plot_final.to_numpy())):
+         fig.add_trace(go.Scattergl(
+             x=saisons,
+             y=punkte,
+             mode='lines+markers',
+             name=verein,
+             line=dict(color=colors[i % len(colors)], width=3),
+             hovertemplate = f"<b>{verein}</b><br>Saison: %{{x}}<br>Ewige Punkte: %{{y:.0f}}<extra></extra>"
+         ))
+
+     regeltitel = f'{bl_ewig.PUNKT_REGELN[punkt_regel][0]}-Punkte-Regel'
+     fig.update_layout(
+         title=f'Kumulierter Punkteverlauf der Vereine ({regeltitel})',
+         xaxis_title='Saison (Startjahr)',
+         yaxis_title='Ewige Punkte (Kumuliert)',
+         # Bei sehr vielen Vereinen wird die gemeinsame Hover-Box unlesbar
+         hovermode="x unified" if len(vereine_liste) <= len(colors) else "closest",
+         height=600,
+         margin=dict(t=50, b=50),
+         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+     )
+     return fig
@@ -0,0 +1,301 @@
+"""
+Opt-in-Messung der Reruns der Bundesliga-Analyse: Spannen mit Laufzeit, Allokationen und an
+den Browser gesendeten Bytes, exportierbar als JSONL oder im Chrome-Trace-Format.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+
+# BL_MESSUNG=1 schaltet die Messung für alle Sitzungen ein, ?messung=1 für eine Sitzung.
+# Allokationen (tracemalloc) werden nur gemessen, wenn der Betreiber BL_MESSUNG setzt.
+UMGEBUNGSVARIABLE = 'BL_MESSUNG'
+QUERY_PARAMETER = 'messung'
+
+_LOGGER = logging.getLogger(__name__)
+
+# Laufender Rerun des aktuellen Skript-Threads (None = Messung aus, Spannen kosten nichts)
+_aktiver_rerun = contextvars.ContextVar('bl_messung_rerun', default=None)
+
+# Zahl der laufenden Reruns mit Speichermessung; tracemalloc läuft nur, solange sie > 0 ist
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_nutzer = 0
+_tracemalloc_selbst_gestartet = False
+
+def _eingeschaltet(wert):
+    return str(wert).strip().lower() not in ('', '0', 'false', 'nein', 'none')
+
+def aktiviert(query_wert=None):
+    """True, wenn die Umgebungsvariable oder der Query-Parameter die Messung einschalten."""
+    return any(_eingeschaltet(wert) for wert in (os.environ.get(UMGEBUNGSVARIABLE, ''), query_wert or ''))
+
+def speicher_aktiviert():
+    """True, wenn der Betreiber die Speichermessung über die Umgebungsvariable erlaubt."""
+    return _eingeschaltet(os.environ.get(UMGEBUNGSVARIABLE, ''))
+
+def _tracemalloc_anmelden():
+    global _tracemalloc_nutzer, _tracemalloc_selbst_gestartet
+    with _tracemalloc_lock:
+        if not _tracemalloc_nutzer and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_selbst_gestartet = True
+        _tracemalloc_nutzer += 1
+
+def _tracemalloc_abmelden():
+    global _tracemalloc_nutzer, _tracemalloc_selbst_gestartet
+    with _tracemalloc_lock:
+        _tracemalloc_nutzer -= 1
+        # Ein von außen gestartetes Tracing (z. B. im Benchmark) bleibt unangetastet
+        if not _tracemalloc_nutzer and _tracemalloc_selbst_gestartet:
+            tracemalloc.stop()
+            _tracemalloc_selbst_gestartet = False
+
+class Spanne:
+    """Eine gemessene Spanne; Zeiten in ns relativ zum Rerun-Start, Bytes inklusive Unterspannen."""
+    __slots__ = ('name', 'tiefe', 'start_ns', 'dauer_ns', 'alloc_bytes', 'alloc_spitze_bytes',
+                 'payload_bytes', 'attribute', '_speicher_start', '_spitze')
+
+    def __init__(self, name, tiefe, start_ns, attribute):
+        self.name = name
+        self.tiefe = tiefe
+        self.start_ns = start_ns
+        self.dauer_ns = 0
+        self.alloc_bytes = 0
+        self.alloc_spitze_bytes = 0
+        self.payload_bytes = 0
+        self.attribute = attribute
+        self._speicher_start = 0
+        self._spitze = 0
+
+    def als_dict(self):
+        return {
+            'name': self.name,
+            'tiefe': self.tiefe,
+            'start_ms': self.start_ns / 1e6,
+            'dauer_ms': self.dauer_ns / 1e6,
+            'alloc_bytes': self.alloc_bytes,
+            'alloc_spitze_bytes': self.alloc_spitze_bytes,
+            'payload_bytes': self.payload_bytes,
+            **self.attribute,
+        }
+
+class Rerun:
+    """
+    Alle Spannen eines Reruns. Allokationen misst tracemalloc (nur mit speicher=True): alloc_bytes
+    ist der Netto-Zuwachs, alloc_spitze_bytes die Spitze über dem Stand beim Betreten der Spanne.
+    tracemalloc misst prozessweit, und jede Spanne setzt die prozessweite Spitze zurück. Laufen
+    Reruns mehrerer Sitzungen gleichzeitig, zählen Netto-Werte fremde Allokationen mit und die
+    Spitzen sind unbrauchbar; verlässlich sind sie nur bei einem einzelnen gemessenen Rerun.
+    """
+
+    def __init__(self, nummer, speicher=False, fragment=None):
+        self.nummer = nummer
+        self.speicher = speicher
+        # Name des Fragments bei einem Fragment-Rerun, None für einen Lauf des ganzen Skripts
+        self.fragment = fragment
+        self.zeitstempel = time.time()
+        self.thread_id = threading.get_ident()
+        self.spannen = []
+        self.dauer_ns = 0
+        self.payload_bytes = 0
+        self._start_ns = time.perf_counter_ns()
+        self._offen = []
+
+    def betreten(self, name, attribute):
+        spanne = Spanne(name, len(self._offen), time.perf_counter_ns() - self._start_ns, attribute)
+        self._offen.append(spanne)
+        self.spannen.append(spanne)
+        if not self.speicher:
+            return spanne
+        aktuell, spitze = tracemalloc.get_traced_memory()
+        if len(self._offen) > 1:
+            # Die Spitze der umgebenden Spanne sichern, bevor sie zurückgesetzt wird
+            self._offen[-2]._spitze = max(self._offen[-2]._spitze, spitze)
+        tracemalloc.reset_peak()
+        spanne._speicher_start = aktuell
+        spanne._spitze = aktuell
+        return spanne
+
+    def verlassen(self, spanne):
+        spanne.dauer_ns = time.perf_counter_ns() - self._start_ns - spanne.start_ns
+        self._offen.pop()
+        if not self.speicher:
+            return
+        aktuell, spitze = tracemalloc.get_traced_memory()
+        spanne._spitze = max(spanne._spitze, spitze)
+        spanne.alloc_bytes = aktuell - spanne._speicher_start
+        spanne.alloc_spitze_bytes = spanne._spitze - spanne._speicher_start
+        if self._offen:
+            self._offen[-1]._spitze = max(self._offen[-1]._spitze, spanne._spitze)
+
+    def payload_zaehlen(self, anzahl_bytes):
+        self.payload_bytes += anzahl_bytes
+        for spanne in self._offen:
+            spanne.payload_bytes += anzahl_bytes
+
+    def abschliessen(self):
+        while self._offen:
+            self.verlassen(self._offen[-1])
+        self.dauer_ns = time.perf_counter_ns() - self._start_ns
+
+    def als_dict(self):
+        return {
+            'rerun': self.nummer,
+            'fragment': self.fragment,
+            'zeitstempel': self.zeitstempel,
+            'dauer_ms': self.dauer_ns / 1e6,
+            'payload_bytes': self.payload_bytes,
+            'spannen': [spanne.als_dict() for spanne in self.spannen],
+        }
+
+def _freigeben(speicher, ctx, original):
+    """Gibt tracemalloc und den Payload-Zähler eines Reruns frei (läuft genau einmal)."""
+    try:
+        if original is not None:
+            ctx._enqueue = original
+    finally:
+        if speicher:
+            _tracemalloc_abmelden()
+
+def starte_rerun(nummer=0, fragment=None):
+    """
+    Beginnt die Messung eines Reruns im aktuellen Thread; fragment benennt einen Fragment-Rerun.
+    tracemalloc läuft nur mit BL_MESSUNG und nur, solange ein gemessener Rerun aktiv ist. Endet
+    der Rerun ohne beende_rerun (st.stop, Ausnahme), gibt der Finalizer Tracing und
+    Payload-Zähler frei, sobald der Rerun verworfen wird.
+    """
+    beende_rerun()
+    speicher = speicher_aktiviert()
+    if speicher:
+        _tracemalloc_anmelden()
+    try:
+        ctx, original = _payload_zaehler_installieren()
+    except BaseException:
+        _freigeben(speicher, None, None)
+        raise
+    rerun = Rerun(nummer, speicher, fragment)
+    rerun._freigabe = weakref.finalize(rerun, _freigeben, speicher, ctx, original)
+    _aktiver_rerun.set(rerun)
+    return rerun
+
+def beende_rerun():
+    """Schließt den laufenden Rerun ab und gibt ihn zurück (None, wenn nicht gemessen wurde)."""
+    rerun = _aktiver_rerun.get()
+    if rerun is not None:
+        try:
+            rerun.abschliessen()
+        finally:
+            _aktiver_rerun.set(None)
+            rerun._freigabe()
+    return rerun
+
+def aktiver_rerun():
+    """Der im aktuellen Thread gemessene Rerun oder None."""
+    return _aktiver_rerun.get()
+
+@contextlib.contextmanager
+def gemessener_rerun(nummer=0, fragment=None):
+    """
+    Misst den Block als eigenen Rerun. Für Fragment-Reruns, die nur eine Funktion statt des
+    ganzen Skripts ausführen und daher starte_rerun/beende_rerun auf Modulebene nicht erreichen.
+    """
+    rerun = starte_rerun(nummer, fragment)
+    try:
+        yield rerun
+    finally:
+        beende_rerun()
+
+@contextlib.contextmanager
+def spanne(name, **attribute):
+    """Misst den Block als Spanne des laufenden Reruns; ohne Messung ein reiner Durchlauf."""
+    rerun = _aktiver_rerun.get()
+    if rerun is None:
+        yield None
+        return
+    gemessene_spanne = rerun.betreten(name, attribute)
+    try:
+        yield gemessene_spanne
+    finally:
+        rerun.verlassen(gemessene_spanne)
+
+def gemessen(funktion):
+    """Dekorator: jeder Aufruf wird als Spanne mit dem Funktionsnamen gemessen."""
+    @functools.wraps(funktion)
+    def wrapper(*args, **kwargs):
+        if _aktiver_rerun.get() is None:
+            return funktion(*args, **kwargs)
+        with spanne(funktion.__name__):
+            return funktion(*args, **kwargs)
+    return wrapper
+
+def _payload_zaehler_installieren():
+    """
+    Zählt die Bytes aller ForwardMsgs, die der Skript-Thread an den Browser schickt, und schreibt
+    sie den offenen Spannen zu. So wird die Übertragung getrennt von Berechnung und Serialisierung
+    sichtbar. Hängt am internen Feld _enqueue des ScriptRunContext, das streamlit~=1.31 nicht
+    zusichert; fehlt es, entfällt die Payload-Zählung mit einem Log-Hinweis. Liefert (ctx,
+    Original), damit beende_rerun das Original wiederherstellt, sonst (None, None).
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    original = getattr(ctx, '_enqueue', None)
+    if not callable(original):
+        _LOGGER.info("ScriptRunContext._enqueue fehlt, Payload-Bytes werden nicht gezählt")
+        return None, None
+    if getattr(original, '_bl_messung', False):
+        return None, None
+
+    def enqueue(msg):
+        rerun = _aktiver_rerun.get()
+        if rerun is not None:
+            rerun.payload_zaehlen(msg.ByteSize())
+        original(msg)
+
+    enqueue._bl_messung = True
+    ctx._enqueue = enqueue
+    return ctx, original
+
+
+# --- EXPORT ---
+
+def als_jsonl(reruns):
+    """Eine JSON-Zeile pro Spanne, mit Rerun-Nummer und Zeitstempel."""
+    zeilen = []
+    for rerun in reruns:
+        for spanne in rerun.spannen:
+            zeilen.append(json.dumps(
+                {'rerun': rerun.nummer, 'fragment': rerun.fragment, 'zeitstempel': rerun.zeitstempel, **spanne.als_dict()},
+                ensure_ascii=False
+            ))
+    return '\n'.join(zeilen) + '\n'
+
+def als_chrome_trace(reruns):
+    """Trace-Event-JSON für chrome://tracing bzw. Perfetto; jeder Rerun als eigene Spanne."""
+    pid = os.getpid()
+    ereignisse = []
+    for rerun in reruns:
+        basis_us = rerun.zeitstempel * 1e6
+        ereignisse.append({
+            'name': f'Rerun {rerun.nummer}' + (f' ({rerun.fragment})' if rerun.fragment else ''), 'cat': 'rerun', 'ph': 'X', 'pid': pid,
+            'tid': rerun.thread_id, 'ts': basis_us, 'dur': rerun.dauer_ns / 1e3,
+            'args': {'payload_bytes': rerun.payload_bytes},
+        })
+        for spanne in rerun.spannen:
+            ereignisse.append({
+                'name': spanne.name, 'cat': 'spanne', 'ph': 'X', 'pid': pid, 'tid': rerun.thread_id,
+                'ts': basis_us + spanne.start_ns / 1e3, 'dur': spanne.dauer_ns / 1e3,
+                'args': {
+                    'alloc_bytes': spanne.alloc_bytes,
+                    'alloc_spitze_bytes': spanne.alloc_spitze_bytes,
+                    'payload_bytes': spanne.payload_bytes,
+                    **spanne.attribute,
+                },
+            })
+    return json.dumps({'traceEvents': ereignisse, 'displayTimeUnit': 'ms'}, ensure_ascii=False)
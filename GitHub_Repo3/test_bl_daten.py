@@ -0,0 +1,58 @@
+"""Feather-Cache: liefert dieselben Daten wie die CSV und verfällt, sobald sich die Quelle ändert."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import bl_daten
+
+DATEI_PFAD = os.path.join(os.path.dirname(__file__), "data", "liga.csv")
+
+@pytest.fixture
+def quelle(tmp_path, monkeypatch):
+    monkeypatch.setattr(bl_daten, 'CACHE_VERZEICHNIS', str(tmp_path / '.cache'))
+    pfad = tmp_path / 'liga.csv'
+    shutil.copy(DATEI_PFAD, pfad)
+    return pfad
+
+def _ohne_csv(monkeypatch):
+    def _lade_csvs(dateien):
+        raise AssertionError("CSV gelesen statt Cache")
+    monkeypatch.setattr(bl_daten, '_lade_csvs', _lade_csvs)
+
+def test_cache_wie_csv(quelle, monkeypatch):
+    aus_csv = bl_daten.lade_datensatz(str(quelle))
+    assert os.path.exists(bl_daten._cache_pfade([str(quelle)])[1])
+    _ohne_csv(monkeypatch)
+    aus_cache = bl_daten.lade_datensatz(str(quelle))
+    pd.testing.assert_frame_equal(aus_cache.df, aus_csv.df)
+    assert aus_cache.fingerprint == aus_csv.fingerprint
+    assert aus_cache.bericht.als_dict() == aus_csv.bericht.als_dict()
+
+def test_neue_mtime_ohne_aenderung_behaelt_den_cache(quelle, monkeypatch):
+    bl_daten.lade_datensatz(str(quelle))
+    stat = os.stat(quelle)
+    os.utime(quelle, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    _ohne_csv(monkeypatch)
+    assert len(bl_daten.lade_datensatz(str(quelle)).df) > 0
+
+def test_geaenderte_quelle_verwirft_den_cache(quelle):
+    vorher = bl_daten.lade_datensatz(str(quelle))
+    zeilen = quelle.read_text(encoding='utf-8').splitlines(keepends=True)
+    # Ohne die letzte Zeile ändern sich Größe und Inhalt der Quelle
+    quelle.write_text(''.join(zeilen[:-1]), encoding='utf-8')
+    nachher = bl_daten.lade_datensatz(str(quelle))
+    assert len(nachher.df) == len(vorher.df) - 1
+
+def test_fingerprint_folgt_inhalt_und_schema(quelle, tmp_path, monkeypatch):
+    fingerprint = bl_daten.lade_datensatz(str(quelle)).fingerprint
+    # Dieselben Bytes an anderer Stelle ergeben denselben Fingerabdruck
+    kopie = tmp_path / 'kopie.csv'
+    shutil.copy(quelle, kopie)
+    assert bl_daten.lade_datensatz(str(kopie)).fingerprint == fingerprint
+    with open(quelle, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert bl_daten.lade_datensatz(str(quelle)).fingerprint != fingerprint
+    monkeypatch.setattr(bl_daten, 'CACHE_SCHEMA_VERSION', bl_daten.CACHE_SCHEMA_VERSION + 1)
+    assert bl_daten.lade_datensatz(str(kopie)).fingerprint != fingerprint
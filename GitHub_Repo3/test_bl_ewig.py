@@ -0,0 +1,60 @@
+"""Ewige Tabelle: Saison für Saison fortgeschrieben ergibt dasselbe wie der vollständige Aufbau."""
+import os
+
+import pandas as pd
+import pytest
+
+import bl_daten
+import bl_ewig
+
+DATEI_PFAD = os.path.join(os.path.dirname(__file__), "data", "liga.csv")
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(bl_daten, 'CACHE_VERZEICHNIS', str(tmp_path_factory.mktemp('cache')))
+        return bl_daten.lade_datensatz(DATEI_PFAD).df
+
+def _fortgeschrieben(df):
+    ewige_tabelle = bl_ewig.EwigeTabelle()
+    for _, df_saison in df.groupby('Saison_Start', sort=True):
+        ewige_tabelle.saison_anhaengen(df_saison)
+    return ewige_tabelle
+
+@pytest.mark.parametrize('punkt_regel', list(bl_ewig.PUNKT_REGELN))
+def test_anhaengen_wie_neuaufbau(df, punkt_regel):
+    punkte_sieg, punkte_remis = bl_ewig.PUNKT_REGELN[punkt_regel]
+    inkrementell, voll = _fortgeschrieben(df), bl_ewig.EwigeTabelle(df)
+    assert inkrementell.letzte_saison == voll.letzte_saison == df['Saison_Start'].max()
+    pd.testing.assert_frame_equal(inkrementell.stand(punkte_sieg=punkte_sieg, punkte_remis=punkte_remis),
+                                  voll.stand(punkte_sieg=punkte_sieg, punkte_remis=punkte_remis))
+    pd.testing.assert_frame_equal(inkrementell.verlauf(punkte_sieg, punkte_remis),
+                                  voll.verlauf(punkte_sieg, punkte_remis))
+    for saison in (1963, 1980, 2000):
+        pd.testing.assert_frame_equal(inkrementell.stand(saison, punkte_sieg, punkte_remis),
+                                      voll.stand(saison, punkte_sieg, punkte_remis))
+
+def test_stand_wie_summe_der_saisons(df):
+    stand = bl_ewig.EwigeTabelle(df).stand(1990).set_index('Verein')
+    bis_1990 = df[df['Saison_Start'] <= 1990].astype({'Verein': str}).groupby('Verein')
+    assert (stand['Siege_Ewig'] == bis_1990['Siege_Saison'].sum().reindex(stand.index)).all()
+    assert (stand['Spiele_Ewig'] == bis_1990['Spiele_Saison'].sum().reindex(stand.index)).all()
+
+def test_letzte_saison_wird_ersetzt(df):
+    letzte = df['Saison_Start'].max()
+    ewige_tabelle = _fortgeschrieben(df)
+    # Spieltags-Update: der Meister gewinnt ein weiteres Spiel
+    df_neu = df.copy()
+    meister = (df_neu['Saison_Start'] == letzte) & (df_neu['Rang'] == 1)
+    df_neu.loc[meister, ['Spiele_Saison', 'Siege_Saison']] += 1
+    ewige_tabelle.saison_anhaengen(df_neu[df_neu['Saison_Start'] == letzte])
+    ewige_tabelle.saison_anhaengen(df_neu[df_neu['Saison_Start'] == letzte])
+    pd.testing.assert_frame_equal(ewige_tabelle.stand(), bl_ewig.EwigeTabelle(df_neu).stand())
+    pd.testing.assert_frame_equal(ewige_tabelle.verlauf(), bl_ewig.EwigeTabelle(df_neu).verlauf())
+
+def test_nur_die_letzte_saison_ist_aenderbar(df):
+    ewige_tabelle = _fortgeschrieben(df)
+    with pytest.raises(ValueError):
+        ewige_tabelle.saison_anhaengen(df[df['Saison_Start'] == 2000])
+    with pytest.raises(ValueError):
+        ewige_tabelle.saison_anhaengen(df[df['Saison_Start'] >= 2020])
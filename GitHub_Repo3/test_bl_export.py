@@ -0,0 +1,64 @@
+"""Stapel-Export: Eingabe-Hashes je Datei, Manifest und Überspringen unveränderter Dateien."""
+import json
+import os
+
+import plotly.graph_objects as go
+import pytest
+
+import bl_daten
+import bl_export
+import bl_grafik
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(bl_daten, 'CACHE_VERZEICHNIS', str(tmp_path_factory.mktemp('cache')))
+        return bl_daten.lade_datensatz(bl_export.DATEI_PFAD).df
+
+def _hashes(df, formate=('json',)):
+    basis = (bl_grafik.berechne_standings_index(df), bl_grafik.berechne_karten_basis(df))
+    return {stamm: eingabe_hash for stamm, _, _, _, eingabe_hash in
+            bl_export.aufgaben_erstellen(basis, formate, 'directory')}
+
+def test_neue_saison_aendert_nur_ihre_dateien(df):
+    bisher = _hashes(df[df['Saison_Start'] <= 2000])
+    # 2001 wird Dortmund Meister, dessen Standort schon Titel aus früheren Saisons hat
+    neu = _hashes(df[df['Saison_Start'] <= 2001])
+    assert set(neu) - set(bisher) == {'karte/2001', 'tabellen/2001_2er', 'tabellen/2001_3er'}
+    assert all(neu[stamm] == eingabe_hash for stamm, eingabe_hash in bisher.items())
+
+def test_geaenderte_daten_und_optionen_aendern_den_hash(df):
+    df = df[df['Saison_Start'] <= 2001]
+    bisher = _hashes(df)
+    # Spieltags-Update der letzten Saison: nur deren Tabellen sind betroffen
+    df_neu = df.copy()
+    df_neu.loc[df_neu['Saison_Start'] == 2001, 'Tore_Saison'] += 1
+    neu = _hashes(df_neu)
+    assert sorted(stamm for stamm in bisher if neu[stamm] != bisher[stamm]) == [
+        'tabellen/2001_2er', 'tabellen/2001_3er']
+    assert set(_hashes(df, ('json', 'html')).values()).isdisjoint(bisher.values())
+
+def test_manifest_fehlt_oder_ist_kaputt(tmp_path):
+    assert bl_export.lade_manifest(str(tmp_path / 'fehlt')) == {}
+    (tmp_path / bl_export.MANIFEST_NAME).write_text('{', encoding='utf-8')
+    assert bl_export.lade_manifest(str(tmp_path)) == {}
+    bl_export.schreibe_manifest(str(tmp_path), {'tabellen/2000_2er': 'abc'})
+    assert bl_export.lade_manifest(str(tmp_path)) == {'tabellen/2000_2er': 'abc'}
+
+@pytest.mark.skipif(not hasattr(go, 'Scattermapbox'), reason="plotly ohne Scattermapbox (ab Version 7)")
+def test_zweiter_lauf_ueberspringt_unveraendertes(df, tmp_path):
+    daten = bl_daten.LigaDatensatz(df[df['Saison_Start'].between(1999, 2001)], 'test')
+    ziel = str(tmp_path / 'export')
+    statistik = bl_export.export_ausfuehren(daten, ziel, ('json',), prozesse=1)
+    assert (statistik['gerendert'], statistik['uebersprungen']) == (9, 0)
+    with open(os.path.join(ziel, bl_export.MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest == _hashes(daten.df)
+    assert all(os.path.exists(os.path.join(ziel, f'{stamm}.json')) for stamm in manifest)
+
+    statistik = bl_export.export_ausfuehren(daten, ziel, ('json',), prozesse=1)
+    assert (statistik['gerendert'], statistik['uebersprungen']) == (0, 9)
+    # Eine gelöschte Datei wird neu gerendert, auch wenn ihr Hash im Manifest steht
+    os.remove(os.path.join(ziel, 'karte', '2000.json'))
+    assert bl_export.export_ausfuehren(daten, ziel, ('json',), prozesse=1)['gerendert'] == 1
+    assert bl_export.export_ausfuehren(daten, ziel, ('json',), prozesse=1, erzwingen=True)['gerendert'] == 9
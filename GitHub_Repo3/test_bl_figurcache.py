@@ -0,0 +1,59 @@
+"""Figuren-Cache: Treffer, LRU-Verdrängung nach Anzahl und Bytes, zu große Figuren."""
+import plotly.graph_objects as go
+
+from bl_figurcache import FigurCache
+
+def _figur(punkte):
+    return go.Figure(go.Scatter(x=list(range(punkte)), y=list(range(punkte))))
+
+def _erzeuger(punkte, aufrufe):
+    def erzeugen():
+        aufrufe.append(punkte)
+        return _figur(punkte)
+    return erzeugen
+
+def test_treffer_ohne_neubau():
+    cache, aufrufe = FigurCache(), []
+    fig = cache.hole('a', _erzeuger(10, aufrufe))
+    assert cache.hole('a', _erzeuger(10, aufrufe)) is fig
+    assert aufrufe == [10]
+    statistik = cache.statistik()
+    assert (statistik['treffer'], statistik['fehlschlaege'], statistik['eintraege']) == (1, 1, 1)
+    assert statistik['bytes'] == len(fig.to_json())
+
+def test_verdraengung_nach_bytes():
+    groesse = len(_figur(100).to_json())
+    # Platz für zwei, aber nicht für drei Figuren
+    cache, aufrufe = FigurCache(max_bytes=int(2.5 * groesse)), []
+    cache.hole('a', _erzeuger(100, aufrufe))
+    cache.hole('b', _erzeuger(100, aufrufe))
+    cache.hole('a', _erzeuger(100, aufrufe))
+    cache.hole('c', _erzeuger(100, aufrufe))
+    # 'b' war am längsten unbenutzt und ist verdrängt, 'a' bleibt
+    assert cache.statistik() == {'treffer': 1, 'fehlschlaege': 3, 'verdraengt': 1, 'eintraege': 2,
+                                 'bytes': 2 * groesse}
+    cache.hole('a', _erzeuger(100, aufrufe))
+    cache.hole('b', _erzeuger(100, aufrufe))
+    assert len(aufrufe) == 4
+    assert cache.statistik()['bytes'] <= cache.max_bytes
+
+def test_verdraengung_nach_anzahl():
+    cache, aufrufe = FigurCache(max_eintraege=3), []
+    for schluessel in range(5):
+        cache.hole(schluessel, _erzeuger(5, aufrufe))
+    assert cache.statistik()['eintraege'] == 3 and cache.verdraengt == 2
+    cache.hole(0, _erzeuger(5, aufrufe))
+    cache.hole(4, _erzeuger(5, aufrufe))
+    assert len(aufrufe) == 6 and cache.treffer == 1
+
+def test_zu_grosse_figur_wird_nicht_abgelegt():
+    cache, aufrufe = FigurCache(max_bytes=len(_figur(100).to_json())), []
+    cache.hole('klein', _erzeuger(10, aufrufe))
+    gross = cache.hole('gross', _erzeuger(1000, aufrufe))
+    assert len(gross.data[0].x) == 1000
+    # Die kleine Figur bleibt, statt für eine nie passende Figur verdrängt zu werden
+    assert cache.statistik()['eintraege'] == 1 and cache.verdraengt == 0
+    cache.hole('gross', _erzeuger(1000, aufrufe))
+    assert aufrufe == [10, 1000, 1000]
+    cache.leeren()
+    assert cache.statistik()['eintraege'] == 0 and cache.statistik()['bytes'] == 0
@@ -0,0 +1,108 @@
+"""Vorberechnete Tabellen und Karte stimmen mit einer Berechnung je Saison überein."""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+import bl_daten
+import bl_ewig
+import bl_grafik
+
+DATEI_PFAD = os.path.join(os.path.dirname(__file__), "data", "liga.csv")
+
+@pytest.fixture(scope='module')
+def daten(tmp_path_factory):
+    # Der Feather-Cache soll nicht im Datenverzeichnis des Repos landen
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(bl_daten, 'CACHE_VERZEICHNIS', str(tmp_path_factory.mktemp('cache')))
+        return bl_daten.lade_datensatz(DATEI_PFAD)
+
+@pytest.fixture(scope='module')
+def standings_index(daten):
+    return bl_grafik.berechne_standings_index(daten.df)
+
+def test_standings_index_wie_prepare_tables(daten, standings_index):
+    saisons = sorted(daten.df['Saison_Start'].unique())
+    assert set(standings_index) == {(int(s), regel) for s in saisons for regel in bl_ewig.PUNKT_REGELN}
+    # Vergleich mit dem Stand aus einer einmal vollständig aufgebauten ewigen Tabelle
+    ewige_tabelle = bl_ewig.EwigeTabelle(daten.df)
+    for (saison, punkt_regel), (df_current, df_ewig, saison_ende, punkt_titel) in standings_index.items():
+        erwartet = bl_grafik.prepare_tables(daten.df, saison, punkt_regel, ewige_tabelle)
+        pd.testing.assert_frame_equal(df_current, erwartet[0])
+        pd.testing.assert_frame_equal(df_ewig, erwartet[1])
+        assert (saison_ende, punkt_titel) == erwartet[2:]
+
+def test_get_tables_ohne_index(daten, standings_index):
+    assert bl_grafik.get_tables(standings_index, daten.df, 1990, '3er') is standings_index[(1990, '3er')]
+    _, df_ewig, _, _ = bl_grafik.get_tables({}, daten.df, 1990, '3er')
+    pd.testing.assert_frame_equal(df_ewig, standings_index[(1990, '3er')][1])
+    # Unbekannte Saisons liefern wie bisher leere Tabellen
+    df_current, df_ewig, _, punkt_titel = bl_grafik.get_tables(standings_index, daten.df, 1900)
+    assert df_current.empty and df_ewig.empty and punkt_titel == "Punkte (N/A)"
+
+def test_meisterschaften_kumuliert(daten):
+    karten_basis = bl_grafik.berechne_karten_basis(daten.df)
+    saisons = karten_basis['Saisons']
+    assert list(saisons) == list(range(daten.df['Saison_Start'].min(), daten.df['Saison_Start'].max() + 1))
+    meister = daten.df[daten.df['Rang'] == 1]
+    standorte = list(zip(karten_basis['Breitengrad'], karten_basis['Längengrad']))
+    # Je Saison die Titel bis dahin an jedem Standort einzeln abzählen
+    for spalte, saison in enumerate(saisons):
+        bisher = meister[meister['Saison_Start'] <= saison]
+        erwartet = [
+            int(((bisher['Breitengrad'].astype('float64').round(4) == breite)
+                 & (bisher['Längengrad'].astype('float64').round(4) == laenge)).sum())
+            for breite, laenge in standorte
+        ]
+        assert karten_basis['Meisterschaften_Kumuliert'][:, spalte].tolist() == erwartet
+        assert all(f"Meisterschaften: {anzahl}" in text
+                   for anzahl, text in zip(erwartet, karten_basis['Hover'][:, spalte]))
+    assert karten_basis['Meisterschaften_Kumuliert'][:, -1].sum() == len(meister)
+
+    vereine = karten_basis['Vereine_je_Saison'][int(saisons[-1])]
+    df_letzte = daten.df[daten.df['Saison_Start'] == saisons[-1]]
+    assert len(vereine['Text']) == len(df_letzte)
+    assert np.array_equal(np.array(vereine['Farbe']) == '#990000', (df_letzte['Rang'] == 1).to_numpy())
+
+def test_timeline_matrix_wie_ewige_tabelle(daten):
+    ewige_tabelle = bl_ewig.EwigeTabelle(daten.df)
+    timeline_matrix = bl_grafik.berechne_timeline_matrix(daten.df, ewige_tabelle)
+    for punkt_regel, (punkte_sieg, punkte_remis) in bl_ewig.PUNKT_REGELN.items():
+        matrix = timeline_matrix[punkt_regel]
+        assert list(matrix.columns) == list(range(1963, daten.df['Saison_Start'].max() + 1))
+        for saison in (1963, 1975, 2010):
+            # Vereine ohne Teilnahme in der Saison behalten ihren bisherigen Stand
+            stand = ewige_tabelle.stand(saison, punkte_sieg, punkte_remis).set_index('Verein')['Punkte_Ewig']
+            assert (matrix.loc[stand.index, saison] == stand).all()
+            assert (matrix.drop(index=stand.index)[saison] == 0).all()
+
+def test_animierte_tabellen(standings_index):
+    fig, payload_bytes = bl_grafik.plot_tables_animiert(standings_index, '3er')
+    saisons = sorted(saison for saison, regel in standings_index if regel == '3er')
+    assert [frame.name for frame in fig.frames] == [str(saison) for saison in saisons]
+    assert payload_bytes == len(fig.to_json()) <= bl_grafik.ANIMATION_BUDGET_BYTES
+    # Jeder Frame ergibt, egal von welcher Saison aus angesprungen, die Figur der Einzelsaison
+    for saison in (saisons[0], saisons[len(saisons) // 2], saisons[-1]):
+        frame = fig.frames[saisons.index(saison)]
+        df_current, df_ewig, saison_ende, punkt_titel = standings_index[(saison, '3er')]
+        einzeln = bl_grafik.plot_tables(df_current, df_ewig, punkt_titel, f"{saison}/{str(saison_ende)[-2:]}")
+        for trace, daten in zip(frame.traces, frame.data):
+            assert daten.cells.values == einzeln.data[trace].cells.values
+        assert [a['text'] for a in frame.layout.annotations] == [a.text for a in einzeln.layout.annotations]
+
+def test_animation_ueber_budget(standings_index):
+    fig, payload_bytes = bl_grafik.plot_tables_animiert(standings_index, '2er')
+    # Über dem Budget gibt es keine Figur; die App rendert dann serverseitig je Saison
+    zu_gross = bl_grafik.plot_tables_animiert(standings_index, '2er', budget_bytes=payload_bytes - 1)
+    assert zu_gross == (None, payload_bytes)
+    assert bl_grafik.plot_tables_animiert(standings_index, '2er', budget_bytes=payload_bytes)[0] is not None
+    assert bl_grafik.plot_tables_animiert({}, '2er') == (None, 0)
+
+@pytest.mark.skipif(not hasattr(go, 'Scattermapbox'), reason="plotly ohne Scattermapbox (ab Version 7)")
+def test_animierte_karte_ueber_budget(daten):
+    karten_basis = bl_grafik.berechne_karten_basis(daten.df)
+    fig, payload_bytes = bl_grafik.plot_map_animiert(karten_basis)
+    assert len(fig.frames) == len(karten_basis['Saisons'])
+    assert bl_grafik.plot_map_animiert(karten_basis, budget_bytes=payload_bytes - 1) == (None, payload_bytes)
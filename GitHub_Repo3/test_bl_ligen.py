@@ -0,0 +1,57 @@
+"""Mehrere Liga-Dateien in einem Verzeichnis: Tabellen und ewige Tabelle gelten je Liga."""
+import pytest
+
+import bl_daten
+import bl_ewig
+import bl_grafik
+
+KOPF = ';'.join(f"Spalte{i}" for i in range(len(bl_daten.QUELL_SCHEMA)))
+
+def _zeile(saison, rang, verein, spiele, siege, remis, tore, gegentore):
+    niederlagen = spiele - siege - remis
+    werte = [saison, saison + 1, rang, verein, spiele, 2 * siege + remis, tore - gegentore, tore, gegentore,
+             siege, remis, niederlagen, 3 * siege + remis, 2 * siege + remis, 'Stadt', 50.0, 10.0]
+    return ';'.join(map(str, werte + [0] * 10))
+
+@pytest.fixture
+def zwei_ligen(tmp_path, monkeypatch):
+    # Der Feather-Cache soll nicht im Datenverzeichnis des Repos landen
+    monkeypatch.setattr(bl_daten, 'CACHE_VERZEICHNIS', str(tmp_path / '.cache'))
+    quellen = tmp_path / 'ligen'
+    quellen.mkdir()
+    # Verein A spielt 2000 in beiden Ligen (z. B. mit Amateuren), 2001 nur in der ersten
+    (quellen / 'erste.csv').write_text('\n'.join([
+        KOPF,
+        _zeile(2000, 1, 'Verein A', 2, 2, 0, 5, 1),
+        _zeile(2000, 2, 'Verein B', 2, 0, 0, 1, 5),
+        _zeile(2001, 1, 'Verein A', 2, 1, 1, 3, 2),
+        _zeile(2001, 2, 'Verein B', 2, 0, 1, 2, 3),
+    ]) + '\n', encoding='utf-8')
+    (quellen / 'zweite.csv').write_text('\n'.join([
+        KOPF,
+        _zeile(2000, 1, 'Verein C', 2, 1, 1, 4, 2),
+        _zeile(2000, 2, 'Verein A', 2, 0, 1, 2, 4),
+    ]) + '\n', encoding='utf-8')
+    return bl_daten.lade_datensatz(str(quellen))
+
+def test_ligen_werden_getrennt(zwei_ligen):
+    assert zwei_ligen.ligen == ['erste', 'zweite']
+    erste, zweite = zwei_ligen.liga('erste'), zwei_ligen.liga('zweite')
+    assert len(erste.df) == 4 and len(zweite.df) == 2
+    assert len({zwei_ligen.fingerprint, erste.fingerprint, zweite.fingerprint}) == 3
+    with pytest.raises(ValueError):
+        zwei_ligen.liga('dritte')
+
+def test_ewige_tabelle_je_liga(zwei_ligen):
+    stand = bl_ewig.EwigeTabelle(zwei_ligen.liga('erste').df).stand().set_index('Verein')
+    # Nur die Spiele der ersten Liga, nicht die 2 Spiele von Verein A in der zweiten Liga
+    assert stand.loc['Verein A', 'Spiele_Ewig'] == 4
+    assert stand.loc['Verein A', 'Siege_Ewig'] == 3
+    with pytest.raises(ValueError):
+        bl_ewig.EwigeTabelle(zwei_ligen.df)
+
+def test_standings_index_je_liga(zwei_ligen):
+    index = bl_grafik.berechne_standings_index(zwei_ligen.liga('zweite').df)
+    saison, ewig, _, _ = index[(2000, '2er')]
+    assert list(saison['Verein']) == ['Verein C', 'Verein A']
+    assert ewig.set_index('Verein').loc['Verein A', 'Spiele'] == 2
@@ -0,0 +1,61 @@
+"""Rerun-Messung: Spannen je Rerun, Fragment-Reruns und Export als JSONL bzw. Chrome-Trace."""
+import json
+import tracemalloc
+
+import pytest
+
+import bl_messung
+
+@pytest.fixture(autouse=True)
+def ohne_rerun():
+    yield
+    bl_messung.beende_rerun()
+
+@bl_messung.gemessen
+def _berechnung(n):
+    return sum(range(n))
+
+def test_ohne_messung_keine_spannen():
+    assert bl_messung.aktiver_rerun() is None
+    assert _berechnung(10) == 45
+    with bl_messung.spanne('frei') as spanne:
+        assert spanne is None
+
+def test_spannen_eines_reruns(monkeypatch):
+    monkeypatch.delenv(bl_messung.UMGEBUNGSVARIABLE, raising=False)
+    rerun = bl_messung.starte_rerun(3)
+    with bl_messung.spanne('aussen', tab='Tabellen'):
+        assert _berechnung(1000) == 499500
+    # Eine offen gebliebene Spanne schließt beende_rerun mit ab
+    rerun.betreten('offen', {})
+    assert bl_messung.beende_rerun() is rerun and bl_messung.aktiver_rerun() is None
+    assert [(s.name, s.tiefe) for s in rerun.spannen] == [('aussen', 0), ('_berechnung', 1), ('offen', 0)]
+    assert rerun.spannen[0].dauer_ns >= rerun.spannen[1].dauer_ns > 0
+    assert rerun.spannen[0].attribute == {'tab': 'Tabellen'}
+    # Ohne BL_MESSUNG läuft kein tracemalloc
+    assert not rerun.speicher and not tracemalloc.is_tracing()
+
+def test_speichermessung_mit_umgebungsvariable(monkeypatch):
+    monkeypatch.setenv(bl_messung.UMGEBUNGSVARIABLE, '1')
+    assert not tracemalloc.is_tracing()
+    with bl_messung.gemessener_rerun(1, 'karte') as rerun:
+        with bl_messung.spanne('liste'):
+            daten = [bytes(1000) for _ in range(100)]
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert rerun.fragment == 'karte'
+    assert rerun.spannen[0].alloc_bytes >= 100 * 1000 and daten
+
+def test_export(monkeypatch):
+    monkeypatch.delenv(bl_messung.UMGEBUNGSVARIABLE, raising=False)
+    reruns = []
+    for nummer, fragment in ((0, None), (1, 'tabellen')):
+        with bl_messung.gemessener_rerun(nummer, fragment) as rerun:
+            _berechnung(10)
+        reruns.append(rerun)
+    zeilen = [json.loads(zeile) for zeile in bl_messung.als_jsonl(reruns).splitlines()]
+    assert [(z['rerun'], z['fragment'], z['name']) for z in zeilen] == [
+        (0, None, '_berechnung'), (1, 'tabellen', '_berechnung')]
+    trace = json.loads(bl_messung.als_chrome_trace(reruns))['traceEvents']
+    assert [e['name'] for e in trace] == ['Rerun 0', '_berechnung', 'Rerun 1 (tabellen)', '_berechnung']
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in trace)
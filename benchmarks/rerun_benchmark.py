@@ -0,0 +1,333 @@
+"""
+Rerun-Benchmark für die drei Streamlit-Apps (bl_stat.py, streamlit_lc.py, tic_tac_toe.py).
+
+Jede App wird headless über streamlit.testing.v1.AppTest durch ihre Widget-Kombinationen
+geführt. Je Rerun werden die Latenz (p50/p95), der Spitzen-Speicher (tracemalloc, in einem
+zweiten Durchlauf, damit das Tracing die Latenz nicht verfälscht) und die Größe der ans
+Frontend gesendeten Daten gemessen (Protobuf-Nachrichten plus Mediendateien wie die PNGs von
+st.pyplot). Kartenkacheln werden dabei nicht geladen, der Lauf funktioniert offline. Wie auf
+dem Server wird das Skript nur einmal kompiliert; AppTest allein kompiliert es bei jedem Lauf
+neu, was Latenz und Speicher mit der Länge des Skripts statt mit seiner Arbeit wachsen ließe.
+
+Die Referenzwerte liegen in baseline.json neben diesem Skript. Speicher und Payload werden
+immer verglichen; überschreitet ein Wert seine Referenz um mehr als die Toleranz, endet der Lauf
+mit Exit-Code 1. Latenzen hängen von der Maschine ab und werden nur mit --latenz-pruefen
+verglichen, und zwar relativ zu einem Kalibrierungslauf (fester Rechenaufwand), der mit der
+Baseline gespeichert wird. So vergleicht der Check die Latenz im Verhältnis zur Rechenleistung
+statt absolute Millisekunden zweier Maschinen.
+
+    python benchmarks/rerun_benchmark.py
+    python benchmarks/rerun_benchmark.py --latenz-pruefen
+    python benchmarks/rerun_benchmark.py --app bl_stat --baseline-schreiben
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+# --- SZENARIEN ---
+# Jedes Szenario setzt Widgets am AppTest und liefert per yield einen Namen; nach jedem yield
+# wird genau ein Rerun ausgeführt und gemessen.
+
+def _widget(elemente, label):
+    return next(element for element in elemente if element.label == label)
+
+def szenario_bl_stat(at):
+    tabs = at.radio(key='aktiver_tab').options
+
+    for regel in at.radio(key='tab1_regel').options:
+        at.radio(key='tab1_regel').set_value(regel)
+        yield f'tabellen regel={regel}'
+        for saison in at.select_slider(key='tab1_saison').options:
+            at.select_slider(key='tab1_saison').set_value(int(saison))
+            yield f'tabellen saison={saison} regel={regel}'
+
+    at.radio(key='aktiver_tab').set_value(tabs[1])
+    yield 'vereinsentwicklung'
+    slider = at.slider(key='saison_range_slider')
+    min_jahr, max_jahr = int(slider.min), int(slider.max)
+    for regel in at.radio(key='regelung_vergleich').options:
+        at.radio(key='regelung_vergleich').set_value(regel)
+        for bereich in [(min_jahr, min_jahr), (min_jahr, max_jahr), (max_jahr, max_jahr)]:
+            at.slider(key='saison_range_slider').set_value(bereich)
+            yield f'vergleich {bereich} regel={regel}'
+
+    at.radio(key='aktiver_tab').set_value(tabs[2])
+    yield 'landkarte'
+    for saison in range(min_jahr, max_jahr + 1):
+        at.slider(key='map_slider_final').set_value(saison)
+        yield f'karte saison={saison}'
+
+def szenario_streamlit_lc(at):
+    for jahr_index in range(len(_widget(at.selectbox, 'Choose a Year').options)):
+        _widget(at.selectbox, 'Choose a Year').select_index(jahr_index)
+        for plot_typ in _widget(at.radio, 'Choose Plot Type').options:
+            _widget(at.radio, 'Choose Plot Type').set_value(plot_typ)
+            for mittelwerte in _widget(at.radio, 'Show Class Means').options:
+                _widget(at.radio, 'Show Class Means').set_value(mittelwerte)
+                yield f'jahr#{jahr_index} {plot_typ} means={mittelwerte}'
+
+# Zugfolgen (Zeile, Spalte) für X-Sieg, O-Sieg und Unentschieden
+TIC_TAC_TOE_PARTIEN = {
+    'x_gewinnt': [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)],
+    'o_gewinnt': [(0, 0), (1, 0), (0, 1), (1, 1), (2, 2), (1, 2)],
+    'unentschieden': [(0, 0), (0, 1), (0, 2), (1, 1), (1, 0), (1, 2), (2, 1), (2, 0), (2, 2)],
+}
+
+def szenario_tic_tac_toe(at):
+    for partie, zuege in TIC_TAC_TOE_PARTIEN.items():
+        for zeile, spalte in zuege:
+            at.button(key=f'btn_{zeile}_{spalte}').click()
+            yield f'{partie} zug {zeile},{spalte}'
+        _widget(at.button, 'Neues Spiel starten').click()
+        yield f'{partie} neues spiel'
+
+APPS = {
+    'bl_stat': ('GitHub_Repo3/bl_stat.py', szenario_bl_stat),
+    'streamlit_lc': ('GitHub_Repo1/streamlit_lc.py', szenario_streamlit_lc),
+    'tic_tac_toe': ('GitHub_Repo2/tic_tac_toe.py', szenario_tic_tac_toe),
+}
+
+
+# --- MESSUNG ---
+
+class _MedienZaehler:
+    """Zählt die Bytes, die während eines Reruns im MediaFileManager landen (z. B. st.pyplot)."""
+
+    def __init__(self):
+        self.bytes = 0
+        self._original = MediaFileManager.add
+
+    def __enter__(self):
+        zaehler = self
+
+        def add(manager, path_or_data, *args, **kwargs):
+            if isinstance(path_or_data, (bytes, bytearray)):
+                zaehler.bytes += len(path_or_data)
+            return zaehler._original(manager, path_or_data, *args, **kwargs)
+
+        MediaFileManager.add = add
+        return self
+
+    def __exit__(self, *exc):
+        MediaFileManager.add = self._original
+
+class _GeteilterScriptCache:
+    """Ein ScriptCache für alle Läufe eines AppTest, wie der eine Cache eines Streamlit-Servers."""
+
+    def __init__(self):
+        self._cache = ScriptCache()
+        self._original = local_script_runner.ScriptCache
+
+    def __enter__(self):
+        local_script_runner.ScriptCache = lambda: self._cache
+        return self
+
+    def __exit__(self, *exc):
+        local_script_runner.ScriptCache = self._original
+
+def _proto_bytes(knoten):
+    proto = getattr(knoten, 'proto', None)
+    groesse = proto.ByteSize() if hasattr(proto, 'ByteSize') else 0
+    return groesse + sum(_proto_bytes(kind) for kind in getattr(knoten, 'children', {}).values())
+
+def _rerun(at):
+    """Ein gemessener Rerun: (Sekunden, Payload-Bytes)."""
+    with _MedienZaehler() as medien:
+        start = time.perf_counter()
+        at.run()
+        dauer = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"App-Fehler: {at.exception[0].value}")
+    return dauer, _proto_bytes(at._tree) + medien.bytes
+
+def _durchlauf(app_pfad, szenario, speicher):
+    at = AppTest.from_file(os.path.join(REPO, app_pfad), default_timeout=300)
+    latenzen, payloads, spitzen = [], [], []
+
+    def messen():
+        if speicher:
+            # Liegengebliebene Zyklen früherer Läufe (z. B. AppTest-Medienspeicher) nicht mitzählen
+            gc.collect()
+            tracemalloc.reset_peak()
+        dauer, payload = _rerun(at)
+        if speicher:
+            spitzen.append(tracemalloc.get_traced_memory()[1])
+        latenzen.append(dauer)
+        payloads.append(payload)
+
+    # Erster Lauf ohne Widget-Eingaben (kompiliert das Skript), danach ein Rerun je Szenario-Schritt
+    with _GeteilterScriptCache():
+        messen()
+        for _ in szenario(at):
+            messen()
+    return latenzen, payloads, spitzen
+
+def _perzentil(werte, p):
+    if len(werte) == 1:
+        return werte[0]
+    return statistics.quantiles(werte, n=100, method='inclusive')[p - 1]
+
+def messe_app(name):
+    app_pfad, szenario = APPS[name]
+    app_verzeichnis = os.path.dirname(os.path.join(REPO, app_pfad))
+    # streamlit run nimmt das Verzeichnis der App in sys.path auf, AppTest nicht
+    if app_verzeichnis not in sys.path:
+        sys.path.insert(0, app_verzeichnis)
+
+    latenzen, payloads, _ = _durchlauf(app_pfad, szenario, speicher=False)
+    tracemalloc.start()
+    try:
+        _, _, spitzen = _durchlauf(app_pfad, szenario, speicher=True)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'reruns': len(latenzen),
+        # Der erste Lauf lädt Daten und füllt Caches und wird separat ausgewiesen
+        'erster_lauf_ms': round(latenzen[0] * 1000, 1),
+        'p50_ms': round(_perzentil(latenzen[1:] or latenzen, 50) * 1000, 1),
+        'p95_ms': round(_perzentil(latenzen[1:] or latenzen, 95) * 1000, 1),
+        'spitzen_speicher_mb': round(max(spitzen) / 2**20, 2),
+        'payload_p50_kb': round(_perzentil(payloads, 50) / 1024, 1),
+        'payload_max_kb': round(max(payloads) / 1024, 1),
+    }
+
+
+# --- KALIBRIERUNG ---
+
+# Schlüssel der Kalibrierung in baseline.json (keine App)
+KALIBRIERUNG = 'kalibrierung'
+KALIBRIERUNG_LAEUFE = 7
+
+def _kalibrierungs_last():
+    """Fester, single-threaded Aufwand aus Python-Objekten, ähnlich einem Skript-Rerun."""
+    werte = {f"schluessel_{i}": [i, str(i), i * 0.5] for i in range(20_000)}
+    json.loads(json.dumps(werte))
+    return sorted(werte.items(), key=lambda eintrag: eintrag[1][1])
+
+def kalibriere():
+    """Median-Laufzeit der Kalibrierungslast in ms."""
+    _kalibrierungs_last()
+    dauern = []
+    for _ in range(KALIBRIERUNG_LAEUFE):
+        start = time.perf_counter()
+        _kalibrierungs_last()
+        dauern.append(time.perf_counter() - start)
+    return round(statistics.median(dauern) * 1000, 1)
+
+
+# --- VERGLEICH MIT DER BASELINE ---
+
+# Kennzahl -> Name der Toleranz, die für sie gilt
+VERGLICHENE_KENNZAHLEN = {
+    'p50_ms': 'latenz',
+    'p95_ms': 'latenz',
+    'spitzen_speicher_mb': 'groesse',
+    'payload_max_kb': 'groesse',
+}
+
+def vergleiche(ergebnisse, baseline, toleranzen, latenz_faktor=None):
+    """
+    Liste der Regressionen als Textzeilen. Latenzen werden nur mit latenz_faktor verglichen
+    (Kalibrierung jetzt / Kalibrierung der Baseline); die Referenz wird damit skaliert.
+    """
+    regressionen = []
+    for app, werte in ergebnisse.items():
+        referenz = baseline.get(app)
+        if referenz is None:
+            continue
+        for kennzahl, toleranz_name in VERGLICHENE_KENNZAHLEN.items():
+            if kennzahl not in referenz:
+                continue
+            faktor = 1.0
+            if toleranz_name == 'latenz':
+                if latenz_faktor is None:
+                    continue
+                faktor = latenz_faktor
+            grenze = referenz[kennzahl] * faktor * (1 + toleranzen[toleranz_name])
+            if werte[kennzahl] > grenze:
+                skaliert = f", skaliert ×{faktor:.2f}" if faktor != 1.0 else ""
+                regressionen.append(
+                    f"{app}: {kennzahl} = {werte[kennzahl]} > {grenze:.1f} "
+                    f"(Baseline {referenz[kennzahl]}{skaliert}, Toleranz {toleranzen[toleranz_name]:.0%})"
+                )
+    return regressionen
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--app', choices=sorted(APPS), action='append',
+                        help="Nur diese App(s) messen (mehrfach angebbar)")
+    parser.add_argument('--baseline', default=BASELINE_PFAD, help="Pfad der Baseline-Datei")
+    parser.add_argument('--baseline-schreiben', action='store_true',
+                        help="Gemessene Werte als neue Baseline speichern")
+    parser.add_argument('--latenz-pruefen', action='store_true',
+                        help="Auch Latenzen vergleichen, normiert auf den Kalibrierungslauf der Baseline")
+    parser.add_argument('--toleranz-latenz', type=float, default=0.5,
+                        help="Erlaubte relative Verschlechterung der Latenz (Standard 0.5)")
+    parser.add_argument('--toleranz', type=float, default=0.2,
+                        help="Erlaubte relative Verschlechterung von Speicher und Payload (Standard 0.2)")
+    args = parser.parse_args(argv)
+
+    # streamlit_lc.py liest ./data/mpg.csv relativ zum Arbeitsverzeichnis
+    os.chdir(REPO)
+
+    kalibrierung_ms = kalibriere()
+    print(f"Kalibrierung: {kalibrierung_ms} ms")
+    ergebnisse = {}
+    # Die im Szenario gespielten Partien landen nicht in GitHub_Repo2/protokolle
+    with tempfile.TemporaryDirectory(prefix='spielprotokolle-') as protokolle:
+        os.environ['SPIELPROTOKOLL_VERZEICHNIS'] = protokolle
+        try:
+            for name in args.app or list(APPS):
+                ergebnisse[name] = messe_app(name)
+                print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in ergebnisse[name].items()))
+        finally:
+            del os.environ['SPIELPROTOKOLL_VERZEICHNIS']
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.baseline_schreiben:
+        baseline.update(ergebnisse)
+        baseline[KALIBRIERUNG] = {'ms': kalibrierung_ms}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline geschrieben: {args.baseline}")
+        return 0
+
+    latenz_faktor = None
+    if args.latenz_pruefen:
+        referenz_ms = baseline.get(KALIBRIERUNG, {}).get('ms')
+        if not referenz_ms:
+            print("Die Baseline enthält keine Kalibrierung; bitte mit --baseline-schreiben neu erzeugen.",
+                  file=sys.stderr)
+            return 2
+        latenz_faktor = kalibrierung_ms / referenz_ms
+        print(f"Latenzen skaliert mit ×{latenz_faktor:.2f} (Kalibrierung {kalibrierung_ms} / {referenz_ms} ms)")
+
+    regressionen = vergleiche(ergebnisse, baseline, {'latenz': args.toleranz_latenz, 'groesse': args.toleranz},
+                              latenz_faktor)
+    for zeile in regressionen:
+        print(f"REGRESSION {zeile}")
+    return 1 if regressionen else 0
+
+if __name__ == '__main__':
+    sys.exit(main())